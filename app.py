@@ -1,5 +1,9 @@
+import os
 from app import create_app, start_email_monitoring
 from app.config import Config
+from app.routes import register_socket_events
+from app.services.event_bus import socketio_options
+from app.services.leader import LeaderLock
 from flask_socketio import SocketIO
 
 if __name__ == '__main__':
@@ -7,13 +11,28 @@ if __name__ == '__main__':
     app = create_app()
     
     # Initialize SocketIO with gevent
-    socketio = SocketIO(app, cors_allowed_origins="*", async_mode='gevent')
+    socketio = SocketIO(app, cors_allowed_origins="*", async_mode='gevent', **socketio_options())
+    register_socket_events(socketio)
     
-    # Start email monitoring with WebSocket support
-    email_tracker = start_email_monitoring(socketio)
+    # Start email monitoring with WebSocket support, unless another process already does.
+    # With DEBUG the Werkzeug reloader runs this script twice: a watcher that never serves
+    # and the serving child (WERKZEUG_RUN_MAIN); only the child may ingest, or its events
+    # would never reach the clients connected to it
+    email_tracker = None
+    ingest_lock = LeaderLock()
+    serving = not Config.DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+    if not serving:
+        print("Monitoring: started by the reloaded process that serves requests")
+    elif not Config.INGEST_IN_WEB:
+        print("Monitoring: left to ingest.py (INGEST_IN_WEB is off)")
+    elif ingest_lock.acquire():
+        email_tracker = start_email_monitoring(socketio)
+    else:
+        print(f"Monitoring: another process is ingesting (pid {ingest_lock.holder()}), serving only")
     
     print("Email Tracker Application Started")
-    print(f"Monitoring: {Config.EMAIL_ADDRESS}")
+    if email_tracker:
+        print(f"Monitoring: {', '.join(target.name for target in email_tracker.targets)}")
     print(f"Server: http://localhost:{Config.PORT}")
     print("Real-time updates enabled via WebSocket (gevent)")
     print("Available endpoints:")
@@ -27,11 +46,14 @@ if __name__ == '__main__':
     print("     - GET /api/attachments/<id>/download")
     print("     - GET /api/attachments/<id>/view")
     print("     - GET /api/health")
+    print("     - GET /api/metrics")
     
     try:
         # Run Flask app with SocketIO using gevent
         socketio.run(app, debug=Config.DEBUG, port=Config.PORT, host='0.0.0.0')
     except KeyboardInterrupt:
         print("\n Shutting down...")
-        email_tracker.stop_monitoring()
+        if email_tracker:
+            email_tracker.stop_monitoring()
+        ingest_lock.release()
         print("Application stopped")
\ No newline at end of file
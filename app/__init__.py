@@ -3,7 +3,10 @@ from flask_socketio import SocketIO
 from app.routes.email_routes import email_bp
 from app.routes.web_routes import web_bp
 from app.services.db import DatabaseService
-from app.services.email_tracker import EmailTracker
+from app.services.supervisor import MonitorSupervisor
+from app.services.async_pipeline import AsyncIngestPipeline
+from app.services.email_index import get_email_index
+from app.services import metrics
 from app.config import Config
 
 def create_app():
@@ -17,14 +20,21 @@ def create_app():
     db_service = DatabaseService()
     db_service.init_database()
     
+    # Load the in-memory listing index (no-op when EMAIL_INDEX_ENABLED is off)
+    get_email_index(db_service)
+    
     # Register blueprints
     app.register_blueprint(email_bp)
     app.register_blueprint(web_bp)
     
+    # Request timings for /api/metrics (no-op when METRICS_ENABLED is off)
+    metrics.instrument_app(app)
+    
     return app
 
 def start_email_monitoring(socketio=None):
-    """Start email monitoring service with optional WebSocket support"""
-    tracker = EmailTracker(socketio=socketio)
-    tracker.start_monitoring()
-    return tracker
\ No newline at end of file
+    """Start email monitoring of every configured mailbox with optional WebSocket support"""
+    engine = AsyncIngestPipeline if Config.INGEST_ENGINE == 'asyncio' else MonitorSupervisor
+    supervisor = engine(socketio=socketio)
+    supervisor.start_monitoring()
+    return supervisor
\ No newline at end of file
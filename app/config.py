@@ -12,30 +12,147 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-key-change-in-production')
     
     # Database
-    DATABASE_PATH = 'emails.db'
+    DATABASE_PATH = os.getenv('DATABASE_PATH', 'emails.db')
+    SQLITE_POOL_SIZE = int(os.getenv('SQLITE_POOL_SIZE', 8))  # idle connections kept open
+    SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', 30))  # seconds to wait for a lock
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')  # NORMAL is durable enough in WAL mode
+    SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', 20000))  # page cache per connection
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_STATEMENT_CACHE = int(os.getenv('SQLITE_STATEMENT_CACHE', 128))  # prepared statements per connection
+    
+    # Attachment payloads (content-addressed files; only metadata stays in SQLite)
+    BLOB_STORE = os.getenv('BLOB_STORE', 'filesystem')
+    BLOB_STORE_PATH = os.getenv('BLOB_STORE_PATH')  # defaults to 'attachments' next to the database
+    ATTACHMENT_MAX_SIZE = int(os.getenv('ATTACHMENT_MAX_SIZE', 100 * 1024 * 1024))  # larger ones are kept as metadata only (0: no limit)
+    
+    # Attachment previews (app/services/previews.py): thumbnails of images (needs Pillow), excerpts of text files
+    PREVIEW_CACHE_PATH = os.getenv('PREVIEW_CACHE_PATH')  # defaults to 'previews' next to the database
+    PREVIEW_CACHE_MAX_MB = int(os.getenv('PREVIEW_CACHE_MAX_MB', 256))  # least recently used renditions are evicted past this
+    PREVIEW_SIZES = [int(size) for size in os.getenv('PREVIEW_SIZES', '240,1024').split(',') if size.strip()]  # pixels, the first is the default
+    PREVIEW_JPEG_QUALITY = int(os.getenv('PREVIEW_JPEG_QUALITY', 80))
+    PREVIEW_TEXT_BYTES = int(os.getenv('PREVIEW_TEXT_BYTES', 8192))  # excerpt of text attachments
+    PREVIEW_MAX_AGE = int(os.getenv('PREVIEW_MAX_AGE', 365 * 86400))  # renditions are addressed by content hash, so they never change
+    
+    # Retention: emails older than ARCHIVE_AFTER_DAYS move to monthly archive files (app/services/archive.py)
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 0))  # 0: keep everything in the database
+    ARCHIVE_PATH = os.getenv('ARCHIVE_PATH')  # defaults to 'archive' next to the database
+    ARCHIVE_DROP_ATTACHMENTS = os.getenv('ARCHIVE_DROP_ATTACHMENTS', 'false').lower() == 'true'  # keep only attachment metadata
+    ARCHIVE_RETENTION_MONTHS = int(os.getenv('ARCHIVE_RETENTION_MONTHS', 0))  # archive files older than this are deleted (0: never)
+    ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 500))  # emails moved per transaction
+    ARCHIVE_INTERVAL = int(os.getenv('ARCHIVE_INTERVAL', 3600))  # seconds between archive passes of the monitor
+    
+    # Message bodies (compressed raw deflate with a shared preset dictionary, app/services/body_codec.py)
+    BODY_COMPRESSION_LEVEL = int(os.getenv('BODY_COMPRESSION_LEVEL', 6))  # zlib level 1-9
+    BODY_DICTIONARY_MIN_SAMPLES = int(os.getenv('BODY_DICTIONARY_MIN_SAMPLES', 200))  # bodies stored before the first dictionary is trained
+    BODY_DICTIONARY_SAMPLE = int(os.getenv('BODY_DICTIONARY_SAMPLE', 2000))  # newest bodies a dictionary is trained from
+    
+    # In-memory listing index (app/services/email_index.py); about 40 bytes + subject per email
+    EMAIL_INDEX_ENABLED = os.getenv('EMAIL_INDEX_ENABLED', 'true').lower() == 'true'
+    
+    # HTTP caching (ETags from the database change counter, in-process response cache)
+    HTTP_CACHE_ENABLED = os.getenv('HTTP_CACHE_ENABLED', 'true').lower() == 'true'
+    HTTP_CACHE_SIZE = int(os.getenv('HTTP_CACHE_SIZE', 256))  # cached responses
+    HTTP_CACHE_TTL = float(os.getenv('HTTP_CACHE_TTL', 60))  # seconds
+    HTTP_CACHE_REVISION_TTL = float(os.getenv('HTTP_CACHE_REVISION_TTL', 1))  # seconds between change counter reads
+    ATTACHMENT_MAX_AGE = int(os.getenv('ATTACHMENT_MAX_AGE', 86400))  # browser cache lifetime for attachments
+    
+    # Response compression (app/services/compression.py): gzip, or brotli when the package is installed
+    COMPRESS_ENABLED = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))  # bytes, smaller responses are sent as they are
+    COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', 6))  # 1-9
+    COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', 5))  # 0-11; above 6 costs far more CPU for little gain
+    
+    # Bulk export (/api/emails/export)
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))  # emails read per query and sent per chunk
+    
+    # Metrics (/api/metrics in Prometheus text format) and health (/api/health)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    HEALTH_MAX_POLL_AGE = int(os.getenv('HEALTH_MAX_POLL_AGE', 900))  # seconds without a successful pass before a mailbox is stale
     
     # Email Configuration
     EMAIL_ADDRESS = os.getenv('EMAIL_ADDRESS')
     EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD')
     IMAP_SERVER = os.getenv('IMAP_SERVER', 'imap.gmail.com')
     IMAP_PORT = int(os.getenv('IMAP_PORT', 993))
+    IMAP_USE_SSL = os.getenv('IMAP_USE_SSL', 'true').lower() == 'true'
+    IMAP_FOLDERS = [folder.strip() for folder in os.getenv('IMAP_FOLDERS', 'INBOX').split(',') if folder.strip()]
+    
+    # Multi-account monitoring: JSON list of accounts (see app/services/accounts.py)
+    ACCOUNTS_FILE = os.getenv('ACCOUNTS_FILE')
+    MONITOR_POOL_SIZE = int(os.getenv('MONITOR_POOL_SIZE', 4))  # worker threads shared by all mailboxes
+    
+    # Ingestion engine: 'threads' (MonitorSupervisor) or 'asyncio' (AsyncIngestPipeline)
+    INGEST_ENGINE = os.getenv('INGEST_ENGINE', 'threads')
+    PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 200))  # messages buffered between two stages
+    PIPELINE_BATCH_SIZE = int(os.getenv('PIPELINE_BATCH_SIZE', 100))  # emails per database transaction
+    PIPELINE_FETCH_CHUNK = int(os.getenv('PIPELINE_FETCH_CHUNK', 25))  # messages per UID FETCH
+    
+    # Historical backfill (backfill.py)
+    BACKFILL_WORKERS = int(os.getenv('BACKFILL_WORKERS', 4))  # concurrent IMAP connections
+    BACKFILL_CHUNK_SIZE = int(os.getenv('BACKFILL_CHUNK_SIZE', 50))  # messages per UID FETCH and checkpoint
+    
+    # WebSocket broadcasting: coalesce events and flush at most once per interval
+    BROADCAST_INTERVAL = float(os.getenv('BROADCAST_INTERVAL', 0.5))  # seconds
+    BROADCAST_MAX_BATCH = int(os.getenv('BROADCAST_MAX_BATCH', 100))  # emails per new_emails frame
+    
+    # Message queue shared with other processes so they can emit WebSocket events: redis://, amqp://,
+    # or sqlite:///events.db for a local file (app/services/event_bus.py)
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE')
+    EVENT_BUS_POLL_INTERVAL = float(os.getenv('EVENT_BUS_POLL_INTERVAL', 0.05))  # seconds between reads of an idle sqlite:// queue
+    EVENT_BUS_RETENTION = float(os.getenv('EVENT_BUS_RETENTION', 60))  # seconds events are kept in a sqlite:// queue
+    
+    # Process layout: the web server monitors the mailboxes itself unless INGEST_IN_WEB is off and
+    # ingest.py runs on its own; either way a lock (app/services/leader.py) lets only one process ingest
+    INGEST_IN_WEB = os.getenv('INGEST_IN_WEB', 'true').lower() == 'true'
+    INGEST_LOCK_PATH = os.getenv('INGEST_LOCK_PATH')  # defaults to 'ingest.lock' next to the database
+    INGEST_LOCK_RETRY = float(os.getenv('INGEST_LOCK_RETRY', 5))  # seconds between attempts of a standby ingester
     
     # Timezone (GMT+3)
     TIMEZONE = timezone(timedelta(hours=3))
     
     # Email Processing Configuration
-    CHECK_INTERVAL = 30  # seconds
-    MAX_RETRIES = 3
-    RETRY_DELAY = 60  # seconds
+    CHECK_INTERVAL = int(os.getenv('CHECK_INTERVAL', 30))  # seconds, first poll interval (the only one with POLL_ADAPTIVE off)
+    MAX_RETRIES = 3  # attempts per backfill chunk
+    
+    # Poll scheduling without IDLE (app/services/poll_scheduler.py): the interval follows the arrival
+    # rate, failed passes back off exponentially with jitter
+    POLL_ADAPTIVE = os.getenv('POLL_ADAPTIVE', 'true').lower() == 'true'
+    POLL_MIN_INTERVAL = float(os.getenv('POLL_MIN_INTERVAL', 5))  # seconds, while mail keeps arriving
+    POLL_MAX_INTERVAL = float(os.getenv('POLL_MAX_INTERVAL', 300))  # seconds, for a quiet mailbox
+    POLL_RATE_WINDOW = float(os.getenv('POLL_RATE_WINDOW', 300))  # seconds the arrival rate is averaged over
+    POLL_TARGET_BATCH = float(os.getenv('POLL_TARGET_BATCH', 1))  # emails a pass should find on average
+    POLL_JITTER = float(os.getenv('POLL_JITTER', 0.1))  # intervals vary by this fraction, so mailboxes do not poll in step
+    POLL_BACKOFF_BASE = float(os.getenv('POLL_BACKOFF_BASE', 5))  # seconds after the first failure, doubling with each
+    POLL_BACKOFF_MAX = float(os.getenv('POLL_BACKOFF_MAX', 300))  # seconds, a failing mailbox is retried at least as often as a quiet one is polled
+    POLL_NOOP_AFTER = float(os.getenv('POLL_NOOP_AFTER', 60))  # seconds unused before a connection is checked with NOOP
+    
+    # IMAP IDLE push mode (falls back to polling when the server lacks IDLE)
+    USE_IDLE = os.getenv('USE_IDLE', 'true').lower() == 'true'
+    IDLE_TIMEOUT = int(os.getenv('IDLE_TIMEOUT', 600))  # seconds, re-issue IDLE well before the 29 min limit
+    
+    # Two-phase fetch: headers first, bodies/attachments from a background queue
+    TWO_PHASE_FETCH = os.getenv('TWO_PHASE_FETCH', 'true').lower() == 'true'
+    BODY_FETCH_WORKERS = int(os.getenv('BODY_FETCH_WORKERS', 1))
+    BODY_QUEUE_SIZE = int(os.getenv('BODY_QUEUE_SIZE', 100))
+    
+    # Streaming fetch: messages above the threshold are parsed while they download
+    # (app/services/mime_stream.py) instead of being loaded whole
+    STREAMING_THRESHOLD = int(os.getenv('STREAMING_THRESHOLD', 10 * 1024 * 1024))  # bytes (0: never stream)
+    STREAMING_MEMORY_BUDGET = int(os.getenv('STREAMING_MEMORY_BUDGET', 8 * 1024 * 1024))  # bytes of a streamed message in memory
     
     # Flask Configuration
-    DEBUG = True
-    PORT = 5000
+    DEBUG = os.getenv('DEBUG', 'true').lower() == 'true'
+    PORT = int(os.getenv('PORT', 5000))
     
     @classmethod
     def validate_config(cls):
         """Validate that required configuration is present"""
         required_vars = ['EMAIL_ADDRESS', 'EMAIL_PASSWORD', 'IMAP_SERVER']
+        if cls.ACCOUNTS_FILE:
+            # Credentials come from the accounts file instead
+            if not os.path.exists(cls.ACCOUNTS_FILE):
+                raise ValueError(f"ACCOUNTS_FILE not found: {cls.ACCOUNTS_FILE}")
+            required_vars = []
         missing_vars = [var for var in required_vars if not getattr(cls, var)]
         
         if missing_vars:
@@ -9,9 +9,14 @@ class Email:
     sender: Optional[str] = None
     subject: Optional[str] = None
     body: Optional[str] = None
+    html: Optional[str] = None
     received_date: Optional[str] = None
+    received_ts: Optional[int] = None
     has_attachment: bool = False
     attachment_count: int = 0
+    body_status: str = 'complete'
+    account: Optional[str] = None
+    folder: Optional[str] = None
 
 @dataclass
 class Attachment:
@@ -19,4 +24,7 @@ class Attachment:
     id: Optional[int] = None
     email_id: Optional[int] = None
     filename: Optional[str] = None
-    content: Optional[bytes] = None
\ No newline at end of file
+    content: Optional[bytes] = None
+    size: Optional[int] = None
+    stored: bool = True  # False when it exceeded ATTACHMENT_MAX_SIZE and only the metadata was kept
+    preview: Optional[str] = None  # 'image' or 'text' when /thumbnail has a rendition of it (PreviewService.kind)
\ No newline at end of file
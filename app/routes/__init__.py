@@ -1,4 +1,5 @@
 from .email_routes import email_bp
 from .web_routes import web_bp
+from .socket_events import register_socket_events
 
-__all__ = ['email_bp', 'web_bp']
\ No newline at end of file
+__all__ = ['email_bp', 'web_bp', 'register_socket_events']
\ No newline at end of file
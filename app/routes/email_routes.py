@@ -1,16 +1,47 @@
-from flask import Blueprint, jsonify, send_file
+from flask import Blueprint, jsonify, request, send_file, make_response, Response
+import csv
 import io
+import json
+import mimetypes
+import time
+from datetime import datetime
+from itertools import islice
 from app.services.db import DatabaseService
+from app.services.accounts import load_targets
 from app.models.email_model import Email, Attachment
+from app.routes.pagination import parse_listing_args, next_cursor
+from app.services.http_cache import TTLCache, revision_cached
+from app.services.previews import PreviewService, create_preview_service
+from app.services import compression, email_index, metrics
+from app.config import Config
 
 email_bp = Blueprint('emails', __name__, url_prefix='/api')
 db_service = DatabaseService()
 
+# attachment id -> (filename, sha256, size); attachments never change once stored
+attachment_cache = TTLCache(Config.HTTP_CACHE_SIZE * 4, Config.ATTACHMENT_MAX_AGE)
+preview_service = create_preview_service(db_service)
+
+@email_bp.after_request
+def compress_response(response):
+    """gzip or brotli for JSON and text responses, as the client's Accept-Encoding allows"""
+    return compression.compress_response(response, compression.negotiate(request.accept_encodings))
+
 @email_bp.route('/emails', methods=['GET'])
+@revision_cached(db_service)
 def get_emails():
-    """Get all emails with attachment information"""
+    """Get a page of emails with attachment information.
+    
+    Query args: before=<received_ts,id> cursor, limit, q (sender or subject),
+    sender, subject, has_attachment=with|without.
+    """
+    try:
+        listing_args = parse_listing_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     try:
-        email_rows = db_service.get_all_emails()
+        email_rows = email_index.get_emails_page(db_service, **listing_args)
         
         emails = [
             Email(
@@ -19,16 +50,154 @@ def get_emails():
                 subject=row[2],
                 received_date=row[3],
                 has_attachment=row[4],
-                attachment_count=row[5]
+                attachment_count=row[5],
+                received_ts=row[6],
+                account=row[7],
+                folder=row[8]
             ).__dict__
             for row in email_rows
         ]
         
-        return jsonify({'emails': emails})
+        return jsonify({
+            'emails': emails,
+            'next_cursor': next_cursor(email_rows, listing_args['limit'])
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def parse_since(value):
+    """Unix timestamp from a ``since`` arg: a timestamp or an ISO 8601 date/time (TIMEZONE when naive)"""
+    if not value:
+        return 0
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        since = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid since: {value!r} (a Unix timestamp or an ISO 8601 date)")
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=Config.TIMEZONE)
+    return int(since.timestamp())
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+def ndjson_chunks(rows, columns):
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    for batch in batches(rows, Config.EXPORT_BATCH_SIZE):
+        yield ''.join([encode(dict(zip(columns, row))) + '\n' for row in batch]).encode('utf-8')
+
+def csv_chunks(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches(rows, Config.EXPORT_BATCH_SIZE):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')  # the header of an empty export
+
+# format -> (mimetype, chunk generator)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', ndjson_chunks),
+    'csv': ('text/csv', csv_chunks)
+}
+
+@email_bp.route('/emails/export', methods=['GET'])
+def export_emails():
+    """Stream every email received since a point in time as NDJSON or CSV, oldest first.
+    
+    Query args: since (Unix timestamp or ISO 8601 date/time, default: all),
+    format=ndjson|csv, bodies=true to add the text and html bodies,
+    archive=false to leave out the monthly archives.
+    
+    Rows are read and sent in batches of EXPORT_BATCH_SIZE, so memory does
+    not grow with the export; gzip or brotli is applied as the stream goes
+    when the client accepts it.
+    """
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        since_ts = parse_since(request.args.get('since'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    bodies = request.args.get('bodies', 'false').lower() == 'true'
+    include_archives = request.args.get('archive', 'true').lower() != 'false'
+    columns = DatabaseService.EXPORT_COLUMNS + (('text', 'html') if bodies else ())
+    rows = db_service.iter_emails(since_ts, bodies=bodies, include_archives=include_archives)
+    
+    mimetype, encode = EXPORT_FORMATS[export_format]
+    chunks = encode(rows, columns)
+    encoding = compression.negotiate(request.accept_encodings)
+    if encoding:
+        chunks = compression.compress_stream(chunks, encoding)
+    
+    response = Response(chunks, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=emails.{export_format}'
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_store = True
+    return response
+
+@email_bp.route('/search', methods=['GET'])
+@revision_cached(db_service)
+def search_emails():
+    """Full-text search over sender, subject and body.
+    
+    Query args: q (required), limit (default 20, max 100), offset,
+    archive=false to leave out the monthly archives.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Missing search query (q)'}), 400
+    
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 100))
+        offset = max(0, int(request.args.get('offset', 0)))
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    
+    try:
+        include_archives = request.args.get('archive', 'true').lower() != 'false'
+        rows = db_service.search_emails(query, limit=limit, offset=offset, include_archives=include_archives)
+        results = [
+            dict(
+                Email(
+                    id=row[0],
+                    sender=row[1],
+                    subject=row[2],
+                    received_date=row[3],
+                    has_attachment=row[4],
+                    attachment_count=row[5]
+                ).__dict__,
+                snippet=row[6],
+                rank=row[7]
+            )
+            for row in rows
+        ]
+        
+        return jsonify({
+            'query': query,
+            'results': results,
+            'next_offset': offset + limit if len(rows) == limit else None
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @email_bp.route('/emails/<int:email_id>/attachments', methods=['GET'])
+@revision_cached(db_service)
 def get_attachments(email_id):
     """Get attachments for a specific email"""
     try:
@@ -38,7 +207,10 @@ def get_attachments(email_id):
             Attachment(
                 id=row[0],
                 filename=row[1],
-                email_id=email_id
+                email_id=email_id,
+                size=row[2],
+                stored=bool(row[3]),
+                preview=PreviewService.kind(row[1]) if row[3] else None
             ).__dict__
             for row in attachment_rows
         ]
@@ -47,22 +219,76 @@ def get_attachments(email_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def load_attachment(attachment_id):
+    """(filename, sha256, size, content) of an attachment, or None if there is none.
+    
+    Known blob store attachments come from ``attachment_cache`` without a query.
+    """
+    cached = attachment_cache.get(attachment_id)
+    if cached is not None:
+        return cached + (None,)
+    result = db_service.get_attachment(attachment_id)
+    if result is not None and result[1] is not None and result[3] is None:
+        attachment_cache.set(attachment_id, result[:3])
+    return result
+
+def not_modified(etag, max_age):
+    response = make_response('', 304)
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    return response
+
+def send_attachment(attachment_id, as_attachment):
+    """Stream an attachment from the blob store (ETag, conditional and Range requests supported)"""
+    result = load_attachment(attachment_id)
+    
+    if result is None:
+        return jsonify({'error': 'Attachment not found'}), 404
+    
+    filename, digest, size, content = result
+    if digest is None and content is None:
+        return jsonify({'error': 'Attachment content was not kept (over the size limit, or archived '
+                                 'without payloads), only its metadata'}), 404
+    # Revalidation of a known attachment needs neither the database nor the file
+    if digest is not None and request.if_none_match.contains(digest):
+        return not_modified(digest, Config.ATTACHMENT_MAX_AGE)
+    
+    # Determine content type based on file extension
+    content_type, _ = mimetypes.guess_type(filename or '')
+    
+    if content_type is None:
+        content_type = 'application/octet-stream'
+    
+    if content is not None:
+        # Not migrated to the blob store yet
+        source, etag = io.BytesIO(content), db_service.blob_store.digest(content)
+    else:
+        # File-backed stores are served straight from disk by path
+        source = db_service.blob_store.path(digest) or db_service.blob_store.open(digest)
+        etag = digest
+    
+    response = send_file(
+        source,
+        mimetype=content_type,
+        as_attachment=as_attachment,
+        download_name=filename,
+        etag=etag,
+        conditional=True,
+        max_age=Config.ATTACHMENT_MAX_AGE
+    )
+    # Mail content must not be kept by shared caches
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
 @email_bp.route('/attachments/<int:attachment_id>/download', methods=['GET'])
 def download_attachment(attachment_id):
     """Download a specific attachment"""
     try:
-        result = db_service.get_attachment(attachment_id)
-        
-        if result is None:
-            return jsonify({'error': 'Attachment not found'}), 404
-            
-        filename, content = result
-        
-        return send_file(
-            io.BytesIO(content),
-            download_name=filename,
-            as_attachment=True
-        )
+        return send_attachment(attachment_id, as_attachment=True)
+    except FileNotFoundError:
+        return jsonify({'error': 'Attachment content missing from blob store'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -70,30 +296,118 @@ def download_attachment(attachment_id):
 def view_attachment(attachment_id):
     """View a specific attachment inline (for images, PDFs, etc.)"""
     try:
-        result = db_service.get_attachment(attachment_id)
-        
+        return send_attachment(attachment_id, as_attachment=False)
+    except FileNotFoundError:
+        return jsonify({'error': 'Attachment content missing from blob store'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@email_bp.route('/attachments/<int:attachment_id>/thumbnail', methods=['GET'])
+def attachment_thumbnail(attachment_id):
+    """Downscaled preview of an attachment: a JPEG thumbnail of an image, the start of a text file.
+    
+    Query parameters:
+    - size: bounding box in pixels for images, one of PREVIEW_SIZES (default: the first)
+    
+    Renditions are addressed by content hash and cached by the browser for
+    PREVIEW_MAX_AGE. 404 when the attachment type has no preview.
+    """
+    size = request.args.get('size', Config.PREVIEW_SIZES[0], type=int)
+    if size not in Config.PREVIEW_SIZES:
+        return jsonify({'error': f"size must be one of {', '.join(map(str, Config.PREVIEW_SIZES))}"}), 400
+    try:
+        result = load_attachment(attachment_id)
         if result is None:
             return jsonify({'error': 'Attachment not found'}), 404
-            
-        filename, content = result
         
-        # Determine content type based on file extension
-        import mimetypes
-        content_type, _ = mimetypes.guess_type(filename)
+        filename, digest, _, content = result
+        if digest is None and content is None:
+            return jsonify({'error': 'Attachment content was not kept, no preview available'}), 404
+        if digest is None:
+            digest = db_service.blob_store.digest(content)
         
-        if content_type is None:
-            content_type = 'application/octet-stream'
+        etag = f'{digest}-{size}'
+        if request.if_none_match.contains(etag):
+            return not_modified(etag, Config.PREVIEW_MAX_AGE)
         
-        return send_file(
-            io.BytesIO(content),
-            mimetype=content_type,
-            as_attachment=False,
-            download_name=filename
-        )
+        preview = preview_service.get(digest, filename, size, content)
+        if preview is None:
+            return jsonify({'error': 'No preview available for this attachment'}), 404
+        
+        path, mimetype = preview
+        response = send_file(path, mimetype=mimetype, etag=etag, conditional=True, max_age=Config.PREVIEW_MAX_AGE)
+        response.cache_control.public = False
+        response.cache_control.private = True
+        response.cache_control.immutable = True
+        return response
+    except FileNotFoundError:
+        return jsonify({'error': 'Attachment content missing from blob store'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def mailbox_health():
+    """Connection state and seconds since the last successful pass of every mailbox.
+    
+    Comes from the monitor when it runs in this process; otherwise (the web
+    server on its own) from the sync checkpoints of the configured mailboxes,
+    with the state unknown. A mailbox without a checkpoint has never synced.
+    """
+    trackers = [tracker for monitor in metrics.monitors() for tracker in monitor.trackers]
+    if trackers:
+        return [
+            {
+                'mailbox': tracker.target.name,
+                'status': tracker.get_status()['status'],
+                'last_poll_age': tracker.last_poll_age(),
+                'error_count': tracker.error_count,
+                'last_error': tracker.last_error
+            }
+            for tracker in trackers
+        ]
+    now = time.time()
+    # Checkpoints of folders no longer configured are left out
+    sync_times = dict(db_service.get_sync_times())
+    mailboxes = []
+    for target in load_targets():
+        last_sync_at = sync_times.get(target.state_key)
+        mailboxes.append({
+            'mailbox': target.name,
+            'status': 'unknown',
+            'last_poll_age': now - db_service.to_received_ts(last_sync_at) if last_sync_at else None
+        })
+    return mailboxes
+
 @email_bp.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'service': 'email-tracker'})
\ No newline at end of file
+    """Health check endpoint.
+    
+    ``unhealthy`` (503) when the database cannot be read; ``degraded`` when
+    no mailbox is configured, or one is disconnected or has not completed a
+    pass for HEALTH_MAX_POLL_AGE seconds.
+    """
+    try:
+        db_service.get_revision()  # the database answers
+        mailboxes = mailbox_health()
+    except Exception as e:
+        return jsonify({'status': 'unhealthy', 'service': 'email-tracker', 'error': str(e)}), 503
+    
+    ages = [mailbox['last_poll_age'] for mailbox in mailboxes if mailbox['last_poll_age'] is not None]
+    degraded = not mailboxes or any(
+        mailbox['status'] in ('disconnected', 'error')
+        or mailbox['last_poll_age'] is None
+        or mailbox['last_poll_age'] > Config.HEALTH_MAX_POLL_AGE
+        for mailbox in mailboxes
+    )
+    return jsonify({
+        'status': 'degraded' if degraded else 'healthy',
+        'service': 'email-tracker',
+        'last_poll_age': min(ages) if ages else None,
+        'mailboxes': mailboxes
+    })
+
+@email_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Counters and latency histograms in the Prometheus text format"""
+    if not Config.METRICS_ENABLED:
+        return jsonify({'error': 'Metrics are disabled (METRICS_ENABLED)'}), 404
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
\ No newline at end of file
@@ -0,0 +1,45 @@
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def parse_cursor(value):
+    """Parse a '<received_ts>,<id>' cursor, returns None when absent"""
+    if not value:
+        return None
+    ts, _, email_id = value.partition(',')
+    try:
+        return int(ts), int(email_id)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {value!r}")
+
+def encode_cursor(row):
+    """Build the cursor for the page following ``row`` (a get_emails_page row)"""
+    return f"{row[6]},{row[0]}"
+
+def parse_listing_args(args):
+    """Translate request args into DatabaseService.get_emails_page keyword arguments"""
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+
+    attachments = (args.get('has_attachment') or args.get('attachments') or '').lower()
+    has_attachment = None
+    if attachments in ('with', 'true', '1', 'yes'):
+        has_attachment = True
+    elif attachments in ('without', 'false', '0', 'no'):
+        has_attachment = False
+
+    return {
+        'before': parse_cursor(args.get('before')),
+        'limit': max(1, min(limit, MAX_PAGE_SIZE)),
+        'query': args.get('q') or None,
+        'sender': args.get('sender') or None,
+        'subject': args.get('subject') or None,
+        'has_attachment': has_attachment,
+        'account': args.get('account') or None,
+        'folder': args.get('folder') or None
+    }
+
+def next_cursor(rows, limit):
+    """Cursor for the next page, or None when this was the last page"""
+    return encode_cursor(rows[-1]) if len(rows) == limit else None
\ No newline at end of file
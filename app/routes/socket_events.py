@@ -0,0 +1,26 @@
+import re
+from flask_socketio import join_room, leave_room
+
+# stats: dashboard counters and monitor status, emails: new_emails frames, email:<id>: one email's body
+ROOM_PATTERN = re.compile(r'^(stats|emails|email:\d+)$')
+
+def _valid_rooms(data):
+    rooms = (data or {}).get('rooms') or []
+    return [room for room in rooms if isinstance(room, str) and ROOM_PATTERN.match(room)]
+
+def register_socket_events(socketio):
+    """Let clients subscribe to the event rooms of the views they have open"""
+    
+    @socketio.on('subscribe')
+    def subscribe(data):
+        rooms = _valid_rooms(data)
+        for room in rooms:
+            join_room(room)
+        return {'rooms': rooms}
+    
+    @socketio.on('unsubscribe')
+    def unsubscribe(data):
+        rooms = _valid_rooms(data)
+        for room in rooms:
+            leave_room(room)
+        return {'rooms': rooms}
\ No newline at end of file
@@ -1,6 +1,10 @@
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
 from app.services.db import DatabaseService
 from app.models.email_model import Email, Attachment
+from app.routes.pagination import parse_listing_args, next_cursor
+from app.services.http_cache import revision_cached
+from app.services.previews import PreviewService
+from app.services import email_index
 from app.config import Config
 
 web_bp = Blueprint('web', __name__)
@@ -11,18 +15,11 @@ def index():
     """Home page with dashboard"""
     try:
         # Get email statistics
-        email_rows = db_service.get_all_emails()
-        total_emails = len(email_rows)
-        emails_with_attachments = sum(1 for row in email_rows if row[4])  # has_attachment column
+        stats = email_index.get_stats(db_service)
         
         # Get recent emails (last 5)
-        recent_emails = email_rows[:5] if email_rows else []
-        
-        stats = {
-            'total_emails': total_emails,
-            'emails_with_attachments': emails_with_attachments,
-            'recent_emails_count': len(recent_emails)
-        }
+        recent_emails = email_index.get_emails_page(db_service, limit=5)
+        stats['recent_emails_count'] = len(recent_emails)
         
         return render_template('index.html', stats=stats, recent_emails=recent_emails)
     except Exception as e:
@@ -31,9 +28,10 @@ def index():
 
 @web_bp.route('/emails')
 def emails_page():
-    """Email list page"""
+    """Email list page (first page; further pages are loaded from /api/emails)"""
     try:
-        email_rows = db_service.get_all_emails()
+        listing_args = parse_listing_args(request.args)
+        email_rows = email_index.get_emails_page(db_service, **listing_args)
         
         emails = [
             Email(
@@ -42,41 +40,47 @@ def emails_page():
                 subject=row[2],
                 received_date=row[3],
                 has_attachment=row[4],
-                attachment_count=row[5]
+                attachment_count=row[5],
+                received_ts=row[6],
+                account=row[7],
+                folder=row[8]
             )
             for row in email_rows
         ]
         
-        return render_template('emails.html', emails=emails)
+        return render_template(
+            'emails.html',
+            emails=emails,
+            total_emails=email_index.get_stats(db_service)['total_emails'],
+            next_cursor=next_cursor(email_rows, listing_args['limit'])
+        )
     except Exception as e:
         flash(f'Error loading emails: {str(e)}', 'error')
-        return render_template('emails.html', emails=[])
+        return render_template('emails.html', emails=[], total_emails=0, next_cursor=None)
 
 @web_bp.route('/emails/<int:email_id>')
 def email_detail(email_id):
     """Email detail page"""
     try:
-        # Get email details
-        with db_service.get_connection() as conn:
-            c = conn.cursor()
-            c.execute('''
-                SELECT id, message_id, sender, subject, body, received_date, has_attachment
-                FROM emails WHERE id = ?
-            ''', (email_id,))
-            email_row = c.fetchone()
+        # Get email details (from the monthly archives once it is past the retention window)
+        email_row = db_service.get_email(email_id)
         
         if not email_row:
             flash('Email not found', 'error')
             return redirect(url_for('web.emails_page'))
         
+        # The body is stored compressed in its own table and only read here
+        body, body_html = db_service.get_email_body(email_id)
         email = Email(
             id=email_row[0],
             message_id=email_row[1],
             sender=email_row[2],
             subject=email_row[3],
-            body=email_row[4],
-            received_date=email_row[5],
-            has_attachment=email_row[6]
+            body=body,
+            html=body_html,
+            received_date=email_row[4],
+            has_attachment=email_row[5],
+            body_status=email_row[6]
         )
         
         # Get attachments if any
@@ -84,7 +88,8 @@ def email_detail(email_id):
         if email.has_attachment:
             attachment_rows = db_service.get_email_attachments(email_id)
             attachments = [
-                Attachment(id=row[0], filename=row[1], email_id=email_id)
+                Attachment(id=row[0], filename=row[1], email_id=email_id, size=row[2], stored=bool(row[3]),
+                           preview=PreviewService.kind(row[1]) if row[3] else None)
                 for row in attachment_rows
             ]
         
@@ -94,16 +99,24 @@ def email_detail(email_id):
         return redirect(url_for('web.emails_page'))
 
 @web_bp.route('/stats')
+@revision_cached(db_service)
 def get_stats():
     """API endpoint for live stats (for AJAX updates)"""
     try:
-        email_rows = db_service.get_all_emails()
-        total_emails = len(email_rows)
-        emails_with_attachments = sum(1 for row in email_rows if row[4])
+        stats = email_index.get_stats(db_service)
         
         return jsonify({
-            'total_emails': total_emails,
-            'emails_with_attachments': emails_with_attachments,
+            'total_emails': stats['total_emails'],
+            'emails_with_attachments': stats['emails_with_attachments'],
+            'archived_emails': sum(emails for _, emails, _ in db_service.get_archive_months()),
+            'top_senders': [
+                {'sender': sender, 'count': count}
+                for sender, count in db_service.get_sender_stats(limit=request.args.get('senders', 10, type=int))
+            ],
+            'daily_counts': [
+                {'day': day, 'count': count}
+                for day, count in db_service.get_daily_stats(days=request.args.get('days', 30, type=int))
+            ],
             'monitoring_status': 'Active',
             'last_updated': 'Just now'
         })
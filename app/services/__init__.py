@@ -1,4 +1,6 @@
 from .db import DatabaseService
 from .email_tracker import EmailTracker
+from .supervisor import MonitorSupervisor
+from .broadcaster import EventBroadcaster
 
-__all__ = ['DatabaseService', 'EmailTracker']
\ No newline at end of file
+__all__ = ['DatabaseService', 'EmailTracker', 'MonitorSupervisor', 'EventBroadcaster']
\ No newline at end of file
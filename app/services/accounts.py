@@ -0,0 +1,104 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from app.config import Config
+
+@dataclass(frozen=True)
+class Account:
+    """IMAP credentials of one monitored mailbox account"""
+    name: str
+    email_address: str
+    password: str = ''
+    server: str = 'imap.gmail.com'
+    port: int = 993
+    use_ssl: bool = True
+    folders: Tuple[str, ...] = ('INBOX',)
+    primary: bool = False
+
+@dataclass(frozen=True)
+class MailboxTarget:
+    """One (account, folder) pair watched by the monitor"""
+    account: Account
+    folder: str = 'INBOX'
+
+    @property
+    def name(self):
+        return f"{self.account.name}/{self.folder}"
+
+    @property
+    def legacy(self):
+        """The primary account's INBOX keeps the plain-UID keys of single-mailbox databases"""
+        return self.account.primary and self.folder == 'INBOX'
+
+    @property
+    def state_key(self):
+        """Key of this target's row in sync_state"""
+        return self.folder if self.legacy else self.name
+
+    def message_key(self, uid):
+        """Value stored in emails.message_id for ``uid`` (unique across targets)"""
+        return str(uid) if self.legacy else f"{self.name}/{uid}"
+
+    @staticmethod
+    def uid_from_key(message_key):
+        return message_key.rsplit('/', 1)[-1]
+
+def primary_account():
+    """The account configured through EMAIL_ADDRESS / EMAIL_PASSWORD / IMAP_*"""
+    return Account(
+        name=Config.EMAIL_ADDRESS or 'default',
+        email_address=Config.EMAIL_ADDRESS,
+        password=Config.EMAIL_PASSWORD,
+        server=Config.IMAP_SERVER,
+        port=Config.IMAP_PORT,
+        use_ssl=Config.IMAP_USE_SSL,
+        folders=tuple(Config.IMAP_FOLDERS),
+        primary=True
+    )
+
+def primary_target():
+    return MailboxTarget(primary_account(), 'INBOX')
+
+def _account_from_entry(entry):
+    email_address = entry['email']
+    password = entry.get('password')
+    if password is None and entry.get('password_env'):
+        password = os.getenv(entry['password_env'], '')
+    return Account(
+        name=entry.get('name') or email_address,
+        email_address=email_address,
+        password=password or '',
+        server=entry.get('server', Config.IMAP_SERVER),
+        port=int(entry.get('port', Config.IMAP_PORT)),
+        use_ssl=bool(entry.get('use_ssl', Config.IMAP_USE_SSL)),
+        folders=tuple(entry.get('folders') or ('INBOX',)),
+        # The account that used to be configured alone keeps its existing keys
+        primary=email_address == Config.EMAIL_ADDRESS
+    )
+
+def load_accounts(path: Optional[str] = None):
+    """Load the monitored accounts.
+
+    ``ACCOUNTS_FILE`` points to a JSON list of objects with ``email``,
+    ``password`` (or ``password_env``), and optionally ``name``, ``server``,
+    ``port``, ``use_ssl`` and ``folders``. Without it the single account from
+    the EMAIL_ADDRESS settings is monitored.
+    """
+    path = path or Config.ACCOUNTS_FILE
+    if not path:
+        return [primary_account()]
+
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    accounts = [_account_from_entry(entry) for entry in entries]
+
+    names = [account.name for account in accounts]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"Duplicate account names in {path}: {', '.join(sorted(duplicates))}")
+    return accounts
+
+def load_targets(path: Optional[str] = None):
+    """Every (account, folder) pair to monitor"""
+    return [MailboxTarget(account, folder) for account in load_accounts(path) for folder in account.folders]
\ No newline at end of file
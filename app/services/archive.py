@@ -0,0 +1,297 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from app.config import Config
+from app.services.db import DatabaseService
+from app.services import http_cache, email_index, metrics
+
+class EmailArchiver:
+    """Moves emails older than ARCHIVE_AFTER_DAYS out of the database into one SQLite file per month.
+
+    The database then only holds the retention window, so its size stays
+    bounded however old the mailbox gets. Archive files have the same
+    schema (bodies stay compressed, the search index is copied over) and
+    keep the email and attachment ids: /emails/<id>, attachment links and
+    search reach archived mail through ``DatabaseService``, which opens the
+    archive files read-only when a lookup needs them. Listings and totals
+    only cover the database.
+
+    Emails move in batches of ARCHIVE_BATCH_SIZE. Each batch is copied into
+    its archive and committed there, then deleted here in one short write
+    transaction, so ingest never waits long for the lock. A batch
+    interrupted between the two commits is copied again on the next pass
+    (rows the archive already has are skipped). A message ingested again
+    after its month was archived is dropped on its next move.
+
+    With ARCHIVE_DROP_ATTACHMENTS the archive keeps only attachment
+    metadata and payloads no other email refers to are deleted from the
+    blob store. ARCHIVE_RETENTION_MONTHS deletes whole archive files past
+    that age. The totals only count the database, but archived emails stay
+    in the sender and daily counts until their file expires. Emails still waiting for their body (two-phase fetch) stay
+    until it has arrived.
+    """
+
+    BATCH_PAUSE = 0.1  # seconds between batches, so ingest gets the write lock in between
+
+    def __init__(self, db_service=None, after_days=None, drop_attachments=None, retention_months=None,
+                 batch_size=None):
+        self.db_service = db_service or DatabaseService()
+        self.after_days = Config.ARCHIVE_AFTER_DAYS if after_days is None else after_days
+        self.drop_attachments = Config.ARCHIVE_DROP_ATTACHMENTS if drop_attachments is None else drop_attachments
+        self.retention_months = Config.ARCHIVE_RETENTION_MONTHS if retention_months is None else retention_months
+        self.batch_size = batch_size or Config.ARCHIVE_BATCH_SIZE
+        self._stopped = threading.Event()
+
+    @property
+    def enabled(self):
+        return self.after_days > 0 or self.retention_months > 0
+
+    def start(self):
+        """Run a pass now and then every ARCHIVE_INTERVAL seconds, in a background thread"""
+        self._stopped.clear()
+        threading.Thread(target=self._run, name='archiver', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                moved, expired = self.run_once()
+                if moved or expired:
+                    print(f"✓ {moved} emails archived, {len(expired)} expired archive files deleted")
+            except Exception as e:
+                print(f"✗ Error archiving emails: {str(e)}")
+            self._stopped.wait(Config.ARCHIVE_INTERVAL)
+
+    def run_once(self, now=None, progress=None):
+        """Archive what is past the retention window and delete expired archive files.
+
+        ``progress`` is called with (moved, month) after each batch.
+        Returns (moved, expired months).
+        """
+        now = now or datetime.now(Config.TIMEZONE)
+        moved = self.archive_before(now - timedelta(days=self.after_days), progress) if self.after_days > 0 else 0
+        expired = self.expire_archives(now) if self.retention_months > 0 else []
+        if moved:
+            http_cache.invalidate(self.db_service)
+            email_index.refresh()
+        return moved, expired
+
+    def archive_before(self, cutoff, progress=None):
+        """Move every email received before ``cutoff`` to its month's archive, returns how many moved"""
+        offset = int(Config.TIMEZONE.utcoffset(None).total_seconds())
+        moved = 0
+        while not self._stopped.is_set():
+            with self.db_service.get_connection() as conn:
+                c = conn.cursor()
+                c.execute('''
+                    SELECT id, strftime('%Y-%m', received_ts + ?, 'unixepoch')
+                    FROM emails
+                    WHERE received_ts > 0 AND received_ts < ? AND body_status != 'pending'
+                    ORDER BY received_ts, id
+                    LIMIT ?
+                ''', (offset, int(cutoff.timestamp()), self.batch_size))
+                rows = c.fetchall()
+            if not rows:
+                break
+            by_month = {}
+            for email_id, month in rows:
+                by_month.setdefault(month, []).append(email_id)
+            for month, ids in sorted(by_month.items()):
+                self._move(month, ids)
+                moved += len(ids)
+                metrics.EMAILS_ARCHIVED.inc(len(ids))
+                if progress:
+                    progress(moved, month)
+            time.sleep(self.BATCH_PAUSE)
+        return moved
+
+    def _move(self, month, ids):
+        """Copy the emails ``ids`` into the month's archive, then delete them from the database"""
+        marks = ','.join('?' * len(ids))
+        with self.db_service.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f'''
+                SELECT id, message_id, sender, subject, body, received_date, has_attachment,
+                       body_status, account, folder, received_ts
+                FROM emails WHERE id IN ({marks})
+            ''', ids)
+            emails = c.fetchall()
+            c.execute(f'SELECT email_id, dictionary_id, text, html FROM email_bodies WHERE email_id IN ({marks})', ids)
+            bodies = c.fetchall()
+            c.execute(f'''
+                SELECT id, email_id, filename, content, sha256, size
+                FROM attachments WHERE email_id IN ({marks})
+            ''', ids)
+            attachments = c.fetchall()
+            c.execute(f'SELECT rowid, sender, subject, body FROM emails_fts WHERE rowid IN ({marks})', ids)
+            search_rows = c.fetchall()
+            # The archive carries the dictionaries its bodies were compressed with
+            dictionary_ids = sorted({row[1] for row in bodies if row[1] is not None})
+            c.execute(f'''
+                SELECT id, data, samples, created_at
+                FROM body_dictionaries WHERE id IN ({','.join('?' * len(dictionary_ids))})
+            ''', dictionary_ids)
+            dictionaries = c.fetchall()
+
+        dropped = []
+        if self.drop_attachments:
+            dropped = [row[4] for row in attachments if row[4]]
+            attachments = [
+                (attachment_id, email_id, filename, None, None, size if size is not None else len(content or b''))
+                for attachment_id, email_id, filename, content, _, size in attachments
+            ]
+
+        archive = self._open_archive(month)
+        try:
+            c = archive.cursor()
+            c.execute('BEGIN IMMEDIATE')
+            c.executemany('''
+                INSERT OR IGNORE INTO body_dictionaries (id, data, samples, created_at)
+                VALUES (?, ?, ?, ?)
+            ''', dictionaries)
+            c.executemany('''
+                INSERT OR IGNORE INTO emails (id, message_id, sender, subject, body, received_date, has_attachment,
+                                              body_status, account, folder, received_ts)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', emails)
+            # A message the archive already holds under another id is not copied again
+            c.execute(f'SELECT id FROM emails WHERE id IN ({marks})', ids)
+            kept = {row[0] for row in c.fetchall()}
+            c.executemany('''
+                INSERT OR IGNORE INTO email_bodies (email_id, dictionary_id, text, html)
+                VALUES (?, ?, ?, ?)
+            ''', [row for row in bodies if row[0] in kept])
+            c.executemany('''
+                INSERT OR IGNORE INTO attachments (id, email_id, filename, content, sha256, size)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [row for row in attachments if row[1] in kept])
+            c.execute(f'DELETE FROM emails_fts WHERE rowid IN ({marks})', ids)
+            c.executemany('''
+                INSERT INTO emails_fts (rowid, sender, subject, body)
+                VALUES (?, ?, ?, ?)
+            ''', [row for row in search_rows if row[0] in kept])
+            c.execute("SELECT value FROM stats_counters WHERE name = 'total_emails'")
+            total = c.fetchone()[0]
+            c.execute('SELECT MIN(id), MAX(id) FROM emails')
+            email_range = c.fetchone()
+            c.execute('SELECT MIN(id), MAX(id) FROM attachments')
+            attachment_range = c.fetchone()
+            archive.commit()
+        except Exception:
+            archive.rollback()
+            raise
+        finally:
+            archive.close()
+
+        with self.db_service.get_connection() as conn:
+            c = conn.cursor()
+            try:
+                c.execute('BEGIN IMMEDIATE')
+                c.execute(f'DELETE FROM emails_fts WHERE rowid IN ({marks})', ids)
+                c.execute(f'DELETE FROM email_bodies WHERE email_id IN ({marks})', ids)
+                c.execute(f'DELETE FROM attachments WHERE email_id IN ({marks})', ids)
+                # Copies the archive already had are dropped as duplicates and leave the charts
+                dropped_ids = [email_id for email_id in ids if email_id not in kept]
+                c.execute(f"DELETE FROM emails WHERE id IN ({','.join('?' * len(dropped_ids))})", dropped_ids)
+                # Moved emails keep counting in sender_stats and daily_stats (see _create_stats_triggers)
+                c.execute("INSERT INTO stats_counters (name, value) VALUES ('archive_move', 1)")
+                c.execute(f'DELETE FROM emails WHERE id IN ({marks})', ids)
+                c.execute("DELETE FROM stats_counters WHERE name = 'archive_move'")
+                c.execute('''
+                    INSERT INTO archive_months (month, emails, min_email_id, max_email_id,
+                                                min_attachment_id, max_attachment_id, archived_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(month) DO UPDATE SET
+                        emails = excluded.emails,
+                        min_email_id = excluded.min_email_id,
+                        max_email_id = excluded.max_email_id,
+                        min_attachment_id = excluded.min_attachment_id,
+                        max_attachment_id = excluded.max_attachment_id,
+                        archived_at = excluded.archived_at
+                ''', (month, total) + email_range + attachment_range
+                      + (datetime.now(Config.TIMEZONE).strftime('%d-%m-%Y %H:%M:%S'),))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        if dropped:
+            self.delete_unreferenced_blobs(dropped)
+
+    def _open_archive(self, month):
+        """Write connection to a month's archive file, created with the database schema on first use"""
+        path = self.db_service.archive_path(month)
+        if not os.path.exists(path):
+            # Built under a temporary name, so a half-created file is never taken for an archive
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp'
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(tmp_path + suffix):
+                    os.remove(tmp_path + suffix)
+            archive = DatabaseService(tmp_path, blob_store=self.db_service.blob_store)
+            archive.init_database()
+            archive.pool.close_all()
+            conn = sqlite3.connect(tmp_path)
+            # A rollback journal rather than WAL: archives are read through read-only connections
+            conn.execute('PRAGMA journal_mode=DELETE')
+            conn.close()
+            os.replace(tmp_path, path)
+        return sqlite3.connect(path, timeout=Config.SQLITE_BUSY_TIMEOUT)
+
+    def expire_archives(self, now=None):
+        """Delete the archive files of months more than ARCHIVE_RETENTION_MONTHS ago, returns those months"""
+        now = now or datetime.now(Config.TIMEZONE)
+        index = now.year * 12 + now.month - 1 - self.retention_months
+        oldest_kept = f'{index // 12:04d}-{index % 12 + 1:02d}'
+        expired = [month for month, _, _ in self.db_service.get_archive_months() if month < oldest_kept]
+        for month in expired:
+            with self.db_service.archive_connection(month) as conn:
+                digests = [row[0] for row in conn.execute('SELECT DISTINCT sha256 FROM attachments WHERE sha256 IS NOT NULL')]
+                senders, days = self.db_service.count_stats(conn)
+            # Lookups stop going to the file before it is removed
+            with self.db_service.get_connection() as conn:
+                conn.execute('DELETE FROM archive_months WHERE month = ?', (month,))
+                # Gone for good now, so out of the sender and daily counts too
+                self.db_service.add_stats(conn.cursor(), senders, days, sign=-1)
+                conn.commit()
+            os.remove(self.db_service.archive_path(month))
+            self.delete_unreferenced_blobs(digests)
+        return expired
+
+    def delete_unreferenced_blobs(self, digests, chunk_size=500):
+        """Delete the payloads no email in the database or an archive refers to, returns how many were deleted.
+        
+        The database is checked and the files deleted under its write lock:
+        ingest stores payloads before taking that lock and checks them again
+        once it holds it (DatabaseService._ensure_blobs), so a payload it is
+        about to refer to is either seen here or put back there.
+        """
+        digests = set(digests)
+        for month, _, _ in self.db_service.get_archive_months():
+            if not digests:
+                return 0
+            with self.db_service.archive_connection(month) as conn:
+                self._drop_referenced(conn, digests, chunk_size)
+        if not digests:
+            return 0
+        with self.db_service.get_connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            self._drop_referenced(conn, digests, chunk_size)
+            for digest in digests:
+                self.db_service.blob_store.delete(digest)
+            conn.commit()
+        return len(digests)
+
+    @staticmethod
+    def _drop_referenced(conn, digests, chunk_size):
+        """Remove from ``digests`` the ones an attachment row in ``conn`` refers to"""
+        pending = list(digests)
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            c = conn.execute(f"SELECT sha256 FROM attachments WHERE sha256 IN ({','.join('?' * len(chunk))})", chunk)
+            digests.difference_update(row[0] for row in c.fetchall())
\ No newline at end of file
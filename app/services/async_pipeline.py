@@ -0,0 +1,319 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from app.config import Config
+from app.services import http_cache, email_index, metrics
+from app.services.supervisor import MonitorSupervisor
+from app.services.sync_engine import fetch_messages
+
+STOP = ('stop', None, None)
+
+class AsyncIngestPipeline(MonitorSupervisor):
+    """Asyncio ingestion engine: fetch -> parse -> dedup -> persist -> notify.
+
+    The stages are coroutines connected by bounded ``asyncio.Queue``s, so the
+    IMAP transfer of one chunk, MIME parsing of the previous one and the
+    SQLite write of the one before that overlap. When the database falls
+    behind the queues fill up and the fetchers wait instead of buffering the
+    mailbox in memory. Persist takes whatever is queued (up to
+    ``PIPELINE_BATCH_SIZE``) into a single transaction.
+
+    Blocking imap_tools and sqlite3 calls run on a thread pool. At most
+    ``MONITOR_POOL_SIZE`` mailboxes fetch at once; mailboxes are polled at
+    the interval of their ``PollScheduler`` (this engine does not use IDLE).
+    Selected with ``INGEST_ENGINE=asyncio``.
+
+    Messages are always fetched whole. With TWO_PHASE_FETCH the shared
+    ``BodyFetcher`` still runs, to complete the emails the threaded engine
+    left ``pending``.
+    """
+
+    def __init__(self, socketio=None, targets=None, pool_size=None, queue_size=None, batch_size=None,
+                 fetch_chunk=None):
+        super().__init__(socketio=socketio, targets=targets, pool_size=pool_size)
+        self.queue_size = queue_size or Config.PIPELINE_QUEUE_SIZE
+        self.batch_size = batch_size or Config.PIPELINE_BATCH_SIZE
+        self.fetch_chunk = fetch_chunk or Config.PIPELINE_FETCH_CHUNK
+        self._loop = None
+        self._thread = None
+        self._stopped = None
+        self._failed = set()  # trackers with a message that failed to parse or save in the current pass
+
+    def start_monitoring(self):
+        """Run the pipeline on its own event loop thread"""
+        self._running = True
+        metrics.register_monitor(self)
+        if self.broadcaster:
+            self.broadcaster.start()
+        self._thread = threading.Thread(target=self._run_loop, name='ingest-pipeline', daemon=True)
+        self._thread.start()
+        if Config.TWO_PHASE_FETCH:
+            self.body_fetcher.start()
+        if self.archiver.enabled:
+            self.archiver.start()
+        print(f"✓ Email monitoring started (asyncio pipeline, {len(self.trackers)} mailboxes, "
+              f"{self.pool_size} concurrent fetches)")
+
+    def stop_monitoring(self):
+        """Stop fetching, flush the queued messages and log out"""
+        self._running = False
+        self.body_fetcher.stop()
+        self.archiver.stop()
+        if self._loop is not None and self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+        for tracker in self.trackers:
+            tracker.disconnect()
+        if self.broadcaster:
+            self.broadcaster.stop()
+        metrics.unregister_monitor(self)
+        print("✓ Email monitoring stopped")
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self.run())
+        finally:
+            self._loop.close()
+
+    async def run(self):
+        """Run every stage until ``stop_monitoring`` is called"""
+        loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        if not self._running:
+            return
+        # Fetchers, plus one thread each for parse, dedup, persist and notify
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.pool_size + 4, thread_name_prefix='pipeline'))
+
+        parse_queue = asyncio.Queue(self.queue_size)
+        dedup_queue = asyncio.Queue(self.queue_size)
+        persist_queue = asyncio.Queue(self.queue_size)
+        notify_queue = asyncio.Queue(self.queue_size)
+        fetch_slots = asyncio.Semaphore(self.pool_size)
+
+        stages = [
+            asyncio.create_task(self._parse(parse_queue, dedup_queue)),
+            asyncio.create_task(self._dedup(dedup_queue, persist_queue)),
+            asyncio.create_task(self._persist(persist_queue, notify_queue)),
+            asyncio.create_task(self._notify(notify_queue))
+        ]
+        fetchers = [
+            asyncio.create_task(self._fetch_loop(tracker, parse_queue, fetch_slots))
+            for tracker in self.trackers
+        ]
+
+        await self._stopped.wait()
+        for task in fetchers:
+            task.cancel()
+        await asyncio.gather(*fetchers, return_exceptions=True)
+        # Let the stages drain what was already fetched
+        await parse_queue.put(STOP)
+        await asyncio.gather(*stages)
+        await loop.shutdown_default_executor()
+
+    async def _sleep(self, delay):
+        """Sleep for ``delay`` seconds, returns True when the pipeline is stopping"""
+        try:
+            await asyncio.wait_for(self._stopped.wait(), timeout=delay)
+            return True
+        except asyncio.TimeoutError:
+            return not self._running
+
+    @staticmethod
+    async def _run(func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    @staticmethod
+    async def _take_batch(queue, limit):
+        """Wait for one item, then take whatever else is already queued (up to ``limit``)"""
+        batch = [await queue.get()]
+        while len(batch) < limit and not queue.empty():
+            batch.append(queue.get_nowait())
+        return batch
+
+    # Stage 1: fetch
+
+    async def _fetch_loop(self, tracker, outbox, slots):
+        if tracker.last_check_time is None:
+            tracker.last_check_time = await self._run(tracker.get_last_email_date)
+        while self._running:
+            previous_status = tracker.get_status()['status']
+            async with slots:
+                done = await self._fetch_pass(tracker, outbox)
+            # The next pass starts once this one is persisted and checkpointed
+            ok = done is not None and await done and tracker.is_connected
+            delay = tracker.scheduler.delay if ok else tracker.record_failure()
+            if tracker.get_status()['status'] != previous_status:
+                self.emit_update('stats_update', await self._run(self.get_current_stats))
+            if await self._sleep(delay):
+                return
+
+    async def _fetch_pass(self, tracker, outbox):
+        """Queue every new message of one mailbox, returns a future resolved when they are persisted"""
+        try:
+            if not await self._run(tracker.check_connection):
+                with metrics.POLL_STAGE_SECONDS.labels('connect').time():
+                    connected = await self._run(tracker.connect_to_imap)
+                if not connected:
+                    metrics.POLLS.labels(tracker.target.name, 'error').inc()
+                    return None
+
+            tracker.emit_update('status_update', {
+                'type': 'checking',
+                'status': 'checking',
+                'message': 'Checking for new emails...',
+                'last_check': tracker.last_check_time.strftime('%H:%M:%S')
+            })
+            uids = await self._run(tracker.sync_engine.pending_uids, tracker.mailbox, tracker.last_check_time)
+            if uids:
+                print(f"Found {len(uids)} new emails in {tracker.target.name}")
+            for start in range(0, len(uids), self.fetch_chunk):
+                messages = await self._run(self._fetch_chunk, tracker.mailbox, uids[start:start + self.fetch_chunk])
+                for msg in messages:
+                    await outbox.put(('message', tracker, msg))  # blocks while the pipeline is full
+        except Exception as e:
+            print(f"✗ Error fetching {tracker.target.name}: {str(e)}")
+            tracker.is_connected = False
+            tracker.last_error = f'Error fetching emails: {str(e)}'
+            tracker.emit_update('status_update', {
+                'type': 'error',
+                'status': 'error',
+                'message': tracker.last_error
+            })
+            tracker.sync_engine.mark_failed()
+
+        done = asyncio.get_running_loop().create_future()
+        await outbox.put(('done', tracker, done))
+        return done
+
+    def _fetch_chunk(self, mailbox, uids):
+        # Large messages are streamed to the blob store instead of being loaded whole
+        with metrics.POLL_STAGE_SECONDS.labels('fetch').time():
+            return fetch_messages(mailbox, uids, self.db_service.blob_store, mark_seen=True, bulk=True)
+
+    # Stage 2: parse
+
+    async def _parse(self, inbox, outbox):
+        while True:
+            kind, tracker, payload = item = await inbox.get()
+            if kind == 'message':
+                try:
+                    record = await self._run(tracker.build_email_record, payload)
+                except Exception as e:
+                    print(f"✗ Error parsing message {payload.uid} of {tracker.target.name}: {str(e)}")
+                    tracker.sync_engine.mark_failed()
+                    tracker.last_error = f'Error parsing message {payload.uid}: {str(e)}'
+                    self._failed.add(tracker)
+                    continue
+                item = ('record', tracker, record)
+            await outbox.put(item)
+            if item is STOP:
+                return
+
+    # Stage 3: dedup
+
+    async def _dedup(self, inbox, outbox):
+        while True:
+            batch = await self._take_batch(inbox, self.batch_size)
+            keys = [payload['message_id'] for kind, _, payload in batch if kind == 'record']
+            existing = await self._run(self.db_service.get_existing_message_ids, keys) if keys else set()
+            metrics.EMAILS_DUPLICATE.inc(len(existing))
+            for item in batch:
+                kind, tracker, payload = item
+                if kind == 'record' and payload['message_id'] in existing:
+                    # Already stored; persist advances the checkpoint past it in order with the saves
+                    item = ('duplicate', tracker, payload['uid'])
+                await outbox.put(item)
+                if item is STOP:
+                    return
+
+    # Stage 4: persist
+
+    async def _persist(self, inbox, outbox):
+        pass_saved = {}
+        failed = self._failed
+        while True:
+            batch = await self._take_batch(inbox, self.batch_size)
+            records = [(tracker, record) for kind, tracker, record in batch if kind == 'record']
+            if records:
+                try:
+                    with metrics.POLL_STAGE_SECONDS.labels('save').time():
+                        saved = await self._run(self.db_service.save_emails_batch, [record for _, record in records])
+                except Exception as e:
+                    print(f"✗ Error saving emails: {str(e)}")
+                    for tracker, _ in records:
+                        tracker.sync_engine.mark_failed()
+                        tracker.last_error = f'Error saving emails: {str(e)}'
+                        failed.add(tracker)
+                else:
+                    if saved:
+                        http_cache.invalidate(self.db_service)
+                        await self._run(email_index.refresh)
+                    await self._checkpoint(records, saved, failed, pass_saved, outbox)
+
+            for kind, tracker, payload in batch:
+                if kind == 'duplicate':
+                    # Moving last_uid past a message that failed earlier in the pass would skip it for good
+                    if tracker not in failed:
+                        tracker.sync_engine.last_uid = max(tracker.sync_engine.last_uid, int(payload))
+                elif kind == 'done':
+                    done = payload
+                    await self._finish_pass(tracker, pass_saved.pop(tracker, 0), tracker in failed)
+                    failed.discard(tracker)
+                    if not done.done():  # cancelled with its fetcher on shutdown
+                        done.set_result(True)
+                elif kind == 'stop':
+                    await outbox.put(STOP)
+                    return
+
+    async def _checkpoint(self, records, saved, failed, pass_saved, outbox):
+        by_tracker = {}
+        for tracker, record in records:
+            by_tracker.setdefault(tracker, []).append(record)
+        for tracker, tracker_records in by_tracker.items():
+            tracker_saved = {
+                record['message_id']: saved[record['message_id']]
+                for record in tracker_records if record['message_id'] in saved
+            }
+            pass_saved[tracker] = pass_saved.get(tracker, 0) + len(tracker_saved)
+            if tracker not in failed:
+                await self._run(tracker.sync_engine.checkpoint, tracker_records[-1]['uid'])
+            if tracker_saved:
+                await outbox.put(('saved', tracker, (tracker_records, tracker_saved)))
+
+    async def _finish_pass(self, tracker, saved_count, failed):
+        # A fetch error has already dropped the connection
+        ok = not failed and tracker.is_connected
+        metrics.POLLS.labels(tracker.target.name, 'ok' if ok else 'error').inc()
+        if failed:
+            tracker.is_connected = False
+        await self._run(tracker.sync_engine.complete)
+        if not ok:
+            # The error status stays up; _fetch_loop backs off and reports the retry
+            return
+        tracker.scheduler.record_success(saved_count)
+        tracker.connection_last_used = time.monotonic()
+        if not saved_count:
+            tracker.emit_update('status_update', {
+                'type': 'check_complete',
+                'status': 'active',
+                'message': 'No new emails found',
+                'schedule': tracker.scheduler.state()
+            })
+        tracker.last_poll_time = datetime.now(Config.TIMEZONE)
+        if Config.TWO_PHASE_FETCH:
+            # Pending rows that did not fit the body queue at startup
+            await self._run(self.body_fetcher.enqueue_pending)
+
+    # Stage 5: notify
+
+    async def _notify(self, inbox):
+        while True:
+            kind, tracker, payload = await inbox.get()
+            if kind == 'stop':
+                return
+            records, saved = payload
+            await self._run(tracker.announce_saved, records, saved)
\ No newline at end of file
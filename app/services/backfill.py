@@ -0,0 +1,239 @@
+import bisect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from imap_tools import AND
+from app.config import Config
+from app.services.db import DatabaseService
+from app.services.accounts import load_targets
+from app.services.email_tracker import EmailTracker
+from app.services.sync_engine import SyncEngine, open_mailbox, fetch_messages
+
+class BackfillProgress:
+    """Thread-safe counters of one mailbox's backfill with throughput and ETA"""
+
+    def __init__(self, mailbox, total_messages, total_chunks, done_messages=0):
+        self.mailbox = mailbox
+        self.total_messages = total_messages
+        self.total_chunks = total_chunks
+        self.done_messages = done_messages  # finished by earlier runs
+        self.messages = 0
+        self.saved = 0
+        self.bytes = 0
+        self.chunks = 0
+        self.failed_chunks = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, messages, saved, size):
+        with self._lock:
+            self.messages += messages
+            self.saved += saved
+            self.bytes += size
+            self.chunks += 1
+
+    def fail(self):
+        with self._lock:
+            self.failed_chunks += 1
+
+    def snapshot(self):
+        """Progress as sent in ``backfill_progress`` events"""
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started, 1e-6)
+            rate = self.messages / elapsed
+            remaining = self.total_messages - self.messages
+            if remaining <= 0:
+                eta = 0
+            else:
+                eta = round(remaining / rate) if rate else None
+            return {
+                'mailbox': self.mailbox,
+                'messages': self.messages,
+                'total_messages': self.total_messages,
+                'done_before': self.done_messages,
+                'saved': self.saved,
+                'bytes': self.bytes,
+                'chunks': self.chunks,
+                'failed_chunks': self.failed_chunks,
+                'total_chunks': self.total_chunks,
+                'elapsed_seconds': round(elapsed, 1),
+                'messages_per_sec': round(rate, 1),
+                'bytes_per_sec': round(self.bytes / elapsed),
+                'eta_seconds': eta,
+                'finished': self.chunks + self.failed_chunks >= self.total_chunks
+            }
+
+class Backfill:
+    """Resumable import of the messages already in a mailbox.
+
+    The live monitor only looks at new mail (``get_last_email_date`` starts a
+    fresh database one day back), so history is imported separately. The
+    folder's UIDs are listed, UIDs inside ranges finished by an earlier run
+    are dropped and the rest is split into chunks of ``chunk_size``, newest
+    first. Chunks are fetched on ``workers`` concurrent IMAP connections and
+    written with ``save_emails_batch``; each completed chunk is recorded in
+    ``backfill_chunks``. An interrupted run picks up where it stopped, and a
+    chunk fetched again after a crash is harmless because duplicates are
+    skipped on insert. Messages are not marked as seen.
+    """
+
+    def __init__(self, db_service=None, targets=None, workers=None, chunk_size=None, since=None, emit=None,
+                 report_interval=1.0):
+        self.db_service = db_service or DatabaseService()
+        self.targets = targets or load_targets()
+        self.workers = max(1, workers or Config.BACKFILL_WORKERS)
+        self.chunk_size = max(1, chunk_size or Config.BACKFILL_CHUNK_SIZE)
+        self.since = since
+        self.emit = emit
+        self.report_interval = report_interval
+        self._stopped = False
+        self._last_report = 0
+
+    def run(self):
+        """Backfill every target in turn, returns the final progress of each"""
+        return [self.backfill_target(target) for target in self.targets]
+
+    def stop(self):
+        """Let running chunks finish and skip the rest"""
+        self._stopped = True
+
+    def emit_update(self, event_type, data):
+        if self.emit:
+            self.emit(event_type, data)
+
+    @staticmethod
+    def _merge_ranges(rows):
+        """Sorted, non-overlapping (first_uid, last_uid) ranges"""
+        merged = []
+        for first_uid, last_uid in sorted((row[0], row[1]) for row in rows):
+            if merged and first_uid <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], last_uid)
+            else:
+                merged.append([first_uid, last_uid])
+        return merged
+
+    def plan(self, target, mailbox):
+        """Return (uidvalidity, uidnext, chunks, done_messages, max_uid); chunks are UID lists, newest first"""
+        uidvalidity, uidnext = SyncEngine(self.db_service, target).get_folder_status(mailbox)
+        criteria = AND(date_gte=self.since) if self.since else 'ALL'
+        uids = sorted(int(uid) for uid in mailbox.uids(criteria))
+
+        done_rows = self.db_service.get_backfill_chunks(target.name, uidvalidity)
+        done = self._merge_ranges(done_rows)
+        starts = [first_uid for first_uid, _ in done]
+        pending = []
+        for uid in uids:
+            index = bisect.bisect_right(starts, uid) - 1
+            if index < 0 or uid > done[index][1]:
+                pending.append(uid)
+
+        chunks = [pending[start:start + self.chunk_size] for start in range(0, len(pending), self.chunk_size)]
+        chunks.reverse()
+        return uidvalidity, uidnext, chunks, sum(row[2] for row in done_rows), uids[-1] if uids else 0
+
+    def backfill_target(self, target):
+        """Import the history of one mailbox, returns its final progress snapshot"""
+        self._stopped = False
+        mailbox = open_mailbox(target.folder, target.account)
+        try:
+            uidvalidity, uidnext, chunks, done_messages, max_uid = self.plan(target, mailbox)
+        finally:
+            mailbox.logout()
+
+        total = sum(len(chunk) for chunk in chunks)
+        progress = BackfillProgress(target.name, total, len(chunks), done_messages)
+        print(f"Backfilling {target.name}: {total} messages in {len(chunks)} chunks "
+              f"({done_messages} already imported), {self.workers} connections")
+
+        tracker = EmailTracker(target=target, db_service=self.db_service)
+        local = threading.local()
+        opened = []
+        opened_lock = threading.Lock()
+
+        def connection():
+            if getattr(local, 'mailbox', None) is None:
+                local.mailbox = open_mailbox(target.folder, target.account)
+                with opened_lock:
+                    opened.append(local.mailbox)
+            return local.mailbox
+
+        def reconnect():
+            mailbox = getattr(local, 'mailbox', None)
+            local.mailbox = None
+            if mailbox is not None:
+                try:
+                    mailbox.logout()
+                except Exception:
+                    pass
+
+        def run_chunk(uids):
+            if self._stopped:
+                return None
+            for attempt in range(1, Config.MAX_RETRIES + 1):
+                try:
+                    messages = fetch_messages(connection(), uids, self.db_service.blob_store, mark_seen=False, bulk=True)
+                    break
+                except Exception:
+                    reconnect()
+                    if attempt == Config.MAX_RETRIES:
+                        raise
+
+            saved = self.db_service.save_emails_batch([tracker.build_email_record(msg) for msg in messages])
+            size = sum(msg.size_rfc822 or msg.size for msg in messages)
+            self.db_service.save_backfill_chunk(
+                target.name, uidvalidity, uids[0], uids[-1], len(messages), size,
+                datetime.now(Config.TIMEZONE).strftime('%d-%m-%Y %H:%M:%S')
+            )
+            progress.add(len(uids), len(saved), size)
+            return len(saved)
+
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='backfill')
+        try:
+            futures = {executor.submit(run_chunk, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    chunk = futures[future]
+                    print(f"✗ Backfill of UIDs {chunk[0]}-{chunk[-1]} in {target.name} failed: {str(e)}")
+                    progress.fail()
+                self.report(progress)
+        except KeyboardInterrupt:
+            self.stop()
+            raise
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            for mailbox in opened:
+                try:
+                    mailbox.logout()
+                except Exception:
+                    pass
+
+        snapshot = progress.snapshot()
+        if not self._stopped and not snapshot['failed_chunks']:
+            self._hand_over(target, uidvalidity, uidnext, max_uid)
+        self.report(progress, force=True)
+        return snapshot
+
+    def _hand_over(self, target, uidvalidity, uidnext, max_uid):
+        """Give a mailbox the live monitor has never synced a checkpoint after the backfilled UIDs"""
+        if max_uid and self.db_service.get_sync_state(target.state_key) is None:
+            self.db_service.save_sync_state(
+                target.state_key, uidvalidity, max_uid, uidnext,
+                datetime.now(Config.TIMEZONE).strftime('%d-%m-%Y %H:%M:%S')
+            )
+
+    def report(self, progress, force=False):
+        """Print and emit progress, at most once per ``report_interval`` unless ``force``"""
+        now = time.monotonic()
+        if not force and now - self._last_report < self.report_interval:
+            return
+        self._last_report = now
+        snapshot = progress.snapshot()
+        eta = f"{snapshot['eta_seconds']}s" if snapshot['eta_seconds'] is not None else '-'
+        print(f"  {snapshot['mailbox']}: {snapshot['messages']}/{snapshot['total_messages']} messages "
+              f"({snapshot['chunks']}/{snapshot['total_chunks']} chunks), "
+              f"{snapshot['messages_per_sec']:.1f} msg/s, {snapshot['bytes_per_sec'] / 1024:.1f} KB/s, "
+              f"ETA {eta}")
+        self.emit_update('backfill_progress', snapshot)
\ No newline at end of file
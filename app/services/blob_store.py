@@ -0,0 +1,164 @@
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from app.config import Config
+
+class BlobStore(ABC):
+    """Interface for attachment payload storage, addressed by SHA-256 digest.
+
+    Identical payloads get the same digest, so an attachment forwarded in ten
+    emails is stored once. SQLite only keeps the digest and size. A backend
+    implements ``put``, ``open``, ``exists`` and ``delete``.
+    """
+
+    @abstractmethod
+    def put(self, content):
+        """Store ``content`` (bytes) and return its hex SHA-256 digest"""
+
+    def writer(self):
+        """A ``BlobWriter`` that stores a payload written in chunks"""
+        return BlobWriter(self)
+
+    @abstractmethod
+    def open(self, digest):
+        """Open a stored blob for binary reading"""
+
+    @abstractmethod
+    def exists(self, digest):
+        """Whether a blob is stored under ``digest``"""
+
+    @abstractmethod
+    def delete(self, digest):
+        """Remove a blob; deleting one that is not stored is not an error"""
+
+    def path(self, digest):
+        """Local filesystem path of a blob, or None if the store is not file-backed"""
+        return None
+
+    @staticmethod
+    def digest(content):
+        return hashlib.sha256(content).hexdigest()
+
+class BlobWriter:
+    """Incremental ``put``: ``write`` chunks, then ``commit`` (returns the digest) or ``abort``.
+
+    This fallback spools to a temporary file and hands the whole payload to
+    ``put`` on commit; file-backed stores write in place instead.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.size = 0
+        self._file = tempfile.TemporaryFile()
+
+    def write(self, data):
+        self._file.write(data)
+        self.size += len(data)
+
+    def commit(self):
+        self._file.seek(0)
+        try:
+            return self.store.put(self._file.read())
+        finally:
+            self._file.close()
+
+    def abort(self):
+        self._file.close()
+
+class FileSystemBlobWriter(BlobWriter):
+    """Writes to a temporary file under the store root, hashing as it goes, and renames it on commit"""
+
+    def __init__(self, store):
+        self.store = store
+        self.size = 0
+        self._hash = hashlib.sha256()
+        os.makedirs(store.root, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=store.root, prefix='.tmp-')
+        self._file = os.fdopen(fd, 'wb')
+
+    def write(self, data):
+        self._hash.update(data)
+        self._file.write(data)
+        self.size += len(data)
+
+    def commit(self):
+        self._file.close()
+        digest = self._hash.hexdigest()
+        path = self.store.path(digest)
+        try:
+            if os.path.exists(path):
+                os.unlink(self._tmp_path)  # already stored by another email
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(self._tmp_path, path)
+        except BaseException:
+            self.abort()
+            raise
+        return digest
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.unlink(self._tmp_path)
+
+class FileSystemBlobStore(BlobStore):
+    """Blobs as files under ``root/ab/cd/<sha256>``"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def put(self, content):
+        digest = self.digest(content)
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest  # already stored by another email
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file and rename, so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return digest
+
+    def writer(self):
+        return FileSystemBlobWriter(self)
+
+    def open(self, digest):
+        return open(self.path(digest), 'rb')
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def delete(self, digest):
+        try:
+            os.unlink(self.path(digest))
+        except FileNotFoundError:
+            pass
+
+BLOB_STORES = {
+    'filesystem': FileSystemBlobStore
+}
+
+def create_blob_store(db_path):
+    """Build the blob store selected by Config.BLOB_STORE.
+
+    Without BLOB_STORE_PATH the blobs live in an ``attachments`` directory
+    next to the database file.
+    """
+    root = Config.BLOB_STORE_PATH or os.path.join(os.path.dirname(os.path.abspath(db_path)), 'attachments')
+    try:
+        store_class = BLOB_STORES[Config.BLOB_STORE]
+    except KeyError:
+        raise ValueError(f"Unknown BLOB_STORE: {Config.BLOB_STORE!r}")
+    return store_class(root)
\ No newline at end of file
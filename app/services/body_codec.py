@@ -0,0 +1,88 @@
+import html as html_lib
+import re
+import zlib
+from collections import Counter
+
+DICTIONARY_SIZE = 32 * 1024  # the largest window deflate can reference
+MIN_SEGMENT = 6
+SEGMENT_BOUNDARY = re.compile(r'\n|(?<=>)')
+SCRIPT_OR_STYLE = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+TAG = re.compile(r'<[^>]+>')
+BLANK_LINES = re.compile(r'\n\s*\n\s*\n+')
+SPACES = re.compile(r'[ \t\r\f\v]+')
+
+class BodyCodec:
+    """Raw-deflate compression of message bodies with shared preset dictionaries.
+
+    Most mail repeats the same boilerplate: signatures, disclaimers, quoted
+    headers, newsletter markup. A preset dictionary built from those
+    fragments lets even a short body reference them instead of spelling them
+    out, which plain per-row compression cannot do. Dictionaries are stored
+    in the database and never change; each body records the id of the one it
+    was compressed with (None for no dictionary).
+    """
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def compress(self, value, dictionary=None):
+        """Compress a str (None stays None)"""
+        if value is None:
+            return None
+        if dictionary:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=dictionary)
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        return compressor.compress(value.encode('utf-8', 'surrogatepass')) + compressor.flush()
+
+    def decompress(self, data, dictionary=None):
+        if data is None:
+            return None
+        if dictionary:
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=dictionary)
+        else:
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        return (decompressor.decompress(data) + decompressor.flush()).decode('utf-8', 'surrogatepass')
+
+    @staticmethod
+    def train(samples, size=DICTIONARY_SIZE):
+        """Build a preset dictionary from the fragments (lines, markup) that recur across ``samples``.
+
+        Fragments are ranked by the bytes they would save (occurrences x
+        length); the most valuable go last because deflate reaches the end of
+        the dictionary with the shortest distances.
+        """
+        counts = Counter()
+        for sample in samples:
+            if sample:
+                counts.update({
+                    segment for segment in SEGMENT_BOUNDARY.split(sample)
+                    if len(segment.strip()) >= MIN_SEGMENT
+                })
+        ranked = sorted(
+            ((count * len(segment), segment) for segment, count in counts.items() if count > 1),
+            reverse=True
+        )
+        chosen = []
+        used = 0
+        for _, segment in ranked:
+            encoded = segment.encode('utf-8', 'surrogatepass') + b'\n'
+            if used + len(encoded) > size:
+                continue
+            chosen.append(encoded)
+            used += len(encoded)
+        return b''.join(reversed(chosen))
+
+def html_to_text(value):
+    """Plain text of an HTML body, for search and for messages without a text part"""
+    if not value:
+        return value
+    text = SCRIPT_OR_STYLE.sub(' ', value)
+    text = re.sub(r'<br\s*/?>|</(p|div|tr|li|h\d)>', '\n', text, flags=re.IGNORECASE)
+    text = html_lib.unescape(TAG.sub(' ', text))
+    text = SPACES.sub(' ', text)
+    return BLANK_LINES.sub('\n\n', '\n'.join(line.strip() for line in text.splitlines())).strip()
+
+def search_text(text, html):
+    """Body text indexed for full-text search"""
+    return text or html_to_text(html)
\ No newline at end of file
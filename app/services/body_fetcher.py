@@ -0,0 +1,115 @@
+import queue
+import threading
+import time
+from app.config import Config
+from app.services.sync_engine import open_mailbox, fetch_messages
+from app.services.accounts import MailboxTarget, primary_target
+from app.services import http_cache, metrics
+
+class BodyFetcher:
+    """Background queue that downloads bodies and attachments of header-only emails.
+
+    The monitor thread only transfers headers and BODYSTRUCTURE so it can emit
+    ``new_email`` straight away; the slow bytes are pulled here on separate
+    IMAP connections. The queue is bounded: when it is full the email simply
+    stays ``pending`` in the database and is picked up by ``enqueue_pending``.
+    One fetcher serves every monitored mailbox; workers keep one connection
+    per mailbox they have downloaded from.
+    """
+
+    def __init__(self, db_service, targets=None, emit=None, workers=None, queue_size=None):
+        self.db_service = db_service
+        self.targets = {(target.account.name, target.folder): target for target in targets or [primary_target()]}
+        self.emit = emit
+        self.workers = workers or Config.BODY_FETCH_WORKERS
+        self.queue = queue.Queue(maxsize=queue_size or Config.BODY_QUEUE_SIZE)
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self):
+        """Start the worker threads"""
+        self._running = True
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'body-fetcher-{index}', daemon=True)
+            thread.start()
+        self.enqueue_pending()
+
+    def stop(self):
+        self._running = False
+
+    def enqueue(self, email_id, uid, target=None):
+        """Queue a body download, returns False when the queue is full"""
+        with self._lock:
+            if email_id in self._queued:
+                return True
+            try:
+                self.queue.put_nowait((email_id, uid, target or primary_target()))
+            except queue.Full:
+                return False
+            self._queued.add(email_id)
+            return True
+
+    def enqueue_pending(self):
+        """Queue pending emails from the database (after restarts or a full queue)"""
+        free_slots = self.queue.maxsize - self.queue.qsize()
+        if free_slots <= 0:
+            return
+        for email_id, message_key, account, folder in self.db_service.get_pending_bodies(limit=free_slots):
+            target = self.targets.get((account, folder))
+            if target is None:
+                continue  # mailbox no longer monitored
+            if not self.enqueue(email_id, MailboxTarget.uid_from_key(message_key), target):
+                break
+
+    def _worker(self):
+        mailboxes = {}
+        while self._running:
+            try:
+                email_id, uid, target = self.queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                mailbox = mailboxes.get(target.name)
+                if mailbox is None:
+                    mailbox = mailboxes[target.name] = open_mailbox(target.folder, target.account)
+                self.fetch_body(mailbox, email_id, uid)
+            except Exception as e:
+                # Leave the email pending; it is re-queued on the next sweep
+                print(f"✗ Error fetching body for email {email_id} ({target.name}): {str(e)}")
+                mailboxes.pop(target.name, None)
+                time.sleep(1)
+            finally:
+                with self._lock:
+                    self._queued.discard(email_id)
+                self.queue.task_done()
+        for mailbox in mailboxes.values():
+            try:
+                mailbox.logout()
+            except Exception:
+                pass
+
+    def fetch_body(self, mailbox, email_id, uid):
+        """Download one message and store its body and attachments"""
+        with metrics.POLL_STAGE_SECONDS.labels('body').time():
+            messages = fetch_messages(mailbox, [uid], self.db_service.blob_store)
+        if not messages:
+            # Message vanished from the server before we got to it
+            self.db_service.complete_email_body(email_id, None, [], body_status='missing')
+            http_cache.invalidate(self.db_service)
+            return
+
+        msg = messages[0]
+        attachments = [(att.filename, att.payload) for att in msg.attachments]
+        stored_attachments = getattr(msg, 'stored_attachments', [])
+        self.db_service.complete_email_body(
+            email_id, msg.text, attachments, html=msg.html, stored_attachments=stored_attachments
+        )
+        http_cache.invalidate(self.db_service)
+
+        if self.emit:
+            self.emit('email_body_ready', {
+                'id': email_id,
+                'has_attachment': bool(attachments or stored_attachments),
+                'attachment_count': len(attachments) + len(stored_attachments)
+            })
\ No newline at end of file
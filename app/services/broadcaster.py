@@ -0,0 +1,123 @@
+import threading
+from app.config import Config
+from app.services import metrics
+
+# Events where only the newest value matters, keyed by this payload field (None: one value overall)
+COLLAPSED_EVENTS = {
+    'stats_update': None,
+    'status_update': 'mailbox',
+    'backfill_progress': 'mailbox'
+}
+
+def event_room(event_type, data):
+    """Room an event is delivered to; clients join the rooms of the views they have open"""
+    if event_type == 'new_email':
+        return 'emails'
+    if event_type == 'email_body_ready':
+        return f"email:{data['id']}"
+    return 'stats'
+
+class EventBroadcaster:
+    """Coalesces WebSocket events and sends them from a background thread.
+
+    ``emit`` only buffers, so ingest threads never wait on socket writes. The
+    sender thread flushes at most once per ``interval`` seconds:
+    ``new_email`` events are sent as one ``new_emails`` frame (up to
+    ``max_batch`` emails, the rest follows in the next frame),
+    ``stats_update`` and ``status_update`` collapse to their newest value
+    (per mailbox) and other events are passed on in order. Every event goes
+    to its ``event_room``. Has the ``emit(event, data)`` signature of
+    ``SocketIO`` so it can be used in its place.
+    """
+
+    def __init__(self, socketio, interval=None, max_batch=None):
+        self.socketio = socketio
+        self.interval = Config.BROADCAST_INTERVAL if interval is None else interval
+        self.max_batch = max_batch or Config.BROADCAST_MAX_BATCH
+        self._new_emails = []
+        self._latest = {}  # (event, key) -> newest data, in order of last update
+        self._events = []
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.frames_sent = 0
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='broadcaster', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the sender thread and send whatever is still buffered"""
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        while self._pending():
+            self.flush()
+
+    def emit(self, event_type, data, room=None):
+        """Buffer an event for the next flush"""
+        with self._condition:
+            if event_type == 'new_email' and room is None:
+                self._new_emails.append(data)
+            elif event_type in COLLAPSED_EVENTS and room is None:
+                field = COLLAPSED_EVENTS[event_type]
+                key = (event_type, data.get(field) if field else None)
+                self._latest.pop(key, None)
+                self._latest[key] = data
+            else:
+                self._events.append((event_type, data, room))
+            metrics.WEBSOCKET_BACKLOG.set(self._backlog())
+            self._condition.notify()
+
+    def _pending(self):
+        return bool(self._new_emails or self._latest or self._events)
+
+    def _backlog(self):
+        return len(self._new_emails) + len(self._latest) + len(self._events)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            with self._condition:
+                while not self._pending() and not self._stopped.is_set():
+                    self._condition.wait()
+            if self._stopped.is_set():
+                return
+            self.flush()
+            # Rate limit: whatever arrives meanwhile goes out in the next frame
+            self._stopped.wait(self.interval)
+
+    def flush(self):
+        """Send the buffered events now"""
+        with self._condition:
+            new_emails = self._new_emails[:self.max_batch]
+            del self._new_emails[:self.max_batch]
+            latest = self._latest
+            self._latest = {}
+            events = self._events
+            self._events = []
+            metrics.WEBSOCKET_BACKLOG.set(self._backlog())
+
+        stats = latest.pop(('stats_update', None), None)
+        for (event_type, _), data in latest.items():
+            self._send(event_type, data, event_room(event_type, data))
+        for event_type, data, room in events:
+            self._send(event_type, data, room or event_room(event_type, data))
+        if new_emails:
+            self._send('new_emails', {'emails': new_emails, 'count': len(new_emails)}, 'emails')
+        if stats is not None:
+            # Last, so the counters already include the emails above
+            self._send('stats_update', stats, 'stats')
+
+    def _send(self, event_type, data, room):
+        try:
+            with metrics.WEBSOCKET_EMIT_SECONDS.time():
+                self.socketio.emit(event_type, data, to=room)
+            self.frames_sent += 1
+            metrics.WEBSOCKET_FRAMES.labels(event_type).inc()
+        except Exception as e:
+            print(f"✗ Error emitting {event_type}: {str(e)}")
\ No newline at end of file
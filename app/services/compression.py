@@ -0,0 +1,79 @@
+import gzip
+import zlib
+from app.config import Config
+
+try:
+    import brotli
+except ImportError:  # optional: without it responses are gzip-compressed only
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/html', 'text/plain'}
+
+def negotiate(accept_encodings):
+    """Content coding for a request's ``Accept-Encoding``: 'br', 'gzip' or None (identity).
+
+    Brotli wins ties when it is installed: it makes API JSON about a fifth
+    smaller than gzip at a similar speed.
+    """
+    if not Config.COMPRESS_ENABLED:
+        return None
+    gzip_quality = accept_encodings.quality('gzip')
+    if brotli is not None:
+        brotli_quality = accept_encodings.quality('br')
+        if brotli_quality and brotli_quality >= gzip_quality:
+            return 'br'
+    return 'gzip' if gzip_quality else None
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=Config.COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=Config.COMPRESS_GZIP_LEVEL, mtime=0)
+
+def compress_stream(chunks, encoding):
+    """Compress an iterable of byte strings chunk by chunk, for a streamed response.
+
+    Every chunk is flushed, so the client gets data as soon as it is
+    produced; callers should yield chunks of some size (tens of KB) for the
+    flushes to cost nothing noticeable.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=Config.COMPRESS_BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(Config.COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def is_compressible(response):
+    return (
+        response.mimetype in COMPRESSIBLE_MIMETYPES
+        and not response.direct_passthrough
+        and not response.is_streamed
+        and 'Content-Encoding' not in response.headers
+    )
+
+def compress_response(response, encoding):
+    """Compress a buffered response in place with ``encoding`` (from ``negotiate``).
+
+    Small bodies (under COMPRESS_MIN_SIZE), errors and file or streamed
+    responses are left as they are. Any strong ETag becomes weak: the bytes
+    differ by encoding, the content does not.
+    """
+    if not is_compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    if encoding is None or response.status_code != 200 or len(response.get_data()) < Config.COMPRESS_MIN_SIZE:
+        return response
+    response.set_data(compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
\ No newline at end of file
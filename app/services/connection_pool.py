@@ -0,0 +1,74 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from app.config import Config
+
+class ConnectionPool:
+    """Pool of tuned, reusable SQLite connections shared by the web tier and the tracker.
+
+    Connections are checked out for the duration of a ``with`` block and handed
+    back afterwards, so request greenlets and tracker threads reuse a small set
+    of open connections (and their prepared statement caches) instead of
+    opening a new one per call. Every connection runs in WAL mode, so readers
+    are not blocked while the ingest path holds the write lock.
+    """
+
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, db_path, size=None):
+        self.db_path = db_path
+        self.size = size or Config.SQLITE_POOL_SIZE
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_path(cls, db_path):
+        """Return the process-wide pool for ``db_path``"""
+        with cls._pools_lock:
+            pool = cls._pools.get(db_path)
+            if pool is None:
+                pool = cls._pools[db_path] = cls(db_path)
+            return pool
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=Config.SQLITE_BUSY_TIMEOUT,
+            check_same_thread=False,
+            cached_statements=Config.SQLITE_STATEMENT_CACHE
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={Config.SQLITE_SYNCHRONOUS}')
+        conn.execute(f'PRAGMA cache_size=-{int(Config.SQLITE_CACHE_SIZE_KB)}')
+        conn.execute(f'PRAGMA mmap_size={int(Config.SQLITE_MMAP_SIZE)}')
+        conn.execute(f'PRAGMA busy_timeout={int(Config.SQLITE_BUSY_TIMEOUT * 1000)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection, returning it to the pool afterwards"""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            # Never hand a connection with an open transaction to the next caller
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                if len(self._idle) < self.size:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
\ No newline at end of file
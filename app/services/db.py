@@ -1,21 +1,35 @@
+import html
+import os
 import sqlite3
 from contextlib import contextmanager
+from datetime import datetime
+from urllib.request import pathname2url
 from app.config import Config
+from app.services.connection_pool import ConnectionPool
+from app.services.blob_store import create_blob_store
+from app.services.body_codec import BodyCodec, search_text
+from app.services import metrics
 
+@metrics.instrument_methods(metrics.DB_CALL_SECONDS, metrics.DB_ERRORS,
+                            exclude=('get_connection', 'archive_connection', 'archive_path'))
 class DatabaseService:
     """Service for database operations"""
     
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, blob_store=None):
         self.db_path = db_path or Config.DATABASE_PATH
+        self.pool = ConnectionPool.for_path(self.db_path)
+        self.blob_store = blob_store or create_blob_store(self.db_path)
+        # Monthly archive files (see app/services/archive.py)
+        self.archive_root = Config.ARCHIVE_PATH or os.path.join(os.path.dirname(os.path.abspath(self.db_path)), 'archive')
+        self.body_codec = BodyCodec(Config.BODY_COMPRESSION_LEVEL)
+        self._dictionaries = {}  # id -> preset dictionary (immutable once stored)
+        self._current_dictionary = None
     
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path)
-        try:
+        """Context manager for pooled database connections"""
+        with self.pool.connection() as conn:
             yield conn
-        finally:
-            conn.close()
     
     def init_database(self):
         """Initialize database tables"""
@@ -46,33 +60,685 @@ class DatabaseService:
                 )
             ''')
             
+            # Bodies are downloaded after the headers in two-phase fetch mode
+            self._add_column(c, 'emails', 'body_status', "TEXT NOT NULL DEFAULT 'complete'")
+            
+            # Attachment payloads live in the blob store; content is only set on
+            # rows written before it existed (see migrate_attachment_blobs)
+            self._add_column(c, 'attachments', 'sha256', 'TEXT')
+            self._add_column(c, 'attachments', 'size', 'INTEGER')
+            
+            # Mailbox each email came from; rows from before multi-account
+            # monitoring belong to the primary account's INBOX
+            if self._add_column(c, 'emails', 'account', 'TEXT'):
+                c.execute("UPDATE emails SET account = ? WHERE account IS NULL", (Config.EMAIL_ADDRESS or 'default',))
+            if self._add_column(c, 'emails', 'folder', 'TEXT'):
+                c.execute("UPDATE emails SET folder = 'INBOX' WHERE folder IS NULL")
+            
+            # Sortable epoch timestamp; received_date stays as the display string
+            self._add_column(c, 'emails', 'received_ts', 'INTEGER')
+            self._backfill_received_ts(c)
+            
+            # Indexes for listing, checkpoint lookup, attachment joins and filters
+            c.execute('CREATE INDEX IF NOT EXISTS idx_emails_received_ts ON emails (received_ts, id)')
+            c.execute('CREATE INDEX IF NOT EXISTS idx_emails_has_attachment ON emails (has_attachment, received_ts)')
+            c.execute('CREATE INDEX IF NOT EXISTS idx_attachments_email_id ON attachments (email_id)')
+            c.execute('CREATE INDEX IF NOT EXISTS idx_attachments_sha256 ON attachments (sha256)')
+            c.execute("CREATE INDEX IF NOT EXISTS idx_emails_pending ON emails (id) WHERE body_status = 'pending'")
+            c.execute('CREATE INDEX IF NOT EXISTS idx_emails_account ON emails (account, folder, received_ts, id)')
+            
+            # Message bodies (text and HTML) live outside the emails table so
+            # listing scans stay narrow; compressed by BodyCodec. emails.body
+            # is only set on rows written before (see compress_bodies)
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS email_bodies (
+                    email_id INTEGER PRIMARY KEY,
+                    dictionary_id INTEGER,
+                    text BLOB,
+                    html BLOB,
+                    FOREIGN KEY (email_id) REFERENCES emails (id)
+                )
+            ''')
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS body_dictionaries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    data BLOB NOT NULL,
+                    samples INTEGER,
+                    created_at TEXT
+                )
+            ''')
+            
+            # Full-text index over sender, subject and body (rowid = emails.id).
+            # It keeps its own copy of the text and is written in the ingest
+            # transactions, so it stays in sync without triggers.
+            c.execute("SELECT 1 FROM sqlite_master WHERE name = 'emails_fts'")
+            fts_created = c.fetchone() is None
+            c.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS emails_fts USING fts5(
+                    sender, subject, body,
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '2 3 4'
+                )
+            ''')
+            # bm25 column weights used by ORDER BY rank: subject > sender > body
+            c.execute("INSERT INTO emails_fts (emails_fts, rank) VALUES ('rank', 'bm25(4.0, 8.0, 1.0)')")
+            if fts_created:
+                self._rebuild_search_index(c)
+            
+            # Summary counters kept current by triggers inside every write
+            # transaction, so the dashboard never has to recount the mailbox
+            c.execute("SELECT 1 FROM sqlite_master WHERE name = 'stats_counters'")
+            stats_created = c.fetchone() is None
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS stats_counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS sender_stats (
+                    sender TEXT PRIMARY KEY,
+                    email_count INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            c.execute('CREATE INDEX IF NOT EXISTS idx_sender_stats_count ON sender_stats (email_count)')
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS daily_stats (
+                    day TEXT PRIMARY KEY,
+                    email_count INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            # Change counter behind the HTTP cache validators (ETag/Last-Modified)
+            c.execute('''
+                INSERT OR IGNORE INTO stats_counters (name, value)
+                VALUES ('revision', 0), ('modified_at', CAST(strftime('%s', 'now') AS INTEGER))
+            ''')
+            self._create_stats_triggers(c)
+            if stats_created:
+                self._rebuild_stats(c)
+            
+            # Create per-folder IMAP sync checkpoints
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    folder TEXT PRIMARY KEY,
+                    uidvalidity INTEGER,
+                    last_uid INTEGER NOT NULL DEFAULT 0,
+                    uidnext INTEGER,
+                    last_sync_at TEXT
+                )
+            ''')
+            
+            # Monthly archive files holding emails moved out of this database
+            # (app/services/archive.py); the id ranges tell which files to open
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS archive_months (
+                    month TEXT PRIMARY KEY,
+                    emails INTEGER NOT NULL DEFAULT 0,
+                    min_email_id INTEGER,
+                    max_email_id INTEGER,
+                    min_attachment_id INTEGER,
+                    max_attachment_id INTEGER,
+                    archived_at TEXT
+                )
+            ''')
+            
+            # Completed UID ranges of historical backfills (see app/services/backfill.py)
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS backfill_chunks (
+                    target TEXT NOT NULL,
+                    uidvalidity INTEGER NOT NULL,
+                    first_uid INTEGER NOT NULL,
+                    last_uid INTEGER NOT NULL,
+                    messages INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    completed_at TEXT,
+                    PRIMARY KEY (target, uidvalidity, first_uid)
+                )
+            ''')
+            
             conn.commit()
             print("✓ Database initialized successfully")
     
-    def save_email(self, message_id, sender, subject, body, received_date, has_attachment):
+    @staticmethod
+    def _add_column(cursor, table, column, definition):
+        """Add a column to an existing table if it is missing (lightweight migration).
+        
+        Returns True when the column was added.
+        """
+        cursor.execute(f'PRAGMA table_info({table})')
+        if column in {row[1] for row in cursor.fetchall()}:
+            return False
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+        return True
+    
+    @staticmethod
+    def to_received_ts(received_date):
+        """Convert a '%d-%m-%Y %H:%M:%S' local date string to an epoch timestamp"""
+        if not received_date:
+            return None
+        local_date = datetime.strptime(received_date, '%d-%m-%Y %H:%M:%S').replace(tzinfo=Config.TIMEZONE)
+        return int(local_date.timestamp())
+    
+    def _backfill_received_ts(self, cursor, batch_size=5000):
+        """Populate received_ts for rows written before the column existed"""
+        while True:
+            cursor.execute('''
+                SELECT id, received_date FROM emails
+                WHERE received_ts IS NULL AND received_date IS NOT NULL
+                LIMIT ?
+            ''', (batch_size,))
+            rows = cursor.fetchall()
+            if not rows:
+                return
+            updates = []
+            for email_id, received_date in rows:
+                try:
+                    updates.append((self.to_received_ts(received_date), email_id))
+                except ValueError:
+                    updates.append((0, email_id))  # unparseable legacy value, sort it last
+            cursor.executemany('UPDATE emails SET received_ts = ? WHERE id = ?', updates)
+    
+    @staticmethod
+    def _create_stats_triggers(cursor):
+        """(Re)create the triggers that maintain stats_counters, sender_stats and daily_stats.
+        
+        Every write to emails or attachments also bumps the ``revision``
+        counter and ``modified_at`` timestamp read by get_revision. While the
+        archiver moves emails out (an ``archive_move`` row in stats_counters,
+        inside its transaction) deletes leave sender_stats and daily_stats
+        alone: archived emails keep counting in those charts.
+        """
+        # Days are bucketed in the configured timezone, like received_date
+        offset = int(Config.TIMEZONE.utcoffset(None).total_seconds())
+        new_day = f"date(NEW.received_ts + {offset}, 'unixepoch')"
+        old_day = f"date(OLD.received_ts + {offset}, 'unixepoch')"
+        bump_revision = '''
+                UPDATE stats_counters
+                SET value = CASE name
+                    WHEN 'revision' THEN value + 1
+                    ELSE CAST(strftime('%s', 'now') AS INTEGER)
+                END
+                WHERE name IN ('revision', 'modified_at');'''
+        not_archiving = "NOT EXISTS (SELECT 1 FROM stats_counters WHERE name = 'archive_move')"
+        for name in ('emails_stats_insert', 'emails_stats_delete', 'emails_stats_attachment', 'emails_stats_day',
+                     'emails_revision_update', 'attachments_revision_insert', 'attachments_revision_delete'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        
+        cursor.execute(f'''
+            CREATE TRIGGER emails_stats_insert AFTER INSERT ON emails
+            BEGIN
+                UPDATE stats_counters SET value = value + 1 WHERE name = 'total_emails';
+                UPDATE stats_counters SET value = value + 1
+                WHERE name = 'emails_with_attachments' AND NEW.has_attachment;
+                INSERT INTO sender_stats (sender, email_count) VALUES (NEW.sender, 1)
+                ON CONFLICT(sender) DO UPDATE SET email_count = email_count + 1;
+                INSERT INTO daily_stats (day, email_count)
+                SELECT {new_day}, 1 WHERE NEW.received_ts IS NOT NULL
+                ON CONFLICT(day) DO UPDATE SET email_count = email_count + 1;
+                {bump_revision}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER emails_stats_delete AFTER DELETE ON emails
+            BEGIN
+                UPDATE stats_counters SET value = value - 1 WHERE name = 'total_emails';
+                UPDATE stats_counters SET value = value - 1
+                WHERE name = 'emails_with_attachments' AND OLD.has_attachment;
+                UPDATE sender_stats SET email_count = email_count - 1
+                WHERE sender = OLD.sender AND {not_archiving};
+                DELETE FROM sender_stats WHERE sender = OLD.sender AND email_count <= 0;
+                UPDATE daily_stats SET email_count = email_count - 1
+                WHERE day = {old_day} AND {not_archiving};
+                {bump_revision}
+            END
+        ''')
+        # Two-phase fetch learns about attachments when the body arrives
+        cursor.execute('''
+            CREATE TRIGGER emails_stats_attachment AFTER UPDATE OF has_attachment ON emails
+            WHEN COALESCE(OLD.has_attachment, 0) != COALESCE(NEW.has_attachment, 0)
+            BEGIN
+                UPDATE stats_counters
+                SET value = value + (CASE WHEN NEW.has_attachment THEN 1 ELSE -1 END)
+                WHERE name = 'emails_with_attachments';
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER emails_stats_day AFTER UPDATE OF received_ts ON emails
+            WHEN OLD.received_ts IS NOT NEW.received_ts
+            BEGIN
+                UPDATE daily_stats SET email_count = email_count - 1
+                WHERE day = {old_day};
+                INSERT INTO daily_stats (day, email_count)
+                SELECT {new_day}, 1 WHERE NEW.received_ts IS NOT NULL
+                ON CONFLICT(day) DO UPDATE SET email_count = email_count + 1;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER emails_revision_update AFTER UPDATE ON emails
+            BEGIN
+                {bump_revision}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER attachments_revision_insert AFTER INSERT ON attachments
+            BEGIN
+                {bump_revision}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER attachments_revision_delete AFTER DELETE ON attachments
+            BEGIN
+                {bump_revision}
+            END
+        ''')
+    
+    def save_email(self, message_id, sender, subject, body, received_date, has_attachment,
+                   body_status='complete', html=None):
         """Save email to database"""
+        body_row = self._compress_body(body, html)
         with self.get_connection() as conn:
             c = conn.cursor()
             try:
                 c.execute('''
-                    INSERT INTO emails (message_id, sender, subject, body, received_date, has_attachment)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (message_id, sender, subject, body, received_date, has_attachment))
+                    INSERT INTO emails (message_id, sender, subject, received_date, received_ts,
+                                        has_attachment, body_status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (message_id, sender, subject, received_date, self.to_received_ts(received_date),
+                      has_attachment, body_status))
+                email_id = c.lastrowid
+                if body_row:
+                    c.execute('''
+                        INSERT INTO email_bodies (email_id, dictionary_id, text, html)
+                        VALUES (?, ?, ?, ?)
+                    ''', (email_id,) + body_row)
+                c.execute('''
+                    INSERT INTO emails_fts (rowid, sender, subject, body)
+                    VALUES (?, ?, ?, ?)
+                ''', (email_id, sender, subject, search_text(body, html)))
                 
                 conn.commit()
-                return c.lastrowid
+                return email_id
             except sqlite3.IntegrityError:
                 return None  # Email already exists
     
     def save_attachment(self, email_id, filename, content):
-        """Save attachment to database"""
+        """Save attachment payload to the blob store and its metadata to the database"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            # Stored under the write lock, so the archiver cannot delete it before the row exists
+            c.execute('BEGIN IMMEDIATE')
+            digest = self.blob_store.put(content)
+            c.execute('''
+                INSERT INTO attachments (email_id, filename, sha256, size)
+                VALUES (?, ?, ?, ?)
+            ''', (email_id, filename, digest, len(content)))
+            conn.commit()
+    
+    def _body_dictionary(self):
+        """(id, data) of the newest preset dictionary, (None, None) before one was trained"""
+        if self._current_dictionary is None:
+            with self.get_connection() as conn:
+                c = conn.cursor()
+                c.execute('SELECT id, data FROM body_dictionaries ORDER BY id DESC LIMIT 1')
+                row = c.fetchone()
+            if row is None:
+                return None, None
+            self._dictionaries[row[0]] = row[1]
+            self._current_dictionary = row[0]
+        return self._current_dictionary, self._dictionaries[self._current_dictionary]
+    
+    def get_body_dictionary_id(self):
+        """Id of the dictionary new bodies are compressed with, None before one was trained"""
+        return self._body_dictionary()[0]
+    
+    def _dictionary(self, dictionary_id):
+        if dictionary_id is None:
+            return None
+        if dictionary_id not in self._dictionaries:
+            with self.get_connection() as conn:
+                c = conn.cursor()
+                c.execute('SELECT data FROM body_dictionaries WHERE id = ?', (dictionary_id,))
+                self._dictionaries[dictionary_id] = c.fetchone()[0]
+        return self._dictionaries[dictionary_id]
+    
+    def _compress_body(self, text, html):
+        """(dictionary_id, text, html) row for email_bodies, None when there is no body"""
+        if not text and not html:
+            return None
+        dictionary_id, dictionary = self._body_dictionary()
+        return (
+            dictionary_id,
+            self.body_codec.compress(text or None, dictionary),
+            self.body_codec.compress(html or None, dictionary)
+        )
+    
+    def _decompress_body(self, dictionary_id, text, html):
+        dictionary = self._dictionary(dictionary_id)
+        return self.body_codec.decompress(text, dictionary), self.body_codec.decompress(html, dictionary)
+    
+    def _store_blobs(self, attachments):
+        """Write (filename, content) payloads to the blob store, returns (filename, sha256, size) rows.
+        
+        Payloads over ATTACHMENT_MAX_SIZE are not stored (sha256 None), only their size is kept.
+        """
+        limit = Config.ATTACHMENT_MAX_SIZE
+        return [
+            (filename, self.blob_store.put(content) if not limit or len(content) <= limit else None, len(content))
+            for filename, content in attachments
+        ]
+    
+    def _ensure_blobs(self, stored, attachments):
+        """Put back payloads of ``_store_blobs`` rows deleted since; call while holding the write lock.
+        
+        ``stored`` is ``_store_blobs(attachments)`` followed by any streamed
+        rows. The archiver deletes payloads no row refers to under the write
+        lock (EmailArchiver.delete_unreferenced_blobs), so one written before
+        this transaction may be gone. Streamed payloads are not in memory: a
+        missing one raises FileNotFoundError and the message is fetched again.
+        """
+        for index, (filename, digest, _) in enumerate(stored):
+            if digest is None or self.blob_store.exists(digest):
+                continue
+            if index >= len(attachments):
+                raise FileNotFoundError(f"Payload of attachment {filename!r} was deleted before it was saved")
+            self.blob_store.put(attachments[index][1])
+    
+    def save_emails_batch(self, emails):
+        """Save a batch of emails and their attachments in a single transaction.
+        
+        ``emails`` is a list of dicts with the ``save_email`` fields, optional
+        ``html``, ``account``/``folder``, an ``attachments`` list of
+        (filename, content) pairs and a ``stored_attachments`` list of
+        (filename, sha256, size) rows already in the blob store. Duplicates
+        are skipped by ``ON CONFLICT(message_id) DO NOTHING``. Returns a dict
+        of ``{message_id: email_id}`` for the newly inserted emails.
+        """
+        if not emails:
+            return {}
+        
+        # Blobs are written and bodies compressed before taking the write lock;
+        # a payload is stored once however many emails carry it
+        stored_attachments = [
+            self._store_blobs(email.get('attachments', ())) + list(email.get('stored_attachments', ()))
+            for email in emails
+        ]
+        bodies = [self._compress_body(email['body'], email.get('html')) for email in emails]
+        
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            try:
+                # Take the write lock up front so ids above MAX(id) are ours
+                c.execute('BEGIN IMMEDIATE')
+                c.execute('SELECT COALESCE(MAX(id), 0) FROM emails')
+                max_id = c.fetchone()[0]
+                
+                c.executemany('''
+                    INSERT INTO emails (message_id, sender, subject, received_date, received_ts,
+                                        has_attachment, body_status, account, folder)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(message_id) DO NOTHING
+                ''', [
+                    (email['message_id'], email['sender'], email['subject'], email['received_date'],
+                     email.get('received_ts') or self.to_received_ts(email['received_date']),
+                     email['has_attachment'], email.get('body_status', 'complete'),
+                     email.get('account'), email.get('folder'))
+                    for email in emails
+                ])
+                
+                c.execute('SELECT message_id, id FROM emails WHERE id > ?', (max_id,))
+                saved = dict(c.fetchall())
+                
+                attachment_rows = []
+                body_rows = []
+                search_rows = []
+                linked = set()
+                for email, attachments, body in zip(emails, stored_attachments, bodies):
+                    # A message id repeated within the batch keeps its first copy only
+                    if email['message_id'] not in saved or email['message_id'] in linked:
+                        continue
+                    linked.add(email['message_id'])
+                    self._ensure_blobs(attachments, email.get('attachments', ()))
+                    if body:
+                        body_rows.append((saved[email['message_id']],) + body)
+                    search_rows.append((
+                        saved[email['message_id']], email['sender'], email['subject'],
+                        search_text(email['body'], email.get('html'))
+                    ))
+                    attachment_rows.extend(
+                        (saved[email['message_id']], filename, digest, size)
+                        for filename, digest, size in attachments
+                    )
+                c.executemany('''
+                    INSERT INTO attachments (email_id, filename, sha256, size)
+                    VALUES (?, ?, ?, ?)
+                ''', attachment_rows)
+                c.executemany('''
+                    INSERT INTO email_bodies (email_id, dictionary_id, text, html)
+                    VALUES (?, ?, ?, ?)
+                ''', body_rows)
+                c.executemany('''
+                    INSERT INTO emails_fts (rowid, sender, subject, body)
+                    VALUES (?, ?, ?, ?)
+                ''', search_rows)
+                
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        
+        metrics.EMAILS_SAVED.inc(len(saved))
+        metrics.EMAILS_DUPLICATE.inc(len(emails) - len(saved))
+        if body_rows and self._current_dictionary is None:
+            self._train_first_dictionary()
+        return saved
+    
+    def _train_first_dictionary(self):
+        """Train the first preset dictionary once enough bodies are stored to learn from"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('SELECT COUNT(*) FROM (SELECT 1 FROM email_bodies LIMIT ?)', (Config.BODY_DICTIONARY_MIN_SAMPLES,))
+            stored = c.fetchone()[0]
+        if stored >= Config.BODY_DICTIONARY_MIN_SAMPLES and self._body_dictionary()[0] is None:
+            try:
+                self.train_body_dictionary()
+            except Exception as e:
+                print(f"✗ Error training body dictionary: {str(e)}")
+    
+    def get_existing_message_ids(self, message_ids, chunk_size=500):
+        """Return the subset of ``message_ids`` that is already stored"""
+        message_ids = list(message_ids)
+        existing = set()
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            for start in range(0, len(message_ids), chunk_size):
+                chunk = message_ids[start:start + chunk_size]
+                c.execute(
+                    f"SELECT message_id FROM emails WHERE message_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                existing.update(row[0] for row in c.fetchall())
+        return existing
+    
+    def get_existing_email_ids(self, email_ids, chunk_size=500):
+        """Return the subset of ``email_ids`` still in the emails table"""
+        email_ids = list(email_ids)
+        existing = set()
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            for start in range(0, len(email_ids), chunk_size):
+                chunk = email_ids[start:start + chunk_size]
+                c.execute(f"SELECT id FROM emails WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+                existing.update(row[0] for row in c.fetchall())
+        return existing
+    
+    def complete_email_body(self, email_id, body, attachments, body_status='complete', html=None,
+                            stored_attachments=()):
+        """Store the downloaded body and attachments of a header-only email"""
+        stored = self._store_blobs(attachments) + list(stored_attachments)
+        body_row = self._compress_body(body, html)
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('BEGIN IMMEDIATE')
+            self._ensure_blobs(stored, attachments)
+            c.executemany('''
+                INSERT INTO attachments (email_id, filename, sha256, size)
+                VALUES (?, ?, ?, ?)
+            ''', [(email_id, filename, digest, size) for filename, digest, size in stored])
+            if body_row:
+                c.execute('''
+                    INSERT OR REPLACE INTO email_bodies (email_id, dictionary_id, text, html)
+                    VALUES (?, ?, ?, ?)
+                ''', (email_id,) + body_row)
+            c.execute('''
+                UPDATE emails
+                SET body = NULL, has_attachment = ?, body_status = ?
+                WHERE id = ?
+            ''', (bool(stored), body_status, email_id))
+            c.execute('UPDATE emails_fts SET body = ? WHERE rowid = ?', (search_text(body, html), email_id))
+            conn.commit()
+        if body_row and self._current_dictionary is None:
+            self._train_first_dictionary()
+    
+    _EMAIL_SQL = '''
+        SELECT id, message_id, sender, subject, received_date, has_attachment, body_status
+        FROM emails WHERE id = ?
+    '''
+    
+    def get_email(self, email_id):
+        """Get (id, message_id, sender, subject, received_date, has_attachment, body_status), archived or not"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(self._EMAIL_SQL, (email_id,))
+            row = c.fetchone()
+        return row or self._from_archives('email', email_id, self._EMAIL_SQL)
+    
+    _BODY_SQL = '''
+        SELECT b.dictionary_id, b.text, b.html, e.body
+        FROM emails e
+        LEFT JOIN email_bodies b ON b.email_id = e.id
+        WHERE e.id = ?
+    '''
+    
+    def get_email_body(self, email_id):
+        """Get the (text, html) body of an email, decompressed; (None, None) when it has none"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(self._BODY_SQL, (email_id,))
+            row = c.fetchone()
+        if row is None:
+            # Archives share the dictionary ids, which are never deleted here
+            row = self._from_archives('email', email_id, self._BODY_SQL)
+        if row is None:
+            return None, None
+        if row[1] is None and row[2] is None:
+            return row[3], None  # stored before bodies moved out of the emails table
+        return self._decompress_body(row[0], row[1], row[2])
+    
+    def train_body_dictionary(self, sample_size=None):
+        """Train a new preset dictionary from the newest bodies, returns (id, size) or None.
+        
+        New bodies are compressed with it; older ones keep the dictionary they
+        were written with (``compress_bodies --recompress`` re-encodes them).
+        """
+        sample_size = sample_size or Config.BODY_DICTIONARY_SAMPLE
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('''
+                SELECT e.id, b.dictionary_id, b.text, b.html, e.body
+                FROM emails e
+                LEFT JOIN email_bodies b ON b.email_id = e.id
+                WHERE b.email_id IS NOT NULL OR e.body IS NOT NULL
+                ORDER BY e.id DESC
+                LIMIT ?
+            ''', (sample_size,))
+            rows = c.fetchall()
+        samples = []
+        for _, dictionary_id, text, html, legacy_body in rows:
+            if text is None and html is None:
+                samples.append(legacy_body)
+            else:
+                samples.extend(self._decompress_body(dictionary_id, text, html))
+        dictionary = self.body_codec.train(samples)
+        if not dictionary:
+            return None
+        
         with self.get_connection() as conn:
             c = conn.cursor()
             c.execute('''
-                INSERT INTO attachments (email_id, filename, content)
+                INSERT INTO body_dictionaries (data, samples, created_at)
                 VALUES (?, ?, ?)
-            ''', (email_id, filename, content))
+            ''', (dictionary, len(rows), datetime.now(Config.TIMEZONE).strftime('%d-%m-%Y %H:%M:%S')))
+            dictionary_id = c.lastrowid
             conn.commit()
+        self._dictionaries[dictionary_id] = dictionary
+        self._current_dictionary = dictionary_id
+        return dictionary_id, len(dictionary)
+    
+    def compress_bodies(self, batch_size=500, recompress=False, progress=None):
+        """Move bodies still stored in emails.body into email_bodies, compressed.
+        
+        With ``recompress`` bodies compressed with an older dictionary are
+        re-encoded with the current one. Batches are committed on their own,
+        so it can be interrupted and re-run. ``progress`` is called with
+        (converted, raw_bytes, stored_bytes) after each batch. Returns the same.
+        """
+        dictionary_id, _ = self._body_dictionary()
+        converted = raw_bytes = stored_bytes = 0
+        after_id = 0
+        while True:
+            with self.get_connection() as conn:
+                c = conn.cursor()
+                c.execute('''
+                    SELECT e.id, e.body, b.dictionary_id, b.text, b.html
+                    FROM emails e
+                    LEFT JOIN email_bodies b ON b.email_id = e.id
+                    WHERE e.id > ? AND (
+                        e.body IS NOT NULL
+                        OR (? AND b.email_id IS NOT NULL AND b.dictionary_id IS NOT ?)
+                    )
+                    ORDER BY e.id
+                    LIMIT ?
+                ''', (after_id, recompress, dictionary_id, batch_size))
+                rows = c.fetchall()
+                if not rows:
+                    break
+                
+                body_rows = []
+                for email_id, legacy_body, old_dictionary_id, text, html in rows:
+                    if legacy_body is not None:
+                        text, html = legacy_body, None
+                    else:
+                        text, html = self._decompress_body(old_dictionary_id, text, html)
+                    body_row = self._compress_body(text, html)
+                    raw_bytes += sum(len(value.encode('utf-8', 'surrogatepass')) for value in (text, html) if value)
+                    stored_bytes += sum(len(value) for value in (body_row or ())[1:] if value)
+                    if body_row:
+                        body_rows.append((email_id,) + body_row)
+                c.executemany('''
+                    INSERT OR REPLACE INTO email_bodies (email_id, dictionary_id, text, html)
+                    VALUES (?, ?, ?, ?)
+                ''', body_rows)
+                c.executemany('UPDATE emails SET body = NULL WHERE id = ?', [(row[0],) for row in rows])
+                conn.commit()
+            
+            converted += len(rows)
+            after_id = rows[-1][0]
+            if progress:
+                progress(converted, raw_bytes, stored_bytes)
+        return converted, raw_bytes, stored_bytes
+    
+    def get_pending_bodies(self, limit=100):
+        """Get (id, message_id, account, folder) of emails whose body has not been downloaded yet"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('''
+                SELECT id, message_id, account, folder
+                FROM emails
+                WHERE body_status = 'pending'
+                ORDER BY id
+                LIMIT ?
+            ''', (limit,))
+            return c.fetchall()
     
     def get_all_emails(self):
         """Retrieve all emails with attachment count"""
@@ -80,32 +746,609 @@ class DatabaseService:
             c = conn.cursor()
             c.execute('''
                 SELECT e.id, e.sender, e.subject, e.received_date, e.has_attachment,
-                       COUNT(a.id) as attachment_count
+                       (SELECT COUNT(*) FROM attachments a WHERE a.email_id = e.id) as attachment_count
                 FROM emails e
-                LEFT JOIN attachments a ON e.id = a.email_id
-                GROUP BY e.id
-                ORDER BY e.received_date DESC
+                ORDER BY e.received_ts DESC, e.id DESC
             ''')
             return c.fetchall()
     
-    def get_email_attachments(self, email_id):
-        """Get attachments for specific email"""
+    def get_emails_page(self, before=None, limit=50, query=None, sender=None, subject=None,
+                        has_attachment=None, account=None, folder=None):
+        """Keyset-paginated email listing, newest first.
+        
+        ``before`` is a (received_ts, id) cursor taken from the last row of the
+        previous page. ``query`` matches sender or subject; ``sender`` and
+        ``subject`` match their own column; ``account`` and ``folder`` are exact.
+        Rows have the ``get_all_emails`` columns followed by ``received_ts``,
+        ``account`` and ``folder``.
+        """
+        conditions = []
+        params = []
+        if before is not None:
+            conditions.append('(e.received_ts, e.id) < (?, ?)')
+            params.extend(before)
+        if query:
+            conditions.append("(e.sender LIKE ? ESCAPE '\\' OR e.subject LIKE ? ESCAPE '\\')")
+            params.extend([self._like_pattern(query)] * 2)
+        if sender:
+            conditions.append("e.sender LIKE ? ESCAPE '\\'")
+            params.append(self._like_pattern(sender))
+        if subject:
+            conditions.append("e.subject LIKE ? ESCAPE '\\'")
+            params.append(self._like_pattern(subject))
+        if has_attachment is not None:
+            conditions.append('e.has_attachment = ?')
+            params.append(bool(has_attachment))
+        if account:
+            conditions.append('e.account = ?')
+            params.append(account)
+        if folder:
+            conditions.append('e.folder = ?')
+            params.append(folder)
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f'''
+                SELECT e.id, e.sender, e.subject, e.received_date, e.has_attachment,
+                       (SELECT COUNT(*) FROM attachments a WHERE a.email_id = e.id) as attachment_count,
+                       e.received_ts, e.account, e.folder
+                FROM emails e
+                {where}
+                ORDER BY e.received_ts DESC, e.id DESC
+                LIMIT ?
+            ''', params + [limit])
+            return c.fetchall()
+    
+    _SUMMARY_COLUMNS = '''
+        e.id, e.sender, e.subject, e.received_ts, e.has_attachment,
+        (SELECT COUNT(*) FROM attachments a WHERE a.email_id = e.id) as attachment_count,
+        e.account, e.folder, e.body_status = 'pending'
+    '''
+    
+    def iter_email_summaries(self, batch_size=10000):
+        """Yield the listing metadata of every email, oldest first.
+        
+        Rows are (id, sender, subject, received_ts, has_attachment,
+        attachment_count, account, folder, pending).
+        """
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f'''
+                SELECT {self._SUMMARY_COLUMNS}
+                FROM emails e
+                ORDER BY e.received_ts, e.id
+            ''')
+            while True:
+                rows = c.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+    
+    EXPORT_COLUMNS = (
+        'id', 'message_id', 'sender', 'subject', 'received_date', 'received_ts', 'has_attachment',
+        'attachment_count', 'account', 'folder', 'body_status'
+    )
+    
+    def iter_emails(self, since_ts=0, bodies=False, include_archives=True, batch_size=None):
+        """Yield every email received at or after ``since_ts``, oldest first, for bulk export.
+        
+        Rows have the ``EXPORT_COLUMNS`` followed, with ``bodies``, by the
+        decompressed text and html. Each batch of ``batch_size`` rows is one
+        short query resuming after the previous batch's (received_ts, id), so
+        memory stays constant and no read transaction (or pooled connection)
+        is held while the caller is busy with the rows. Months in the archive
+        files come first. Emails the archiver moves during the export, and
+        that the export has not reached yet, may be missed.
+        """
+        batch_size = batch_size or Config.EXPORT_BATCH_SIZE
+        sql = f'''
+            SELECT e.id, e.message_id, e.sender, e.subject, e.received_date, e.received_ts, e.has_attachment,
+                   (SELECT COUNT(*) FROM attachments a WHERE a.email_id = e.id),
+                   e.account, e.folder, e.body_status
+                   {', b.dictionary_id, b.text, b.html, e.body' if bodies else ''}
+            FROM emails e
+            {'LEFT JOIN email_bodies b ON b.email_id = e.id' if bodies else ''}
+            WHERE (e.received_ts, e.id) > (?, ?)
+            ORDER BY e.received_ts, e.id
+            LIMIT ?
+        '''
+        sources = []
+        if include_archives:
+            first_month = datetime.fromtimestamp(since_ts, Config.TIMEZONE).strftime('%Y-%m')
+            sources = [
+                lambda month=month: self.archive_connection(month)
+                for month, _, _ in reversed(self.get_archive_months()) if month >= first_month
+            ]
+        sources.append(self.get_connection)
+        
+        for connect in sources:
+            with connect() as conn:
+                position = (since_ts, -1)
+                while True:
+                    rows = conn.execute(sql, position + (batch_size,)).fetchall()
+                    if not rows:
+                        break
+                    position = (rows[-1][5], rows[-1][0])
+                    if bodies:
+                        rows = [row[:11] + self._export_body(row[11:]) for row in rows]
+                    yield from rows
+    
+    def _export_body(self, row):
+        dictionary_id, text, html, inline = row
+        if text is None and html is None:
+            return inline, None  # stored before bodies moved out of the emails table
+        return self._decompress_body(dictionary_id, text, html)
+    
+    def get_email_changes(self, after_id, ids=(), chunk_size=500):
+        """Read what changed since an ``iter_email_summaries`` load, from one snapshot.
+        
+        Returns (new_rows, rows, total): summary rows of emails with an id
+        above ``after_id`` (by id), current rows of the given ``ids`` and the
+        total number of emails.
+        """
+        ids = list(ids)
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('BEGIN')
+            try:
+                c.execute(f'''
+                    SELECT {self._SUMMARY_COLUMNS}
+                    FROM emails e
+                    WHERE e.id > ?
+                    ORDER BY e.id
+                ''', (after_id,))
+                new_rows = c.fetchall()
+                rows = []
+                for start in range(0, len(ids), chunk_size):
+                    chunk = ids[start:start + chunk_size]
+                    c.execute(f'''
+                        SELECT {self._SUMMARY_COLUMNS}
+                        FROM emails e
+                        WHERE e.id IN ({','.join('?' * len(chunk))})
+                    ''', chunk)
+                    rows.extend(c.fetchall())
+                c.execute("SELECT value FROM stats_counters WHERE name = 'total_emails'")
+                total = c.fetchone()
+            finally:
+                conn.commit()
+        return new_rows, rows, total[0] if total else 0
+    
+    @staticmethod
+    def _like_pattern(value):
+        """Substring LIKE pattern with wildcard characters escaped"""
+        escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return f'%{escaped}%'
+    
+    def search_emails(self, query, limit=20, offset=0, include_archives=True):
+        """Full-text search over sender, subject and body, best matches first.
+        
+        Rows have the ``get_all_emails`` columns followed by an HTML-escaped
+        snippet (matches wrapped in <mark>) and the bm25 rank. Matches in the
+        monthly archives follow the ones in this database, newest month
+        first; an archive is only opened once the page reaches past the
+        matches before it.
+        """
+        match = self._fts_query(query)
+        if not match:
+            return []
+        with self.get_connection() as conn:
+            rows = self._search(conn, match, limit, offset)
+            if not include_archives or len(rows) == limit:
+                return rows
+            # Matches left to skip in the archives: none once this page has rows
+            skip = max(0, offset - self._count_matches(conn, match)) if not rows else 0
+        
+        for month, _, _ in self.get_archive_months():
+            with self.archive_connection(month) as conn:
+                found = self._search(conn, match, limit - len(rows), skip)
+                if not found and skip:
+                    skip = max(0, skip - self._count_matches(conn, match))
+                else:
+                    skip = 0
+            rows.extend(found)
+            if len(rows) == limit:
+                break
+        return rows
+    
+    def _search(self, conn, match, limit, offset):
+        # Rank and cut down to one page inside FTS5 first, so the join and
+        # attachment counts only run for the rows that are returned
+        c = conn.execute('''
+            WITH hits AS (
+                SELECT rowid, snippet(emails_fts, -1, char(2), char(3), '…', 16) as snippet, rank
+                FROM emails_fts
+                WHERE emails_fts MATCH ?
+                ORDER BY rank
+                LIMIT ? OFFSET ?
+            )
+            SELECT e.id, e.sender, e.subject, e.received_date, e.has_attachment,
+                   (SELECT COUNT(*) FROM attachments a WHERE a.email_id = e.id) as attachment_count,
+                   hits.snippet, hits.rank
+            FROM hits
+            JOIN emails e ON e.id = hits.rowid
+            ORDER BY hits.rank
+        ''', (match, limit, offset))
+        return [
+            row[:6] + (self._highlight(row[6]), row[7])
+            for row in c.fetchall()
+        ]
+    
+    @staticmethod
+    def _count_matches(conn, match):
+        return conn.execute('SELECT COUNT(*) FROM emails_fts WHERE emails_fts MATCH ?', (match,)).fetchone()[0]
+    
+    @staticmethod
+    def _fts_query(query):
+        """Turn free text into an FTS5 query: every word must match, the last one as a prefix"""
+        terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+        if terms:
+            terms[-1] += '*'
+        return ' '.join(terms)
+    
+    @staticmethod
+    def _highlight(snippet):
+        """Escape a snippet for HTML and turn the match markers into <mark> tags"""
+        return html.escape(snippet or '').replace('\x02', '<mark>').replace('\x03', '</mark>')
+    
+    def rebuild_search_index(self):
+        """Rebuild the full-text index from the emails table, returns the number of indexed rows"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            count = self._rebuild_search_index(c)
+            conn.commit()
+            return count
+    
+    def _rebuild_search_index(self, cursor, batch_size=1000):
+        # Bodies are compressed, so the text is decoded here rather than in SQL
+        cursor.execute('DELETE FROM emails_fts')
+        after_id = 0
+        while True:
+            cursor.execute('''
+                SELECT e.id, e.sender, e.subject, e.body, b.dictionary_id, b.text, b.html
+                FROM emails e
+                LEFT JOIN email_bodies b ON b.email_id = e.id
+                WHERE e.id > ?
+                ORDER BY e.id
+                LIMIT ?
+            ''', (after_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            search_rows = []
+            for email_id, sender, subject, legacy_body, dictionary_id, text, html in rows:
+                if text is not None or html is not None:
+                    text, html = self._decompress_body(dictionary_id, text, html)
+                else:
+                    text = legacy_body
+                search_rows.append((email_id, sender, subject, search_text(text, html)))
+            cursor.executemany('''
+                INSERT INTO emails_fts (rowid, sender, subject, body)
+                VALUES (?, ?, ?, ?)
+            ''', search_rows)
+            after_id = rows[-1][0]
+        cursor.execute("INSERT INTO emails_fts (emails_fts) VALUES ('optimize')")
+        cursor.execute('SELECT COUNT(*) FROM emails_fts')
+        return cursor.fetchone()[0]
+    
+    def rebuild_stats(self):
+        """Recount the summary tables from the emails table, returns the new totals.
+        
+        The sender and daily counts include the monthly archives, like the
+        ones kept up by the triggers.
+        """
+        archived = []
+        for month, _, _ in self.get_archive_months():
+            with self.archive_connection(month) as conn:
+                archived.append(self.count_stats(conn))
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            self._rebuild_stats(c)
+            for senders, days in archived:
+                self.add_stats(c, senders, days)
+            conn.commit()
+        return self.get_stats()
+    
+    @staticmethod
+    def count_stats(conn):
+        """(sender, count) and (day, count) rows of the emails in ``conn`` (the database or an archive)"""
+        offset = int(Config.TIMEZONE.utcoffset(None).total_seconds())
+        senders = conn.execute('SELECT sender, COUNT(*) FROM emails GROUP BY sender').fetchall()
+        days = conn.execute('''
+            SELECT date(received_ts + ?, 'unixepoch') as day, COUNT(*)
+            FROM emails
+            WHERE received_ts IS NOT NULL
+            GROUP BY day
+        ''', (offset,)).fetchall()
+        return senders, days
+    
+    @staticmethod
+    def add_stats(cursor, senders, days, sign=1):
+        """Add (or with ``sign=-1`` subtract) count_stats rows to sender_stats and daily_stats"""
+        cursor.executemany('''
+            INSERT INTO sender_stats (sender, email_count) VALUES (?, ?)
+            ON CONFLICT(sender) DO UPDATE SET email_count = email_count + excluded.email_count
+        ''', [(sender, sign * count) for sender, count in senders])
+        cursor.execute('DELETE FROM sender_stats WHERE email_count <= 0')
+        cursor.executemany('''
+            INSERT INTO daily_stats (day, email_count) VALUES (?, ?)
+            ON CONFLICT(day) DO UPDATE SET email_count = email_count + excluded.email_count
+        ''', [(day, sign * count) for day, count in days])
+        cursor.execute('DELETE FROM daily_stats WHERE email_count <= 0')
+    
+    @staticmethod
+    def _rebuild_stats(cursor):
+        offset = int(Config.TIMEZONE.utcoffset(None).total_seconds())
+        cursor.execute("DELETE FROM stats_counters WHERE name IN ('total_emails', 'emails_with_attachments')")
+        cursor.execute('''
+            INSERT INTO stats_counters (name, value)
+            SELECT 'total_emails', COUNT(*) FROM emails
+            UNION ALL
+            SELECT 'emails_with_attachments', COUNT(*) FROM emails WHERE has_attachment
+        ''')
+        cursor.execute('DELETE FROM sender_stats')
+        cursor.execute('''
+            INSERT INTO sender_stats (sender, email_count)
+            SELECT sender, COUNT(*) FROM emails GROUP BY sender
+        ''')
+        cursor.execute('DELETE FROM daily_stats')
+        cursor.execute('''
+            INSERT INTO daily_stats (day, email_count)
+            SELECT date(received_ts + ?, 'unixepoch') as day, COUNT(*)
+            FROM emails
+            WHERE received_ts IS NOT NULL
+            GROUP BY day
+        ''', (offset,))
+    
+    def get_stats(self):
+        """Get the email totals from the summary counters (no table scan)"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('SELECT name, value FROM stats_counters')
+            counters = dict(c.fetchall())
+        return {
+            'total_emails': counters.get('total_emails', 0),
+            'emails_with_attachments': counters.get('emails_with_attachments', 0)
+        }
+    
+    def get_revision(self):
+        """Get (revision, modified_at): a counter bumped by every email/attachment write and its epoch time"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT name, value FROM stats_counters WHERE name IN ('revision', 'modified_at')")
+            counters = dict(c.fetchall())
+        return counters.get('revision', 0), counters.get('modified_at')
+    
+    def get_sender_stats(self, limit=10):
+        """Get (sender, email_count) for the busiest senders"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('''
+                SELECT sender, email_count
+                FROM sender_stats
+                ORDER BY email_count DESC, sender
+                LIMIT ?
+            ''', (limit,))
+            return c.fetchall()
+    
+    def get_daily_stats(self, days=30):
+        """Get (day, email_count) for the most recent ``days`` days with mail, oldest first"""
         with self.get_connection() as conn:
             c = conn.cursor()
             c.execute('''
-                SELECT id, filename
-                FROM attachments
-                WHERE email_id = ?
-            ''', (email_id,))
+                SELECT day, email_count FROM (
+                    SELECT day, email_count
+                    FROM daily_stats
+                    WHERE email_count > 0
+                    ORDER BY day DESC
+                    LIMIT ?
+                )
+                ORDER BY day
+            ''', (days,))
             return c.fetchall()
     
+    def get_last_received_ts(self, account=None, folder=None):
+        """Get the epoch timestamp of the newest stored email, optionally of one mailbox (index-only lookup)"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            if account is None:
+                c.execute('SELECT MAX(received_ts) FROM emails')
+            else:
+                c.execute('SELECT MAX(received_ts) FROM emails WHERE account = ? AND folder = ?', (account, folder))
+            result = c.fetchone()
+            return result[0] if result else None
+    
+    _ATTACHMENTS_SQL = '''
+        SELECT id, filename, size, sha256 IS NOT NULL OR content IS NOT NULL
+        FROM attachments
+        WHERE email_id = ?
+    '''
+    
+    def get_email_attachments(self, email_id):
+        """Get (id, filename, size, stored) of an email's attachments.
+        
+        stored is 0 for ones over the size cap and for archived ones whose payload was dropped.
+        """
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(self._ATTACHMENTS_SQL, (email_id,))
+            rows = c.fetchall()
+        return rows or self._from_archives('email', email_id, self._ATTACHMENTS_SQL, fetch_all=True) or []
+    
+    _ATTACHMENT_SQL = '''
+        SELECT filename, sha256, size, content
+        FROM attachments
+        WHERE id = ?
+    '''
+    
     def get_attachment(self, attachment_id):
-        """Get specific attachment"""
+        """Get (filename, sha256, size, content) of an attachment.
+        
+        ``content`` is None once the payload is in the blob store; it is only
+        set for rows that have not been migrated yet.
+        """
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(self._ATTACHMENT_SQL, (attachment_id,))
+            row = c.fetchone()
+        return row or self._from_archives('attachment', attachment_id, self._ATTACHMENT_SQL)
+    
+    def get_recent_attachments(self, since_ts):
+        """Get (id, filename, sha256) of the blob store attachments of emails received since ``since_ts``, newest first"""
         with self.get_connection() as conn:
             c = conn.cursor()
             c.execute('''
-                SELECT filename, content
-                FROM attachments
-                WHERE id = ?
-            ''', (attachment_id,))
-            return c.fetchone()
\ No newline at end of file
+                SELECT a.id, a.filename, a.sha256
+                FROM attachments a
+                JOIN emails e ON e.id = a.email_id
+                WHERE e.received_ts >= ? AND a.sha256 IS NOT NULL
+                ORDER BY e.received_ts DESC, a.id
+            ''', (since_ts,))
+            return c.fetchall()
+    
+    def archive_path(self, month):
+        """Archive file of a month ('YYYY-MM')"""
+        return os.path.join(self.archive_root, f'emails-{month}.db')
+    
+    @contextmanager
+    def archive_connection(self, month):
+        """Read-only connection to a monthly archive file, opened on demand"""
+        conn = sqlite3.connect(
+            f'file:{pathname2url(self.archive_path(month))}?mode=ro',
+            uri=True,
+            timeout=Config.SQLITE_BUSY_TIMEOUT,
+            check_same_thread=False
+        )
+        try:
+            yield conn
+        finally:
+            conn.close()
+    
+    def get_archive_months(self):
+        """(month, emails, archived_at) of every archive file, newest month first"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('SELECT month, emails, archived_at FROM archive_months ORDER BY month DESC')
+            return c.fetchall()
+    
+    def _from_archives(self, kind, row_id, sql, fetch_all=False):
+        """Run ``sql`` for an email or attachment id against the archives whose id range holds it.
+        
+        Returns the first row (all rows with ``fetch_all``) of the first
+        archive that has any, None when none does.
+        """
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f'''
+                SELECT month FROM archive_months
+                WHERE ? BETWEEN min_{kind}_id AND max_{kind}_id
+                ORDER BY month DESC
+            ''', (row_id,))
+            months = [row[0] for row in c.fetchall()]
+        for month in months:
+            with self.archive_connection(month) as conn:
+                c = conn.execute(sql, (row_id,))
+                result = c.fetchall() if fetch_all else c.fetchone()
+            if result:
+                return result
+        return None
+    
+    def migrate_attachment_blobs(self, batch_size=100, progress=None):
+        """Move attachment BLOBs still stored in the database to the blob store.
+        
+        Works in batches, each committed on its own, so it can be interrupted
+        and re-run. ``progress`` is called with (migrated, total_bytes) after
+        each batch. Returns the same pair.
+        """
+        migrated = 0
+        total_bytes = 0
+        while True:
+            with self.get_connection() as conn:
+                c = conn.cursor()
+                # Payloads are stored under the write lock, see _ensure_blobs
+                c.execute('BEGIN IMMEDIATE')
+                c.execute('''
+                    SELECT id, content FROM attachments
+                    WHERE content IS NOT NULL
+                    LIMIT ?
+                ''', (batch_size,))
+                rows = c.fetchall()
+                if not rows:
+                    return migrated, total_bytes
+                c.executemany('''
+                    UPDATE attachments SET sha256 = ?, size = ?, content = NULL WHERE id = ?
+                ''', [(self.blob_store.put(content), len(content), attachment_id) for attachment_id, content in rows])
+                conn.commit()
+            migrated += len(rows)
+            total_bytes += sum(len(content) for _, content in rows)
+            if progress:
+                progress(migrated, total_bytes)
+    
+    def vacuum(self):
+        """Rebuild the database file to return freed pages to the filesystem"""
+        with self.get_connection() as conn:
+            conn.execute('VACUUM')
+    
+    def get_sync_state(self, folder):
+        """Get the IMAP sync checkpoint (uidvalidity, last_uid, uidnext) for a folder"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('''
+                SELECT uidvalidity, last_uid, uidnext
+                FROM sync_state
+                WHERE folder = ?
+            ''', (folder,))
+            return c.fetchone()
+    
+    def get_sync_times(self):
+        """(folder, last_sync_at) of every sync checkpoint; last_sync_at is when a pass last completed"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('SELECT folder, last_sync_at FROM sync_state ORDER BY folder')
+            return c.fetchall()
+    
+    def save_sync_state(self, folder, uidvalidity, last_uid, uidnext, last_sync_at):
+        """Insert or update the IMAP sync checkpoint for a folder"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('''
+                INSERT INTO sync_state (folder, uidvalidity, last_uid, uidnext, last_sync_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(folder) DO UPDATE SET
+                    uidvalidity = excluded.uidvalidity,
+                    last_uid = excluded.last_uid,
+                    uidnext = excluded.uidnext,
+                    last_sync_at = excluded.last_sync_at
+            ''', (folder, uidvalidity, last_uid, uidnext, last_sync_at))
+            conn.commit()
+    
+    def get_backfill_chunks(self, target, uidvalidity):
+        """Completed backfill ranges of a mailbox as (first_uid, last_uid, messages, bytes) rows"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('''
+                SELECT first_uid, last_uid, messages, bytes
+                FROM backfill_chunks
+                WHERE target = ? AND uidvalidity = ?
+                ORDER BY first_uid
+            ''', (target, uidvalidity))
+            return c.fetchall()
+    
+    def save_backfill_chunk(self, target, uidvalidity, first_uid, last_uid, messages, size, completed_at):
+        """Record a backfilled UID range as done"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('''
+                INSERT OR REPLACE INTO backfill_chunks
+                    (target, uidvalidity, first_uid, last_uid, messages, bytes, completed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (target, uidvalidity, first_uid, last_uid, messages, size, completed_at))
+            conn.commit()
+    
+    def reset_backfill(self, target):
+        """Forget the completed backfill ranges of a mailbox"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('DELETE FROM backfill_chunks WHERE target = ?', (target,))
+            conn.commit()
+            return c.rowcount
\ No newline at end of file
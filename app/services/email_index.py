@@ -0,0 +1,337 @@
+import bisect
+import sys
+import threading
+import time
+from array import array
+from functools import lru_cache
+from app.config import Config
+from app.services.http_cache import revision_tracker
+
+HAS_ATTACHMENT = 1
+PENDING = 2
+MAX_ATTACHMENT_COUNT = 0xFFFF
+
+@lru_cache(maxsize=65536)
+def format_received_date(received_ts):
+    """The ``received_date`` string stored alongside ``received_ts`` (TIMEZONE is a fixed offset)"""
+    offset = Config.TIMEZONE.utcoffset(None).total_seconds()
+    return time.strftime('%d-%m-%Y %H:%M:%S', time.gmtime(received_ts + offset))
+
+class EmailIndex:
+    """Compact in-process read model of the email listing.
+
+    Holds the metadata the listing pages need (id, sender, subject,
+    received_ts, attachment flag and count, mailbox) in parallel ``array``
+    columns sorted by (received_ts, id), so a page is a bisect plus a short
+    scan instead of a query. Senders and mailboxes are interned, subjects are
+    UTF-8 in one append-only buffer and ``received_date`` is derived from the
+    timestamp. A message costs about 40 bytes plus its subject, against
+    several hundred for an ``Email`` dataclass (benchmarks/bench_email_index.py).
+
+    The index follows the database rather than the other way round: new rows
+    are read by id above the highest loaded one, emails still waiting for
+    their body are re-read until complete, and a total that no longer adds
+    up means emails were deleted. The archiver deletes the oldest ones, so
+    those are looked for from the oldest end and dropped; only when that
+    does not account for the difference is the index reloaded. The ingest path calls
+    ``refresh`` after saving; reads call ``sync``, which refreshes when the
+    database revision moved, so writes by other processes show up as well.
+    """
+
+    # Entries checked against the database per query while looking for deleted ones
+    DELETED_SCAN_CHUNK = 500
+
+    def __init__(self, db_service):
+        self.db_service = db_service
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self.ids = array('q')
+        self.timestamps = array('q')
+        self.sender_ids = array('I')
+        self.subject_offsets = array('Q')
+        self.subject_lengths = array('I')
+        self.attachment_counts = array('H')
+        self.mailbox_ids = array('H')
+        self.flags = array('B')
+        self._subjects = bytearray()
+        self._senders = []
+        self._sender_lookup = {}
+        self._mailboxes = []
+        self._mailbox_lookup = {}
+        self._pending = {}  # email id -> received_ts while the body is being fetched
+        self._max_id = 0
+        self._revision = None
+        self.with_attachments = 0
+        self.loaded = False
+
+    def __len__(self):
+        return len(self.ids)
+
+    def load(self):
+        """(Re)build the index from the database"""
+        with self._lock:
+            revision = revision_tracker(self.db_service).current()[0]
+            self._clear()
+            for row in self.db_service.iter_email_summaries():
+                self._append(row)
+            self._revision = revision
+            self.loaded = True
+            return len(self)
+
+    def sync(self):
+        """Refresh if the database changed since the last look"""
+        revision = revision_tracker(self.db_service).current()[0]
+        if not self.loaded or revision != self._revision:
+            with self._lock:
+                self.refresh()
+                self._revision = revision
+
+    def refresh(self):
+        """Add new emails and update the ones whose body was pending"""
+        with self._lock:
+            if not self.loaded:
+                self.load()
+                return
+            new_rows, updated_rows, total = self.db_service.get_email_changes(self._max_id, self._pending)
+            for row in updated_rows:
+                self._update(row)
+            self._add(new_rows)
+            if total < len(self):
+                self._drop_deleted(total)
+            if total != len(self):
+                print(f"Email index out of step ({len(self)} indexed, {total} stored), reloading")
+                self.load()
+
+    def _drop_deleted(self, total):
+        """Drop entries the database no longer has, looking from the oldest (archived) end.
+        
+        Gives up after scanning about twice as many entries as are missing,
+        leaving the reload to ``refresh``.
+        """
+        limit = 2 * (len(self) - total) + self.DELETED_SCAN_CHUNK
+        position = scanned = 0
+        while len(self) > total and position < len(self) and scanned < limit:
+            chunk = self.ids[position:position + self.DELETED_SCAN_CHUNK].tolist()
+            scanned += len(chunk)
+            existing = self.db_service.get_existing_email_ids(chunk)
+            # Delete runs of missing entries from the end of the chunk, so earlier positions stay valid
+            end = position + len(chunk)
+            while end > position:
+                if self.ids[end - 1] in existing:
+                    end -= 1
+                    continue
+                start = end - 1
+                while start > position and self.ids[start - 1] not in existing:
+                    start -= 1
+                self._delete(start, end)
+                end = start
+            position += len(existing)
+
+    def _delete(self, start, end):
+        """Remove the entries at positions [start, end) (their subjects stay in the buffer until a reload)"""
+        for position in range(start, end):
+            self._pending.pop(self.ids[position], None)
+            if self.flags[position] & HAS_ATTACHMENT:
+                self.with_attachments -= 1
+        for column in self._column_arrays():
+            del column[start:end]
+
+    # Writing
+
+    def _intern(self, value, values, lookup):
+        key = lookup.get(value)
+        if key is None:
+            key = lookup[value] = len(values)
+            values.append(value)
+        return key
+
+    def _columns(self, row):
+        email_id, sender, subject, received_ts, has_attachment, attachment_count, account, folder, pending = row
+        encoded = (subject or '').encode('utf-8', 'surrogatepass')
+        offset = len(self._subjects)
+        self._subjects += encoded
+        flags = (HAS_ATTACHMENT if has_attachment else 0) | (PENDING if pending else 0)
+        if pending:
+            self._pending[email_id] = received_ts or 0
+        if has_attachment:
+            self.with_attachments += 1
+        self._max_id = max(self._max_id, email_id)
+        return (
+            email_id,
+            received_ts or 0,
+            self._intern(sender, self._senders, self._sender_lookup),
+            offset,
+            len(encoded),
+            min(attachment_count, MAX_ATTACHMENT_COUNT),
+            self._intern((account, folder), self._mailboxes, self._mailbox_lookup),
+            flags
+        )
+
+    def _column_arrays(self):
+        return (self.ids, self.timestamps, self.sender_ids, self.subject_offsets, self.subject_lengths,
+                self.attachment_counts, self.mailbox_ids, self.flags)
+
+    def _append(self, row):
+        for column, value in zip(self._column_arrays(), self._columns(row)):
+            column.append(value)
+
+    def _add(self, rows):
+        """Insert rows (in any order) at their (received_ts, id) position"""
+        rows = sorted(rows, key=lambda row: (row[3] or 0, row[0]))
+        if not rows:
+            return
+        if not self.ids or (rows[0][3] or 0, rows[0][0]) > (self.timestamps[-1], self.ids[-1]):
+            # Usual case: newer than everything indexed
+            for row in rows:
+                self._append(row)
+        elif len(rows) <= 64:
+            for row in rows:
+                position = self._position(row[3] or 0, row[0])
+                for column, value in zip(self._column_arrays(), self._columns(row)):
+                    column.insert(position, value)
+        else:
+            self._merge(rows)
+
+    def _merge(self, rows):
+        """Merge many out-of-order rows in one pass (e.g. a history backfill)"""
+        old = self._column_arrays()
+        new_columns = [self._columns(row) for row in rows]
+        merged = [array(column.typecode) for column in old]
+        index = 0
+        for values in new_columns:
+            key = (values[1], values[0])
+            while index < len(old[0]) and (old[1][index], old[0][index]) < key:
+                for target, column in zip(merged, old):
+                    target.append(column[index])
+                index += 1
+            for target, value in zip(merged, values):
+                target.append(value)
+        for target, column in zip(merged, old):
+            target.extend(column[index:])
+        (self.ids, self.timestamps, self.sender_ids, self.subject_offsets, self.subject_lengths,
+         self.attachment_counts, self.mailbox_ids, self.flags) = merged
+
+    def _update(self, row):
+        email_id, received_ts = row[0], row[3] or 0
+        previous_ts = self._pending.pop(email_id, received_ts)
+        position = self._position(previous_ts, email_id)
+        if position >= len(self.ids) or self.ids[position] != email_id:
+            return
+        if self.flags[position] & HAS_ATTACHMENT:
+            self.with_attachments -= 1
+        if row[4]:
+            self.with_attachments += 1
+        self.attachment_counts[position] = min(row[5], MAX_ATTACHMENT_COUNT)
+        self.flags[position] = (HAS_ATTACHMENT if row[4] else 0) | (PENDING if row[8] else 0)
+        if row[8]:
+            self._pending[email_id] = received_ts
+
+    def _position(self, received_ts, email_id):
+        """Index of the first entry not before (received_ts, email_id)"""
+        position = bisect.bisect_left(self.timestamps, received_ts)
+        end = bisect.bisect_right(self.timestamps, received_ts, position)
+        while position < end and self.ids[position] < email_id:
+            position += 1
+        return position
+
+    # Reading
+
+    @staticmethod
+    def supports(listing_args):
+        """True when the index can answer a get_emails_page call (no text filters)"""
+        return not (listing_args.get('query') or listing_args.get('sender') or listing_args.get('subject'))
+
+    def row(self, position):
+        """A get_emails_page row for the entry at ``position``"""
+        received_ts = self.timestamps[position]
+        offset = self.subject_offsets[position]
+        account, folder = self._mailboxes[self.mailbox_ids[position]]
+        return (
+            self.ids[position],
+            self._senders[self.sender_ids[position]],
+            self._subjects[offset:offset + self.subject_lengths[position]].decode('utf-8', 'surrogatepass'),
+            format_received_date(received_ts),
+            self.flags[position] & HAS_ATTACHMENT,
+            self.attachment_counts[position],
+            received_ts,
+            account,
+            folder
+        )
+
+    def get_emails_page(self, before=None, limit=50, has_attachment=None, account=None, folder=None, **filters):
+        """Same rows as DatabaseService.get_emails_page (see ``supports`` for the filters)"""
+        self.sync()
+        with self._lock:
+            mailboxes = None
+            if account or folder:
+                mailboxes = {
+                    key for key, (mailbox_account, mailbox_folder) in enumerate(self._mailboxes)
+                    if (not account or mailbox_account == account) and (not folder or mailbox_folder == folder)
+                }
+                if not mailboxes:
+                    return []
+
+            position = self._position(*before) if before is not None else len(self.ids)
+            rows = []
+            while position > 0 and len(rows) < limit:
+                position -= 1
+                if has_attachment is not None and bool(self.flags[position] & HAS_ATTACHMENT) != bool(has_attachment):
+                    continue
+                if mailboxes is not None and self.mailbox_ids[position] not in mailboxes:
+                    continue
+                rows.append(self.row(position))
+            return rows
+
+    def get_stats(self):
+        """Same totals as DatabaseService.get_stats"""
+        self.sync()
+        with self._lock:
+            return {'total_emails': len(self), 'emails_with_attachments': self.with_attachments}
+
+    def memory_usage(self):
+        """Approximate bytes held by the index"""
+        with self._lock:
+            size = sum(column.buffer_info()[1] * column.itemsize for column in self._column_arrays())
+            size += len(self._subjects)
+            size += sum(sys.getsizeof(sender) for sender in self._senders)
+            size += sys.getsizeof(self._senders) + sys.getsizeof(self._sender_lookup)
+            size += sum(sys.getsizeof(value) for mailbox in self._mailboxes for value in mailbox)
+            return size
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_email_index(db_service):
+    """The process-wide index, loaded on first use; None when EMAIL_INDEX_ENABLED is off"""
+    global _index
+    if not Config.EMAIL_INDEX_ENABLED:
+        return None
+    with _index_lock:
+        if _index is None or _index.db_service.db_path != db_service.db_path:
+            index = EmailIndex(db_service)
+            started = time.perf_counter()
+            index.load()
+            print(f"✓ Email index loaded ({len(index)} emails, {index.memory_usage() / 1024 / 1024:.1f} MB, "
+                  f"{time.perf_counter() - started:.1f}s)")
+            _index = index
+        return _index
+
+def refresh():
+    """Pick up newly saved emails (called by the ingest path); no-op until the index is in use"""
+    index = _index
+    if index is not None:
+        index.refresh()
+
+def get_emails_page(db_service, **listing_args):
+    """Listing rows from the index when it can answer the query, from SQLite otherwise"""
+    index = get_email_index(db_service)
+    if index is not None and index.supports(listing_args):
+        return index.get_emails_page(**listing_args)
+    return db_service.get_emails_page(**listing_args)
+
+def get_stats(db_service):
+    """Email totals from the index, or from the summary counters when it is disabled"""
+    index = get_email_index(db_service)
+    return index.get_stats() if index is not None else db_service.get_stats()
\ No newline at end of file
@@ -1,26 +1,47 @@
 import time
 import threading
 from datetime import datetime, date
-from imap_tools import MailBox, AND
 from app.config import Config
 from app.services.db import DatabaseService
+from app.services.sync_engine import SyncEngine, open_mailbox
+from app.services.body_fetcher import BodyFetcher
+from app.services.accounts import primary_target
+from app.services.poll_scheduler import PollScheduler
+from app.services import http_cache, email_index, metrics
 
 class EmailTracker:
-    """Service for tracking and processing emails"""
+    """Service for tracking and processing the emails of one mailbox folder.
     
-    def __init__(self, socketio=None):
-        self.db_service = DatabaseService()
+    Runs on its own thread via ``start_monitoring``, or as one of many
+    trackers driven by a ``MonitorSupervisor`` (which shares its database
+    service and body fetcher and calls ``poll_once``).
+    """
+    
+    def __init__(self, socketio=None, target=None, db_service=None, body_fetcher=None, supervisor=None):
+        self.target = target or primary_target()
+        self.db_service = db_service or DatabaseService()
         self.mailbox = None
         self.is_connected = False
         self.last_error_time = None
+        self.last_error = None
         self.error_count = 0
         self.last_check_time = None
+        self.last_poll_time = None
+        self.saved_count = 0
+        self.scheduler = PollScheduler()
+        self.connection_last_used = None  # monotonic time the connection last answered
         self._running = False
         self.socketio = socketio  # WebSocket instance for real-time updates
+        self.supervisor = supervisor
+        self.sync_engine = SyncEngine(self.db_service, self.target)
+        self._owns_body_fetcher = body_fetcher is None
+        self.body_fetcher = body_fetcher or BodyFetcher(self.db_service, [self.target], emit=self.emit_update)
     
     def emit_update(self, event_type, data):
         """Emit real-time update via WebSocket"""
         if self.socketio:
+            if event_type == 'status_update' and self.supervisor and len(self.supervisor.trackers) > 1:
+                data = dict(data, mailbox=self.target.name)
             self.socketio.emit(event_type, data)
     
     def connect_to_imap(self):
@@ -32,21 +53,21 @@ class EmailTracker:
                 except Exception:
                     pass
             
-            print("Connecting to IMAP server...")
+            print(f"Connecting to IMAP server ({self.target.name})...")
             self.emit_update('status_update', {
                 'type': 'connection',
                 'status': 'connecting',
                 'message': 'Connecting to IMAP server...'
             })
             
-            self.mailbox = MailBox(Config.IMAP_SERVER).login(
-                Config.EMAIL_ADDRESS,
-                Config.EMAIL_PASSWORD
-            )
-            self.mailbox.folder.set('INBOX')
+            self.mailbox = open_mailbox(self.target.folder, self.target.account)
             self.is_connected = True
+            self.connection_last_used = time.monotonic()
             self.error_count = 0
-            print("✓ Successfully connected to IMAP server")
+            self.last_error = None
+            print(f"✓ Successfully connected to IMAP server ({self.target.name})")
+            if Config.USE_IDLE and not self.supports_idle():
+                print("Server does not support IDLE, falling back to polling")
             
             self.emit_update('status_update', {
                 'type': 'connection',
@@ -60,7 +81,8 @@ class EmailTracker:
             self.is_connected = False
             self.mailbox = None
             error_msg = f"IMAP connection error (attempt {self.error_count}): {str(e)}"
-            print(f"✗ {error_msg}")
+            self.last_error = error_msg
+            print(f"✗ {self.target.name}: {error_msg}")
             
             self.emit_update('status_update', {
                 'type': 'error',
@@ -70,15 +92,63 @@ class EmailTracker:
             })
             return False
     
+    def check_connection(self):
+        """Whether the open connection can be reused for the next pass.
+        
+        A connection unused for POLL_NOOP_AFTER seconds is probed with NOOP
+        first, so one the server or a NAT dropped in the meantime is replaced
+        in the same pass instead of failing it (and backing off).
+        """
+        if not self.is_connected or self.mailbox is None:
+            return False
+        if self.connection_last_used is not None and time.monotonic() - self.connection_last_used < Config.POLL_NOOP_AFTER:
+            return True
+        try:
+            with metrics.POLL_STAGE_SECONDS.labels('noop').time():
+                self.mailbox.client.noop()
+            self.connection_last_used = time.monotonic()
+            return True
+        except Exception as e:
+            print(f"Connection to {self.target.name} lost ({str(e)}), reconnecting")
+            self.is_connected = False
+            return False
+    
+    def supports_idle(self):
+        """Check whether IDLE push mode can be used on the current connection"""
+        return (
+            Config.USE_IDLE
+            and self.mailbox is not None
+            and 'IDLE' in self.mailbox.client.capabilities
+        )
+    
+    def wait_for_changes(self):
+        """Block until the folder changes (IDLE) or the poll interval elapses"""
+        if not self.is_connected or not self.supports_idle():
+            time.sleep(self.scheduler.delay)
+            return
+        
+        # Re-issue IDLE every IDLE_TIMEOUT seconds so the server never drops us,
+        # polling in short slices so stop_monitoring() is noticed promptly
+        deadline = time.monotonic() + Config.IDLE_TIMEOUT
+        self.mailbox.idle.start()
+        try:
+            while self._running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                responses = self.mailbox.idle.poll(timeout=min(remaining, 5))
+                if any(b'EXISTS' in response for response in responses):
+                    break
+        finally:
+            self.mailbox.idle.stop()
+            self.connection_last_used = time.monotonic()
+    
     def get_last_email_date(self):
         """Get the date of the last processed email from database"""
         try:
-            with self.db_service.get_connection() as conn:
-                c = conn.cursor()
-                c.execute('SELECT MAX(received_date) FROM emails')
-                result = c.fetchone()
-                if result and result[0]:
-                    return datetime.strptime(result[0], '%d-%m-%Y %H:%M:%S').replace(tzinfo=Config.TIMEZONE)
+            last_ts = self.db_service.get_last_received_ts(self.target.account.name, self.target.folder)
+            if last_ts:
+                return datetime.fromtimestamp(last_ts, Config.TIMEZONE)
         except Exception as e:
             print(f"Error getting last email date: {e}")
         
@@ -97,68 +167,98 @@ class EmailTracker:
             print(f"Error checking if email is processed: {e}")
             return False
     
-    def save_email_to_db(self, msg):
-        """Save email and its attachments to database"""
-        print(f"\nProcessing email: '{msg.subject}' from {msg.from_}")
-        
-        if self.is_email_processed(msg.uid):
-            return False
+    def build_email_record(self, msg, attachment_count=None):
+        """Convert a fetched message into a record for DatabaseService.save_emails_batch.
         
+        When ``attachment_count`` is given ``msg`` only carries headers: the
+        email is stored as pending and its body is queued for download.
+        """
         local_date = msg.date.astimezone(Config.TIMEZONE)
-        received_date_str = local_date.strftime('%d-%m-%Y %H:%M:%S')
+        headers_only = attachment_count is not None
+        attachments = [] if headers_only else [(att.filename, att.payload) for att in msg.attachments]
+        # Streamed messages (see fetch_messages) arrive with their attachments already stored
+        stored_attachments = [] if headers_only else getattr(msg, 'stored_attachments', [])
+        if not headers_only:
+            attachment_count = len(attachments) + len(stored_attachments)
         
-        try:
-            email_id = self.db_service.save_email(
-                message_id=msg.uid,
-                sender=msg.from_,
-                subject=msg.subject,
-                body=msg.text,
-                received_date=received_date_str,
-                has_attachment=bool(msg.attachments)
+        return {
+            'message_id': self.target.message_key(msg.uid),
+            'uid': msg.uid,
+            'account': self.target.account.name,
+            'folder': self.target.folder,
+            'sender': msg.from_,
+            'subject': msg.subject,
+            'body': None if headers_only else msg.text,
+            'html': None if headers_only else msg.html,
+            'received_date': local_date.strftime('%d-%m-%Y %H:%M:%S'),
+            'received_ts': int(local_date.timestamp()),
+            'has_attachment': attachment_count > 0,
+            'body_status': 'pending' if headers_only else 'complete',
+            'attachments': attachments,
+            'stored_attachments': stored_attachments,
+            'attachment_count': attachment_count,
+            'local_date': local_date
+        }
+    
+    def save_emails_to_db(self, messages, attachment_counts=None):
+        """Save a poll's worth of emails in one transaction and emit updates.
+        
+        Returns the number of newly stored emails; duplicates are skipped.
+        """
+        records = [
+            self.build_email_record(
+                msg, attachment_counts.get(msg.uid, 0) if attachment_counts is not None else None
             )
-            
+            for msg in messages
+        ]
+        saved = self.db_service.save_emails_batch(records)
+        if saved:
+            http_cache.invalidate(self.db_service)
+            email_index.refresh()
+        self.announce_saved(records, saved)
+        return len(saved)
+    
+    def announce_saved(self, records, saved):
+        """Queue pending bodies and emit ``new_email``/``stats_update`` for the newly saved records"""
+        for record in records:
+            email_id = saved.get(record['message_id'])
             if email_id is None:
-                return False
+                continue
             
-            # Save attachments if any
-            attachment_count = 0
-            for att in msg.attachments:
-                self.db_service.save_attachment(email_id, att.filename, att.payload)
-                attachment_count += 1
+            if record['body_status'] == 'pending':
+                self.body_fetcher.enqueue(email_id, record['uid'], self.target)
             
-            print(f"✓ Saved: '{msg.subject}' from {msg.from_}")
+            print(f"✓ Saved: '{record['subject']}' from {record['sender']}")
             
             # Emit real-time update for new email
             self.emit_update('new_email', {
                 'id': email_id,
-                'sender': msg.from_,
-                'subject': msg.subject,
-                'received_date': received_date_str,
-                'has_attachment': bool(msg.attachments),
-                'attachment_count': attachment_count
+                'sender': record['sender'],
+                'subject': record['subject'],
+                'received_date': record['received_date'],
+                'has_attachment': record['has_attachment'],
+                'attachment_count': record['attachment_count'],
+                'account': record['account'],
+                'folder': record['folder']
             })
-            
+            self.last_check_time = max(self.last_check_time, record['local_date'])
+        
+        self.saved_count += len(saved)
+        if saved:
             # Update stats
             stats = self.get_current_stats()
             self.emit_update('stats_update', stats)
-            
-            self.last_check_time = local_date
-            return True
-            
-        except Exception as e:
-            print(f"✗ Error saving email: {str(e)}")
-            return False
     
     def get_current_stats(self):
         """Get current email statistics"""
+        if self.supervisor:
+            return self.supervisor.get_current_stats()
         try:
-            email_rows = self.db_service.get_all_emails()
-            total_emails = len(email_rows)
-            emails_with_attachments = sum(1 for row in email_rows if row[4])
+            stats = self.db_service.get_stats()
             
             return {
-                'total_emails': total_emails,
-                'emails_with_attachments': emails_with_attachments,
+                'total_emails': stats['total_emails'],
+                'emails_with_attachments': stats['emails_with_attachments'],
                 'monitoring_status': 'Active' if self.is_connected else 'Disconnected',
                 'last_updated': datetime.now().strftime('%H:%M:%S')
             }
@@ -170,96 +270,167 @@ class EmailTracker:
                 'last_updated': datetime.now().strftime('%H:%M:%S')
             }
     
-    def process_emails(self):
-        """Main email processing loop"""
-        self._running = True
+    def get_status(self):
+        """Connection and sync status of this mailbox (reported in stats_update)"""
+        if self.is_connected:
+            status = 'connected'
+        elif self.last_error:
+            status = 'error'
+        else:
+            status = 'disconnected'
+        return {
+            'account': self.target.account.name,
+            'folder': self.target.folder,
+            'status': status,
+            'last_check': self.last_poll_time.strftime('%H:%M:%S') if self.last_poll_time else None,
+            'error_count': self.error_count,
+            'last_error': self.last_error,
+            'saved_count': self.saved_count,
+            'schedule': self.scheduler.state()
+        }
+    
+    def last_poll_age(self):
+        """Seconds since the last successful pass, None before the first one"""
+        if self.last_poll_time is None:
+            return None
+        return (datetime.now(Config.TIMEZONE) - self.last_poll_time).total_seconds()
+    
+    def record_failure(self):
+        """Back off after a failed pass and report when the retry is due, returns its delay"""
+        delay = self.scheduler.record_failure()
+        print(f"Retrying {self.target.name} in {delay:.0f}s (failure {self.scheduler.failures})")
+        self.emit_update('status_update', {
+            'type': 'error',
+            'status': 'error',
+            'message': f"{self.last_error} (retrying in {delay:.0f}s)",
+            'schedule': self.scheduler.state()
+        })
+        return delay
+    
+    def poll_once(self):
+        """Run one sync pass: connect if needed, fetch and store new emails.
         
+        Either way ``scheduler.delay`` is then the time until the next pass:
+        the adaptive poll interval, or the backoff when False is returned
+        because the pass failed.
+        """
         if self.last_check_time is None:
             self.last_check_time = self.get_last_email_date()
-            print(f"Starting email monitoring from: {self.last_check_time}")
+            print(f"Starting email monitoring of {self.target.name} from: {self.last_check_time}")
         
-        while self._running:
-            try:
-                if not self.is_connected:
-                    if not self.connect_to_imap():
-                        if self.error_count >= Config.MAX_RETRIES:
-                            print(f"Max retries ({Config.MAX_RETRIES}) reached. Waiting {Config.RETRY_DELAY} seconds...")
-                            time.sleep(Config.RETRY_DELAY)
-                            self.error_count = 0
-                        time.sleep(5)
-                        continue
-
-                print(f"\nChecking for emails since: {self.last_check_time}")
-                
-                # Emit checking status
-                self.emit_update('status_update', {
-                    'type': 'checking',
-                    'status': 'checking',
-                    'message': 'Checking for new emails...',
-                    'last_check': self.last_check_time.strftime('%H:%M:%S')
-                })
-                
-                search_date = self.last_check_time.date()
-                criteria = AND(date_gte=search_date)
-                
-                all_emails = list(self.mailbox.fetch(criteria, reverse=True))
-                
-                new_emails = []
-                processed_count = 0
-                
-                for msg in all_emails:
-                    email_time = msg.date.astimezone(Config.TIMEZONE)
-                    if email_time > self.last_check_time:
-                        if not self.is_email_processed(msg.uid):
-                            new_emails.append(msg)
-                        else:
-                            processed_count += 1
-                
-                if new_emails:
-                    print(f"Found {len(new_emails)} new emails")
-                    
-                    for msg in new_emails:
-                        try:
-                            if self.save_email_to_db(msg):
-                                print(f"✓ Processed: '{msg.subject}'")
-                        except Exception as e:
-                            print(f"✗ Error processing email '{msg.subject}': {str(e)}")
-                            self.is_connected = False
-                            break
-                else:
-                    status_msg = f"No new emails found ({processed_count} already processed)" if processed_count > 0 else "No new emails found"
-                    print(status_msg)
-                    
-                    self.emit_update('status_update', {
-                        'type': 'check_complete',
-                        'status': 'active',
-                        'message': status_msg
-                    })
+        try:
+            if not self.check_connection():
+                with metrics.POLL_STAGE_SECONDS.labels('connect').time():
+                    connected = self.connect_to_imap()
+                if not connected:
+                    metrics.POLLS.labels(self.target.name, 'error').inc()
+                    self.record_failure()
+                    return False
+            
+            print(f"\nChecking {self.target.name} for emails since: {self.last_check_time}")
+            
+            # Emit checking status
+            self.emit_update('status_update', {
+                'type': 'checking',
+                'status': 'checking',
+                'message': 'Checking for new emails...',
+                'last_check': self.last_check_time.strftime('%H:%M:%S')
+            })
+            
+            started = time.perf_counter()
+            with metrics.POLL_STAGE_SECONDS.labels('fetch').time():
+                new_emails = self.sync_engine.fetch_new(
+                    self.mailbox,
+                    since=self.last_check_time,
+                    headers_only=Config.TWO_PHASE_FETCH
+                )
+            attachment_counts = None
+            if Config.TWO_PHASE_FETCH:
+                with metrics.POLL_STAGE_SECONDS.labels('bodystructure').time():
+                    attachment_counts = self.sync_engine.fetch_attachment_counts(
+                        self.mailbox, [msg.uid for msg in new_emails]
+                    )
+            processed_count = 0
+            saved_count = 0
+            
+            if new_emails:
+                print(f"Found {len(new_emails)} new emails")
                 
-                time.sleep(Config.CHECK_INTERVAL)
+                try:
+                    with metrics.POLL_STAGE_SECONDS.labels('save').time():
+                        saved_count = self.save_emails_to_db(new_emails, attachment_counts)
+                    processed_count = len(new_emails) - saved_count
+                    self.sync_engine.checkpoint(new_emails[-1].uid)
+                except Exception as e:
+                    print(f"✗ Error saving emails: {str(e)}")
+                    self.sync_engine.mark_failed()
+                    self.is_connected = False
+                    metrics.POLLS.labels(self.target.name, 'error').inc()
+                    # A failed write is not an empty poll: report it, back off and leave last_poll_time alone
+                    self.last_error = f'Error saving emails: {str(e)}'
+                    self.record_failure()
+                    return False
+            
+            self.scheduler.record_success(saved_count)
+            if not saved_count:
+                status_msg = f"No new emails found ({processed_count} already processed)" if processed_count > 0 else "No new emails found"
+                print(status_msg)
                 
-            except Exception as e:
-                print(f"✗ Error in main loop: {str(e)}")
-                self.is_connected = False
                 self.emit_update('status_update', {
-                    'type': 'error',
-                    'status': 'error',
-                    'message': f'Error in main loop: {str(e)}'
+                    'type': 'check_complete',
+                    'status': 'active',
+                    'message': status_msg,
+                    'schedule': self.scheduler.state()
                 })
-                time.sleep(5)
+            
+            self.sync_engine.complete()
+            self.last_poll_time = datetime.now(Config.TIMEZONE)
+            self.connection_last_used = time.monotonic()
+            if Config.TWO_PHASE_FETCH:
+                self.body_fetcher.enqueue_pending()
+            metrics.POLL_STAGE_SECONDS.labels('pass').observe(time.perf_counter() - started)
+            metrics.POLLS.labels(self.target.name, 'ok').inc()
+            return True
+            
+        except Exception as e:
+            print(f"✗ Error in main loop ({self.target.name}): {str(e)}")
+            metrics.POLLS.labels(self.target.name, 'error').inc()
+            self.is_connected = False
+            self.last_error = f'Error in main loop: {str(e)}'
+            self.record_failure()
+            return False
+    
+    def process_emails(self):
+        """Main email processing loop"""
+        self._running = True
+        
+        while self._running:
+            if self.poll_once():
+                self.wait_for_changes()
+            else:
+                time.sleep(self.scheduler.delay)
     
     def start_monitoring(self):
         """Start email monitoring in background thread"""
         email_thread = threading.Thread(target=self.process_emails, daemon=True)
         email_thread.start()
+        if Config.TWO_PHASE_FETCH:
+            self.body_fetcher.start()
         print("✓ Email monitoring started")
     
     def stop_monitoring(self):
         """Stop email monitoring"""
         self._running = False
+        if self._owns_body_fetcher:
+            self.body_fetcher.stop()
+        self.disconnect()
+        print("✓ Email monitoring stopped")
+    
+    def disconnect(self):
+        """Log out of the IMAP server"""
+        self.is_connected = False
         if self.mailbox:
             try:
                 self.mailbox.logout()
             except Exception:
-                pass
-        print("✓ Email monitoring stopped")
\ No newline at end of file
+                pass
\ No newline at end of file
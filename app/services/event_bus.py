@@ -0,0 +1,91 @@
+import json
+import sqlite3
+import threading
+import time
+import socketio
+from app.config import Config
+
+class SQLiteManager(socketio.PubSubManager):
+    """Socket.IO client manager that passes events between processes through an SQLite file.
+
+    The local stand-in for a Redis or AMQP message queue: every web process
+    and the ingest process point SOCKETIO_MESSAGE_QUEUE at the same
+    ``sqlite:///events.db``. Emitting inserts a row; each web process tails
+    the table from a background task (every EVENT_BUS_POLL_INTERVAL seconds
+    while it is idle) and delivers the events to its own clients. Rows are
+    deleted after EVENT_BUS_RETENTION seconds; a process only reads what was
+    published after it started.
+
+    URLs follow SQLAlchemy: ``sqlite:///events.db`` is relative to the
+    working directory, ``sqlite:////var/lib/email-tracker/events.db`` absolute.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, url='sqlite:///events.db', channel='flask-socketio', write_only=False, logger=None,
+                 json=None, poll_interval=None, retention=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.path = url.split('://', 1)[1][1:]
+        self.poll_interval = Config.EVENT_BUS_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.retention = Config.EVENT_BUS_RETENTION if retention is None else retention
+        self._conn = None
+        self._lock = threading.Lock()
+        self._pruned_at = time.monotonic()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=Config.SQLITE_BUSY_TIMEOUT, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=OFF')  # events are transient, losing the last ones in a crash is fine
+        # AUTOINCREMENT: ids are never reused after old rows are deleted, so readers can resume by id
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                channel TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                payload TEXT NOT NULL
+            )
+        ''')
+        return conn
+
+    def _publish(self, data):
+        payload = json.dumps(data)
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._connect()
+            self._conn.execute(
+                'INSERT INTO events (channel, created_at, payload) VALUES (?, ?, ?)',
+                (self.channel, time.time(), payload)
+            )
+            if time.monotonic() - self._pruned_at >= self.retention:
+                self._conn.execute('DELETE FROM events WHERE created_at < ?', (time.time() - self.retention,))
+                self._pruned_at = time.monotonic()
+
+    def _listen(self):
+        conn = self._connect()
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()[0]
+        while True:
+            rows = conn.execute(
+                'SELECT id, payload FROM events WHERE id > ? AND channel = ? ORDER BY id LIMIT 500',
+                (last_id, self.channel)
+            ).fetchall()
+            for row_id, payload in rows:
+                last_id = row_id
+                yield json.loads(payload)
+            if not rows:
+                # A green sleep under gevent, so the web server keeps serving
+                self.server.sleep(self.poll_interval)
+
+def socketio_options(write_only=False):
+    """Keyword arguments for ``SocketIO`` that connect it to SOCKETIO_MESSAGE_QUEUE.
+
+    ``sqlite://`` URLs get a ``SQLiteManager``; other URLs (redis://,
+    amqp://, ...) are left to Flask-SocketIO. ``write_only`` is for
+    processes that only emit (ingest, backfill), which pass no app.
+    """
+    url = Config.SOCKETIO_MESSAGE_QUEUE
+    if not url:
+        return {}
+    if url.startswith('sqlite://'):
+        return {'message_queue': url, 'client_manager': SQLiteManager(url, write_only=write_only)}
+    return {'message_queue': url}
\ No newline at end of file
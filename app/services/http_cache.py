@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from flask import request, make_response
+from app.config import Config
+from app.services import compression
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ``ttl`` seconds"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class RevisionTracker:
+    """In-process view of the database change counter (DatabaseService.get_revision).
+
+    The counter is re-read at most every ``ttl`` seconds, so validating a
+    cached response usually costs no query at all. Writers in this process
+    call ``invalidate`` so their changes are visible immediately; writes from
+    other processes show up within ``ttl``.
+    """
+
+    def __init__(self, db_service, ttl):
+        self.db_service = db_service
+        self.ttl = ttl
+        self._value = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Return (revision, modified_at)"""
+        with self._lock:
+            if self._value is None or time.monotonic() - self._checked_at >= self.ttl:
+                self._value = self.db_service.get_revision()
+                self._checked_at = time.monotonic()
+            return self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+response_cache = TTLCache(Config.HTTP_CACHE_SIZE, Config.HTTP_CACHE_TTL)
+_revisions = {}
+_revisions_lock = threading.Lock()
+
+def revision_tracker(db_service):
+    """Return the shared RevisionTracker for the database behind ``db_service``"""
+    with _revisions_lock:
+        tracker = _revisions.get(db_service.db_path)
+        if tracker is None:
+            tracker = _revisions[db_service.db_path] = RevisionTracker(db_service, Config.HTTP_CACHE_REVISION_TTL)
+        return tracker
+
+def invalidate(db_service=None):
+    """Drop cached responses after an ingest so the next request sees the new revision"""
+    with _revisions_lock:
+        trackers = list(_revisions.values()) if db_service is None else [_revisions.get(db_service.db_path)]
+    for tracker in trackers:
+        if tracker is not None:
+            tracker.invalidate()
+    response_cache.clear()
+
+def revision_cached(db_service):
+    """Decorator for GET views whose output only changes when the database does.
+
+    The ETag is the database revision; Last-Modified is the time of the last
+    write. A matching ``If-None-Match`` (or an ``If-Modified-Since`` that is
+    not older) is answered with 304 before the view runs, and successful
+    responses are kept in ``response_cache`` keyed by URL, revision and
+    content coding, so each is compressed once.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not Config.HTTP_CACHE_ENABLED:
+                return view(*args, **kwargs)
+
+            revision, modified_at = revision_tracker(db_service).current()
+            etag = f"r{revision}"
+            last_modified = datetime.fromtimestamp(modified_at, timezone.utc) if modified_at else None
+
+            not_modified = (
+                request.if_none_match.contains_weak(etag) if request.if_none_match
+                else bool(last_modified and request.if_modified_since
+                          and last_modified.replace(microsecond=0) <= request.if_modified_since)
+            )
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                encoding = compression.negotiate(request.accept_encodings)
+                key = (request.full_path, revision, encoding)
+                cached = response_cache.get(key)
+                if cached is not None:
+                    body, status, mimetype, content_encoding = cached
+                    response = make_response(body, status)
+                    response.mimetype = mimetype
+                    if content_encoding:
+                        response.headers['Content-Encoding'] = content_encoding
+                    if mimetype in compression.COMPRESSIBLE_MIMETYPES:
+                        response.vary.add('Accept-Encoding')
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response  # errors are neither cached nor validated
+                    compression.compress_response(response, encoding)
+                    response_cache.set(key, (response.get_data(), response.status_code, response.mimetype,
+                                             response.headers.get('Content-Encoding')))
+
+            # Weak once compressed: the bytes depend on the coding, the content does not
+            response.set_etag(etag, weak='Content-Encoding' in response.headers)
+            response.last_modified = last_modified
+            # Clients may keep the payload but must revalidate before reuse
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
\ No newline at end of file
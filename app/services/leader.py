@@ -0,0 +1,68 @@
+import fcntl
+import os
+import time
+from app.config import Config
+
+class LeaderLock:
+    """Exclusive lock that makes one process the ingester.
+
+    An advisory ``flock`` on INGEST_LOCK_PATH (``ingest.lock`` next to the
+    database by default). The kernel releases it when the holder exits or
+    dies, so there is no stale lock to clean up and a standby waiting in
+    ``acquire(wait=True)`` takes over within ``retry_interval`` seconds.
+    The file holds the holder's pid for ``holder()``. Works between
+    processes on one host (or a filesystem with working flock).
+    """
+
+    def __init__(self, path=None, retry_interval=None):
+        self.path = path or Config.INGEST_LOCK_PATH or os.path.join(
+            os.path.dirname(os.path.abspath(Config.DATABASE_PATH)), 'ingest.lock'
+        )
+        self.retry_interval = Config.INGEST_LOCK_RETRY if retry_interval is None else retry_interval
+        self._fd = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def acquire(self, wait=False, stopped=None):
+        """Take the lock, returns whether it was taken.
+
+        With ``wait``, retries until it is free or ``stopped`` (a
+        threading.Event) is set.
+        """
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if not wait or (stopped is not None and stopped.is_set()):
+                    os.close(fd)
+                    return False
+                if stopped is not None:
+                    stopped.wait(self.retry_interval)
+                else:
+                    time.sleep(self.retry_interval)
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        os.ftruncate(self._fd, 0)
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    def holder(self):
+        """Pid written by the process holding the lock, None when unknown"""
+        try:
+            with open(self.path) as f:
+                return int(f.read().strip() or 0) or None
+        except (FileNotFoundError, ValueError):
+            return None
\ No newline at end of file
@@ -0,0 +1,362 @@
+import bisect
+import inspect
+import math
+import threading
+import time
+import weakref
+from functools import wraps
+from app.config import Config
+
+# Seconds; the IMAP stages take seconds, database calls and routes milliseconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+class _NullChild:
+    """Stands in for every metric child while METRICS_ENABLED is off"""
+
+    def inc(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+    def time(self):
+        return _NULL_TIMER
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL = _NullChild()
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    __slots__ = ('_child', '_started')
+
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._started)
+        return False
+
+class _Value:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+class _HistogramValue:
+    __slots__ = ('buckets', 'counts', 'sum', '_lock')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+class Metric:
+    """A named metric with a fixed list of label names; ``labels(...)`` returns the series to update.
+
+    Series are created on first use and kept for the life of the process,
+    so label values must come from a small set (mailbox names, routes,
+    method names), never from message data.
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def labels(self, *values):
+        if not Config.METRICS_ENABLED:
+            return _NULL
+        series = self._series.get(values)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(values, self._new_series())
+        return series
+
+    def _new_series(self):
+        return _Value()
+
+    def samples(self):
+        """(suffix, label pairs, value) of every series"""
+        for values, series in list(self._series.items()):
+            yield '', list(zip(self.labelnames, values)), series.value
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+class Gauge(Metric):
+    """Gauge set by the code, or computed at scrape time when ``collect`` is given.
+
+    ``collect()`` returns (label values, value) pairs.
+    """
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), collect=None):
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def samples(self):
+        if self.collect is None:
+            yield from super().samples()
+            return
+        for values, value in self.collect():
+            yield '', list(zip(self.labelnames, values)), value
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_series(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def samples(self):
+        for values, series in list(self._series.items()):
+            labels = list(zip(self.labelnames, values))
+            with series._lock:
+                counts = list(series.counts)
+                total = series.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield '_bucket', labels + [('le', _format_value(bound))], cumulative
+            yield '_sum', labels, total
+            yield '_count', labels, cumulative
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                print(f"✗ Error collecting {metric.name}: {str(e)}")
+                continue
+            for suffix, labels, value in samples:
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+REGISTRY = Registry()
+
+# Monitors (MonitorSupervisor / AsyncIngestPipeline) running in this process
+_monitors = weakref.WeakSet()
+
+def register_monitor(monitor):
+    _monitors.add(monitor)
+
+def unregister_monitor(monitor):
+    _monitors.discard(monitor)
+
+def monitors():
+    return list(_monitors)
+
+def _trackers():
+    return [tracker for monitor in monitors() for tracker in monitor.trackers]
+
+def _collect_connected():
+    return [((tracker.target.name,), 1 if tracker.is_connected else 0) for tracker in _trackers()]
+
+def _collect_poll_age():
+    return [
+        ((tracker.target.name,), age) for tracker in _trackers()
+        for age in (tracker.last_poll_age(),) if age is not None
+    ]
+
+def _collect_body_queue():
+    return [((), monitor.body_fetcher.queue.qsize()) for monitor in monitors()]
+
+# Ingest (EmailTracker.poll_once, AsyncIngestPipeline)
+POLL_STAGE_SECONDS = Histogram(
+    'email_tracker_poll_stage_seconds', 'Duration of each stage of a mailbox sync pass', ['stage']
+)
+POLLS = Counter('email_tracker_polls_total', 'Sync passes by mailbox and result (ok, error)', ['mailbox', 'result'])
+IMAP_RECEIVED_BYTES = Counter(
+    'email_tracker_imap_received_bytes_total', 'Bytes read from IMAP connections', ['account']
+)
+EMAILS_SAVED = Counter('email_tracker_emails_saved_total', 'Emails stored')
+EMAILS_DUPLICATE = Counter('email_tracker_emails_duplicate_total', 'Fetched emails skipped as already stored')
+EMAILS_ARCHIVED = Counter('email_tracker_emails_archived_total', 'Emails moved to the monthly archive files')
+IMAP_CONNECTED = Gauge(
+    'email_tracker_imap_connected', '1 while the mailbox connection is up', ['mailbox'], collect=_collect_connected
+)
+LAST_POLL_AGE = Gauge(
+    'email_tracker_last_poll_age_seconds', 'Seconds since the last successful sync pass', ['mailbox'],
+    collect=_collect_poll_age
+)
+BODY_QUEUE = Gauge('email_tracker_body_queue_size', 'Body downloads waiting in the queue', collect=_collect_body_queue)
+
+# Database (DatabaseService public methods)
+DB_CALL_SECONDS = Histogram('email_tracker_db_call_seconds', 'DatabaseService call duration', ['method'])
+DB_ERRORS = Counter('email_tracker_db_errors_total', 'DatabaseService calls that raised', ['method'])
+
+# HTTP (Flask routes)
+HTTP_REQUEST_SECONDS = Histogram(
+    'email_tracker_http_request_seconds', 'Flask request duration by route', ['route', 'method']
+)
+HTTP_RESPONSES = Counter('email_tracker_http_responses_total', 'Flask responses by route and status', ['route', 'status'])
+
+# Attachment previews (PreviewService)
+PREVIEWS = Counter(
+    'email_tracker_previews_total', 'Preview requests by result (hit, generated, unavailable)', ['result']
+)
+
+# WebSocket (EventBroadcaster)
+WEBSOCKET_BACKLOG = Gauge('email_tracker_websocket_backlog', 'Events buffered for the next WebSocket flush')
+WEBSOCKET_FRAMES = Counter('email_tracker_websocket_frames_total', 'WebSocket frames sent by event', ['event'])
+WEBSOCKET_EMIT_SECONDS = Histogram('email_tracker_websocket_emit_seconds', 'Duration of one WebSocket emit')
+
+def render():
+    return REGISTRY.render()
+
+def instrument_methods(histogram, errors, exclude=()):
+    """Class decorator: time every public method (generators, static methods and ``exclude`` excepted)"""
+    def decorate(cls):
+        if not Config.METRICS_ENABLED:
+            return cls
+        for name, function in list(vars(cls).items()):
+            if (name.startswith('_') or name in exclude or not inspect.isfunction(function)
+                    or inspect.isgeneratorfunction(function)):
+                continue
+            setattr(cls, name, _timed(function, histogram.labels(name), errors.labels(name)))
+        return cls
+    return decorate
+
+def _timed(function, series, error_series):
+    perf_counter = time.perf_counter
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        started = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except Exception:
+            error_series.inc()
+            raise
+        finally:
+            series.observe(perf_counter() - started)
+    return wrapper
+
+class CountingReader:
+    """File wrapper that counts the bytes read through it (an IMAP connection's ``client.file``)"""
+
+    def __init__(self, file, counter):
+        self._file = file
+        self._counter = counter
+
+    def read(self, size=-1):
+        data = self._file.read(size)
+        self._counter.inc(len(data))
+        return data
+
+    def readline(self, limit=-1):
+        data = self._file.readline(limit)
+        self._counter.inc(len(data))
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+def count_received_bytes(mailbox, account_name):
+    """Count what ``mailbox`` reads from the server under ``account_name``"""
+    if Config.METRICS_ENABLED:
+        client = mailbox.client
+        client.file = CountingReader(client.file, IMAP_RECEIVED_BYTES.labels(account_name))
+    return mailbox
+
+def instrument_app(app):
+    """Time every Flask request by route"""
+    if not Config.METRICS_ENABLED:
+        return app
+    from flask import request
+
+    # The request proxy costs about a microsecond per access, so it is resolved once
+    @app.before_request
+    def start_request_timer():
+        request.environ['metrics.started'] = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        current = request._get_current_object()
+        started = current.environ.pop('metrics.started', None)
+        if started is not None:
+            route = current.url_rule.rule if current.url_rule is not None else 'unmatched'
+            HTTP_REQUEST_SECONDS.labels(route, current.method).observe(time.perf_counter() - started)
+            HTTP_RESPONSES.labels(route, str(response.status_code)).inc()
+        return response
+
+    return app
\ No newline at end of file
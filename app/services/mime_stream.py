@@ -0,0 +1,398 @@
+import binascii
+import email
+import re
+from imap_tools import MailMessage
+from imap_tools.message import MailAttachment
+from imap_tools.utils import decode_value, replace_html_ct_charset
+from app.config import Config
+
+FETCH_SIZE = re.compile(rb'RFC822\.SIZE (\d+)')
+MAX_HEADER_SIZE = 256 * 1024  # header bytes kept per part; the rest is skipped
+MAX_BOUNDARY_LINE = 1024  # longer lines cannot be boundaries (at most 70 characters + "--" + "--")
+MIN_CHUNK = 64 * 1024
+# Parts MailMessage.text reads as plain text: "Content-Type: text/" (no subtype) parses as 'text/'
+PLAIN_TEXT_TYPES = ('text/plain', 'text/')
+
+HEADERS = 'headers'
+BODY = 'body'
+
+class _Base64Decoder:
+    def __init__(self):
+        self._pending = b''
+
+    def decode(self, data):
+        data = self._pending + bytes(data).translate(None, b' \t\r\n')
+        usable = len(data) - len(data) % 4
+        self._pending = data[usable:]
+        return binascii.a2b_base64(data[:usable]) if usable else b''
+
+    def flush(self):
+        pending, self._pending = self._pending, b''
+        if not pending:
+            return b''
+        try:
+            return binascii.a2b_base64(pending + b'=' * (-len(pending) % 4))
+        except binascii.Error:
+            return b''
+
+class _QuotedPrintableDecoder:
+    def __init__(self):
+        self._pending = b''
+
+    def decode(self, data):
+        data = self._pending + bytes(data)
+        # Hold back an escape sequence ("=XX") that is cut off at the end
+        end = data.rfind(b'=', max(len(data) - 2, 0))
+        end = len(data) if end == -1 else end
+        self._pending = data[end:]
+        return binascii.a2b_qp(data[:end])
+
+    def flush(self):
+        pending, self._pending = self._pending, b''
+        return binascii.a2b_qp(pending)
+
+class _IdentityDecoder:
+    def decode(self, data):
+        return bytes(data)
+
+    def flush(self):
+        return b''
+
+DECODERS = {
+    'base64': _Base64Decoder,
+    'quoted-printable': _QuotedPrintableDecoder
+}
+
+class _TextSink:
+    """Collects a text/plain or text/html body, up to the parser's shared text budget"""
+
+    def __init__(self, parser, kind, charset):
+        self.parser = parser
+        self.kind = kind
+        self.charset = charset
+        self.data = bytearray()
+
+    def write(self, data):
+        room = self.parser.text_room()
+        if len(data) > room:
+            data = data[:room]
+            self.parser.truncated = True
+        self.data += data
+        self.parser.text_bytes += len(data)
+
+    def close(self):
+        value = decode_value(bytes(self.data), self.charset)
+        if self.kind == 'html':
+            self.parser.html = replace_html_ct_charset(value, 'utf-8')
+        else:
+            self.parser.text = value
+
+    def abort(self):
+        pass
+
+class _AttachmentSink:
+    """Writes an attachment to the blob store as it arrives; over the size cap only its size is kept"""
+
+    def __init__(self, parser, filename):
+        self.parser = parser
+        self.filename = filename
+        self.size = 0
+        self.writer = parser.blob_store.writer()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.writer is None:
+            return
+        if self.parser.max_attachment_size and self.size > self.parser.max_attachment_size:
+            self.writer.abort()
+            self.writer = None
+        else:
+            self.writer.write(data)
+
+    def close(self):
+        digest = self.writer.commit() if self.writer is not None else None
+        self.parser.attachments.append((self.filename, digest, self.size))
+
+    def abort(self):
+        if self.writer is not None:
+            self.writer.abort()
+
+class StreamingMessageParser:
+    """Incremental MIME parser for messages too large to hold in memory.
+
+    ``feed`` takes the raw message in chunks of any size. Part bodies are
+    decoded (base64, quoted-printable) as they arrive: the first text/plain
+    and text/html parts are kept (together at most ``max_text_size`` bytes,
+    the rest is cut and ``truncated`` set), attachments go straight to the
+    blob store through a ``BlobWriter``. An attachment larger than
+    ``max_attachment_size`` is dropped once it passes the limit and recorded
+    with its size only. Memory use is bounded by the chunk size plus the
+    text budget, whatever the size of the message.
+
+    Parts are classified like ``imap_tools.MailMessage`` does (a filename,
+    Content-ID or message/rfc822 makes an attachment), so a streamed message
+    is stored the same way as a fetched one. ``attachments`` holds
+    (filename, sha256 or None, size) rows.
+    """
+
+    def __init__(self, blob_store, max_attachment_size=None, max_text_size=None):
+        self.blob_store = blob_store
+        self.max_attachment_size = Config.ATTACHMENT_MAX_SIZE if max_attachment_size is None else max_attachment_size
+        self.max_text_size = max_text_size or Config.STREAMING_MEMORY_BUDGET // 4
+        self.headers = None  # header block of the message itself
+        self.text = ''
+        self.html = ''
+        self.attachments = []
+        self.text_bytes = 0
+        self.truncated = False
+        self._buffer = bytearray()
+        self._state = HEADERS
+        self._header_block = bytearray()
+        self._boundaries = []  # multipart boundaries, innermost last
+        self._sink = None
+        self._decoder = None
+        self._pending_eol = b''  # line break that belongs to a boundary if one follows
+        self._at_line_start = True
+        self._claimed = set()  # 'text' / 'html' once the first such part was found
+
+    def text_room(self):
+        return max(self.max_text_size - self.text_bytes, 0)
+
+    def feed(self, data):
+        self._buffer += data
+        self._process(final=False)
+
+    def close(self):
+        """Finish after the last chunk"""
+        self._process(final=True)
+        if self._state == HEADERS:
+            self._end_headers()
+        self._emit(self._pending_eol)
+        self._pending_eol = b''
+        self._end_part()
+        if self.headers is None:
+            self.headers = b''
+        return self
+
+    def abort(self):
+        """Discard partially written attachments"""
+        if self._sink is not None:
+            self._sink.abort()
+            self._sink = None
+
+    # Parsing
+
+    def _process(self, final):
+        while self._buffer:
+            if self._state == HEADERS:
+                if not self._read_header_line(final):
+                    return
+            elif not self._read_body(final):
+                return
+
+    def _read_header_line(self, final):
+        end = self._buffer.find(b'\n')
+        if end == -1:
+            if not final and len(self._buffer) < MAX_HEADER_SIZE:
+                return False
+            end = len(self._buffer) - 1
+        line = bytes(self._buffer[:end + 1])
+        del self._buffer[:end + 1]
+        if line.strip(b'\r\n'):
+            if len(self._header_block) < MAX_HEADER_SIZE:
+                self._header_block += line
+        else:
+            self._end_headers()
+        return True
+
+    def _end_headers(self):
+        headers = bytes(self._header_block)
+        self._header_block = bytearray()
+        if self.headers is None:
+            self.headers = headers
+        part = email.message_from_bytes(headers)
+        self._state = BODY
+        self._at_line_start = True
+        self._pending_eol = b''
+        if part.get_content_maintype() == 'multipart' and part.get_boundary():
+            # Preamble up to the first boundary is skipped
+            self._boundaries.append(part.get_boundary().encode('latin-1', 'replace'))
+            self._sink = None
+            return
+        self._sink = self._open_sink(part)
+        encoding = (part.get('Content-Transfer-Encoding') or '').strip().lower()
+        self._decoder = DECODERS.get(encoding, _IdentityDecoder)()
+
+    def _open_sink(self, part):
+        content_type = part.get_content_type()
+        if not part.get_filename():
+            if content_type in PLAIN_TEXT_TYPES and 'text' not in self._claimed:
+                self._claimed.add('text')
+                return _TextSink(self, 'text', part.get_content_charset())
+            if content_type == 'text/html' and 'html' not in self._claimed:
+                self._claimed.add('html')
+                return _TextSink(self, 'html', part.get_content_charset())
+        if part.get('Content-ID') is not None or part.get_filename() is not None or content_type == 'message/rfc822':
+            return _AttachmentSink(self, MailAttachment(part).filename)
+        return None
+
+    def _emit(self, data):
+        if self._sink is not None and data:
+            self._sink.write(self._decoder.decode(data))
+
+    def _end_part(self):
+        if self._sink is not None:
+            sink, self._sink = self._sink, None
+            sink.write(self._decoder.flush())
+            sink.close()
+
+    def _boundary(self, line):
+        """(index in the boundary stack, closing) for a boundary line, None otherwise"""
+        line = line.rstrip(b' \t\r\n')
+        for index in range(len(self._boundaries) - 1, -1, -1):
+            delimiter = b'--' + self._boundaries[index]
+            if line == delimiter:
+                return index, False
+            if line == delimiter + b'--':
+                return index, True
+        return None
+
+    def _read_body(self, final):
+        buffer = self._buffer
+        if self._at_line_start and self._boundaries:
+            if len(buffer) < 2 and not final:
+                return False
+            if buffer[:2] == b'--':
+                end = buffer.find(b'\n')
+                if end == -1 and not final and len(buffer) < MAX_BOUNDARY_LINE:
+                    return False  # wait for the rest of a possible boundary line
+                line_end = len(buffer) if end == -1 else end + 1
+                match = self._boundary(bytes(buffer[:line_end]))
+                if match is not None:
+                    # The line break before a boundary belongs to the boundary
+                    del buffer[:line_end]
+                    self._pending_eol = b''
+                    self._end_part()
+                    index, closing = match
+                    del self._boundaries[index + 1:]
+                    if closing:
+                        # Epilogue: skipped until the enclosing multipart continues
+                        self._boundaries.pop()
+                    else:
+                        self._state = HEADERS
+                    return True
+        self._emit(self._pending_eol)
+        self._pending_eol = b''
+
+        # Everything before the next line that starts with "--" is content
+        candidate = buffer.find(b'\n--') if self._boundaries else -1
+        if candidate == -1:
+            if final or not self._boundaries:
+                self._emit(buffer)
+                buffer.clear()
+                return False
+            candidate = buffer.rfind(b'\n')
+            if candidate == -1:
+                # Middle of a line, so no boundary before its end; keep a "\r" that may start a CRLF
+                keep = 1 if buffer.endswith(b'\r') else 0
+                self._emit(buffer[:len(buffer) - keep])
+                del buffer[:len(buffer) - keep]
+                self._at_line_start = False
+                return False
+        eol_start = candidate - 1 if candidate > 0 and buffer[candidate - 1] == 0x0D else candidate
+        self._emit(buffer[:eol_start])
+        self._pending_eol = bytes(buffer[eol_start:candidate + 1])
+        del buffer[:candidate + 1]
+        self._at_line_start = True
+        return True
+
+class StreamedMessage(MailMessage):
+    """A message read with ``fetch_streamed``.
+
+    Headers are parsed by ``MailMessage`` as usual; ``text``/``html`` come
+    from the streaming parser and the attachments are already in the blob
+    store, listed in ``stored_attachments`` as (filename, sha256, size).
+    """
+
+    def __init__(self, uid, size, parser):
+        super().__init__([(b'', parser.headers + b'\r\n')])
+        self._uid = str(uid)
+        self._size = size
+        self._text = parser.text
+        self._html = parser.html
+        self.truncated = parser.truncated
+        self.stored_attachments = parser.attachments
+
+    @property
+    def uid(self):
+        return self._uid
+
+    @property
+    def size_rfc822(self):
+        return self._size
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def text(self):
+        return self._text
+
+    @property
+    def html(self):
+        return self._html
+
+    @property
+    def attachments(self):
+        return []
+
+def _fetch_literal(data):
+    """(response line, literal) of a single-message UID FETCH response"""
+    for item in data:
+        if isinstance(item, tuple):
+            return item[0], item[1]
+    line = next((item for item in data if isinstance(item, bytes) and item != b')'), b'')
+    return line, b''
+
+def fetch_streamed(mailbox, uid, blob_store, mark_seen=True, memory_budget=None, max_attachment_size=None):
+    """Download one message in ``BODY.PEEK[]<offset.length>`` chunks through a StreamingMessageParser.
+
+    About a quarter of ``memory_budget`` is fetched per round trip (a chunk
+    is held two or three times while it is decoded), another quarter is
+    the text budget. Returns a ``StreamedMessage``.
+    """
+    budget = memory_budget or Config.STREAMING_MEMORY_BUDGET
+    chunk_size = max(budget // 4, MIN_CHUNK)
+    parser = StreamingMessageParser(blob_store, max_attachment_size, max_text_size=max(budget // 4, MIN_CHUNK))
+    size = None
+    offset = 0
+    try:
+        while size is None or offset < size:
+            items = f'(BODY.PEEK[]<{offset}.{chunk_size}>)' if size is not None else \
+                f'(RFC822.SIZE BODY.PEEK[]<0.{chunk_size}>)'
+            status, data = mailbox.client.uid('FETCH', str(uid), items)
+            if status != 'OK':
+                raise RuntimeError(f"UID FETCH {uid} failed: {data}")
+            line, chunk = _fetch_literal(data)
+            del data
+            if size is None:
+                match = FETCH_SIZE.search(line)
+                if match is None and not chunk:
+                    raise RuntimeError(f"Message {uid} not found")
+                size = int(match.group(1)) if match else None
+            if not chunk:
+                break
+            parser.feed(chunk)
+            offset += len(chunk)
+            del chunk
+            if size is None and offset % chunk_size:
+                break  # a short chunk is the last one
+        parser.close()
+    except BaseException:
+        parser.abort()
+        raise
+    if mark_seen:
+        # Not mailbox.flag(): it also EXPUNGEs the folder
+        mailbox.client.uid('STORE', str(uid), '+FLAGS', '(\\Seen)')
+    return StreamedMessage(uid, size if size is not None else offset, parser)
\ No newline at end of file
@@ -0,0 +1,89 @@
+import math
+import random
+import time
+from app.config import Config
+
+class PollScheduler:
+    """Decides when a polled mailbox is checked next.
+
+    After a successful pass the interval follows the arrival rate (emails
+    per second), turned into the interval at which a pass finds
+    POLL_TARGET_BATCH emails and bounded by POLL_MIN_INTERVAL and
+    POLL_MAX_INTERVAL. The rate rises as soon as a pass finds more than it
+    predicts, so a burst shortens the next interval, and decays as an
+    exponentially weighted average over about POLL_RATE_WINDOW seconds, so a
+    mailbox that goes quiet drifts out to the maximum. The first interval is
+    CHECK_INTERVAL; with POLL_ADAPTIVE off it stays that.
+
+    After a failed pass the delay doubles from POLL_BACKOFF_BASE up to
+    POLL_BACKOFF_MAX, with "equal jitter" (half fixed, half random) so that
+    mailboxes of a server that went down do not all come back at once.
+    Intervals get ±POLL_JITTER for the same reason.
+
+    ``clock`` and ``rng`` can be replaced to drive it on a simulated clock
+    (see benchmarks/bench_poll_scheduler.py).
+    """
+
+    def __init__(self, clock=time.monotonic, rng=None, adaptive=None, initial_interval=None, min_interval=None,
+                 max_interval=None, rate_window=None, target_batch=None, jitter=None, backoff_base=None,
+                 backoff_max=None):
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.adaptive = Config.POLL_ADAPTIVE if adaptive is None else adaptive
+        self.min_interval = Config.POLL_MIN_INTERVAL if min_interval is None else min_interval
+        self.max_interval = Config.POLL_MAX_INTERVAL if max_interval is None else max_interval
+        self.rate_window = rate_window or Config.POLL_RATE_WINDOW
+        self.target_batch = target_batch or Config.POLL_TARGET_BATCH
+        self.jitter = Config.POLL_JITTER if jitter is None else jitter
+        self.backoff_base = backoff_base or Config.POLL_BACKOFF_BASE
+        self.backoff_max = backoff_max or Config.POLL_BACKOFF_MAX
+        self.interval = initial_interval or Config.CHECK_INTERVAL
+        if self.adaptive:
+            self.interval = min(max(self.interval, self.min_interval), self.max_interval)
+        self.rate = None  # emails per second, None until two passes have succeeded
+        self.failures = 0
+        self.delay = self.interval  # seconds until the next pass
+        self._last_success = None
+
+    def record_success(self, arrivals):
+        """Account for a pass that found ``arrivals`` new emails, returns the seconds until the next one"""
+        now = self.clock()
+        self.failures = 0
+        # The first pass catches up on whatever arrived while we were not running, which says nothing
+        # about the rate; from the second on, the emails found arrived since the previous pass
+        if self._last_success is not None and now > self._last_success:
+            elapsed = now - self._last_success
+            sample = arrivals / elapsed
+            if self.rate is None or sample > self.rate:
+                self.rate = sample
+            else:
+                # Weight by the time the sample covers, so irregular intervals average correctly
+                weight = 1 - math.exp(-elapsed / self.rate_window)
+                self.rate += weight * (sample - self.rate)
+            if self.adaptive:
+                interval = self.target_batch / self.rate if self.rate > 0 else self.max_interval
+                self.interval = min(max(interval, self.min_interval), self.max_interval)
+        self._last_success = now
+        self.delay = self.interval * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+        return self.delay
+
+    def record_failure(self):
+        """Account for a failed pass, returns the seconds to back off before the next one"""
+        self.failures += 1
+        ceiling = min(self.backoff_max, self.backoff_base * 2 ** (self.failures - 1))
+        self.delay = ceiling / 2 + self.rng.uniform(0, ceiling / 2)
+        return self.delay
+
+    @property
+    def backing_off(self):
+        return self.failures > 0
+
+    def state(self):
+        """Interval and backoff, as reported in status_update and stats_update"""
+        return {
+            'interval': round(self.interval, 1),
+            'next_check_in': round(self.delay, 1),
+            'arrival_rate': round(self.rate * 3600, 1) if self.rate is not None else None,  # emails per hour
+            'failures': self.failures,
+            'backing_off': self.backing_off
+        }
\ No newline at end of file
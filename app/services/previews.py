@@ -0,0 +1,234 @@
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from app.config import Config
+from app.services import metrics
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional: without Pillow only text attachments get a preview
+    Image = None
+
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp', 'tif', 'tiff'}
+TEXT_EXTENSIONS = {'txt', 'text', 'log', 'csv', 'tsv', 'md', 'json', 'xml', 'yaml', 'yml', 'ini', 'cfg', 'ics', 'vcf'}
+
+class DiskCache:
+    """Size-bounded LRU cache of files under ``root``.
+
+    The recency order is kept in memory and mirrored in the files' mtimes
+    (touched on every hit), so it survives a restart: the first lookup scans
+    the directory once. Files go in through a temporary name and a rename,
+    so a reader never sees a partial one. Several processes may share the
+    directory; each evicts by its own view and a file removed by another
+    one is simply a miss.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._entries = None  # name -> size, least recently used first
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def path(self, name):
+        return os.path.join(self.root, name[:2], name)
+
+    def _load(self):
+        entries = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.startswith('.tmp-'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, name, stat.st_size))
+        entries.sort()
+        self._entries = OrderedDict((name, size) for _, name, size in entries)
+        self._total = sum(size for _, _, size in entries)
+
+    def get(self, name):
+        """Path of a cached file (marked as most recently used), or None"""
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        path = self.path(name)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._total -= self._entries.pop(name, 0)
+            return None
+        return path
+
+    def put(self, name, data):
+        """Store ``data`` (bytes) under ``name``, evicting the least recently used files past ``max_bytes``"""
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        evicted = []
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            self._total += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                old_name, size = self._entries.popitem(last=False)
+                self._total -= size
+                evicted.append(old_name)
+        for old_name in evicted:
+            try:
+                os.unlink(self.path(old_name))
+            except FileNotFoundError:
+                pass
+        return path
+
+    @property
+    def size(self):
+        return self._total
+
+    def __len__(self):
+        return len(self._entries or ())
+
+class PreviewService:
+    """Downscaled renditions of attachments: thumbnails of images, the first lines of text files.
+
+    Renditions are made on first request and kept in a ``DiskCache``
+    (PREVIEW_CACHE_MAX_MB, under PREVIEW_CACHE_PATH or ``previews`` next to
+    the database) keyed by the payload's SHA-256 and the size, so an image
+    forwarded in ten emails is scaled once and a cached rendition never goes
+    stale. ``manage.py previews`` makes them ahead of time for recent mail.
+
+    Images need Pillow; JPEGs are decoded at a reduced scale (``draft``)
+    when that is still larger than the thumbnail, which skips most of the
+    decoding work for camera photos. Everything else has no preview.
+    """
+
+    def __init__(self, blob_store, root, max_bytes=None, sizes=None, text_bytes=None):
+        self.blob_store = blob_store
+        self.cache = DiskCache(root, Config.PREVIEW_CACHE_MAX_MB * 1024 * 1024 if max_bytes is None else max_bytes)
+        self.sizes = sizes or Config.PREVIEW_SIZES
+        self.text_bytes = text_bytes or Config.PREVIEW_TEXT_BYTES
+        self._pending = {}  # cache name -> lock held while the rendition is made
+        self._pending_lock = threading.Lock()
+
+    @staticmethod
+    def kind(filename):
+        """'image', 'text' or None (no preview) for an attachment's filename"""
+        extension = (filename or '').rsplit('.', 1)[-1].lower()
+        if extension in IMAGE_EXTENSIONS and Image is not None:
+            return 'image'
+        if extension in TEXT_EXTENSIONS:
+            return 'text'
+        return None
+
+    def get(self, digest, filename, size=None, content=None):
+        """Return (path, mimetype) of the attachment's rendition, or None when it has none.
+
+        ``content`` is the payload of a row not migrated to the blob store yet.
+        ``size`` (a bounding box edge in pixels, one of PREVIEW_SIZES) only
+        applies to images. Raises FileNotFoundError when the payload is
+        missing from the blob store.
+        """
+        kind = self.kind(filename)
+        if kind is None:
+            metrics.PREVIEWS.labels('unavailable').inc()
+            return None
+        size = size or self.sizes[0]
+        name, mimetype = self._cache_name(kind, digest, size)
+        path = self.cache.get(name)
+        if path is not None:
+            metrics.PREVIEWS.labels('hit').inc()
+            return path, mimetype
+
+        # One thread makes a rendition, concurrent requests for it wait and reuse it
+        with self._pending_lock:
+            lock = self._pending.setdefault(name, threading.Lock())
+        with lock:
+            try:
+                path = self.cache.get(name)
+                if path is not None:
+                    metrics.PREVIEWS.labels('hit').inc()
+                    return path, mimetype
+                data = self._render(kind, digest, size, content)
+                if data is None:
+                    metrics.PREVIEWS.labels('unavailable').inc()
+                    return None
+                path = self.cache.put(name, data)
+                metrics.PREVIEWS.labels('generated').inc()
+                return path, mimetype
+            finally:
+                with self._pending_lock:
+                    self._pending.pop(name, None)
+
+    @staticmethod
+    def _cache_name(kind, digest, size):
+        if kind == 'text':
+            return f'{digest}.txt', 'text/plain'  # UTF-8, send_file adds the charset
+        return f'{digest}-{size}.jpg', 'image/jpeg'
+
+    def _open(self, digest, content):
+        if content is not None:
+            return io.BytesIO(content)
+        return self.blob_store.open(digest)
+
+    def _render(self, kind, digest, size, content):
+        with self._open(digest, content) as source:
+            if kind == 'text':
+                return self._text_excerpt(source)
+            try:
+                return self._thumbnail(source, size)
+            except (OSError, ValueError, Image.DecompressionBombError) as e:
+                # Not an image Pillow can read after all (or a truncated one)
+                print(f"✗ Error making thumbnail of {digest}: {str(e)}")
+                return None
+
+    def _text_excerpt(self, source):
+        """The first PREVIEW_TEXT_BYTES of a text file, cut at a line end"""
+        data = source.read(self.text_bytes + 1)
+        if len(data) > self.text_bytes:
+            data = data[:self.text_bytes]
+            cut = data.rfind(b'\n')
+            if cut > 0:
+                data = data[:cut + 1]
+        return data.decode('utf-8', errors='replace').encode('utf-8')
+
+    @staticmethod
+    def _thumbnail(source, size):
+        with Image.open(source) as image:
+            # JPEG only: decode at the smallest 1/2, 1/4 or 1/8 scale still covering the box
+            image.draft('RGB', (size, size))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+            if image.mode in ('RGBA', 'LA', 'P'):
+                # Transparent areas on white, as the page shows them
+                image = image.convert('RGBA')
+                background = Image.new('RGB', image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel('A'))
+                image = background
+            elif image.mode != 'RGB':
+                image = image.convert('RGB')
+            output = io.BytesIO()
+            image.save(output, 'JPEG', quality=Config.PREVIEW_JPEG_QUALITY, optimize=True)
+            return output.getvalue()
+
+def create_preview_service(db_service):
+    """PreviewService for the attachments of ``db_service``'s database"""
+    root = Config.PREVIEW_CACHE_PATH or os.path.join(os.path.dirname(os.path.abspath(db_service.db_path)), 'previews')
+    return PreviewService(db_service.blob_store, root)
\ No newline at end of file
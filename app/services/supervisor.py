@@ -0,0 +1,165 @@
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+from app.config import Config
+from app.services.db import DatabaseService
+from app.services.accounts import load_targets
+from app.services.body_fetcher import BodyFetcher
+from app.services.email_tracker import EmailTracker
+from app.services.broadcaster import EventBroadcaster
+from app.services.archive import EmailArchiver
+from app.services import metrics
+
+class MonitorSupervisor:
+    """Monitors many (account, folder) mailboxes on a bounded pool of worker threads.
+
+    Every mailbox has its own ``EmailTracker`` (connection, sync checkpoint
+    and retry state). Trackers wait in a schedule ordered by due time; a free
+    worker takes the next due tracker, runs one ``poll_once`` pass and puts it
+    back with its next due time from the tracker's ``PollScheduler``: the
+    adaptive poll interval after a successful pass, the jittered backoff
+    after a failure. When there are at least as many workers as mailboxes
+    each worker can also wait in IMAP IDLE.
+    
+    WebSocket events of all trackers go through one ``EventBroadcaster``.
+    Emails past the retention window are moved to the monthly archives by
+    an ``EmailArchiver`` thread (when ARCHIVE_AFTER_DAYS is set).
+    """
+
+    def __init__(self, socketio=None, targets=None, pool_size=None):
+        self.socketio = socketio
+        self.broadcaster = EventBroadcaster(socketio) if socketio else None
+        self.db_service = DatabaseService()
+        self.targets = targets or load_targets()
+        self.body_fetcher = BodyFetcher(self.db_service, self.targets, emit=self.emit_update)
+        self.trackers = [
+            EmailTracker(
+                socketio=self.broadcaster,
+                target=target,
+                db_service=self.db_service,
+                body_fetcher=self.body_fetcher,
+                supervisor=self
+            )
+            for target in self.targets
+        ]
+        self.archiver = EmailArchiver(self.db_service)
+        self.pool_size = max(1, min(pool_size or Config.MONITOR_POOL_SIZE, len(self.trackers)))
+        self._schedule = []  # heap of (due, sequence, tracker)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._running = False
+        self._workers = []
+
+    @property
+    def dedicated(self):
+        """True when every mailbox has a worker of its own (IDLE push mode is possible)"""
+        return self.pool_size >= len(self.trackers)
+
+    def emit_update(self, event_type, data):
+        """Emit real-time update via WebSocket"""
+        if self.broadcaster:
+            self.broadcaster.emit(event_type, data)
+
+    def start_monitoring(self):
+        """Start the worker pool and the shared body fetcher"""
+        self._running = True
+        metrics.register_monitor(self)
+        if self.broadcaster:
+            self.broadcaster.start()
+        for tracker in self.trackers:
+            tracker._running = True
+            self._schedule_tracker(tracker, 0)
+        self._workers = [
+            threading.Thread(target=self._worker, name=f'monitor-{index}', daemon=True)
+            for index in range(self.pool_size)
+        ]
+        for thread in self._workers:
+            thread.start()
+        if Config.TWO_PHASE_FETCH:
+            self.body_fetcher.start()
+        if self.archiver.enabled:
+            self.archiver.start()
+        print(f"✓ Email monitoring started ({len(self.trackers)} mailboxes, {self.pool_size} workers)")
+
+    def stop_monitoring(self):
+        """Stop the workers and log out of every mailbox"""
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+        self.body_fetcher.stop()
+        self.archiver.stop()
+        for tracker in self.trackers:
+            tracker._running = False
+            tracker.disconnect()
+        # A worker may still be finishing its pass (sync checkpoint, events)
+        for thread in self._workers:
+            thread.join(timeout=30)
+        if self.broadcaster:
+            self.broadcaster.stop()
+        metrics.unregister_monitor(self)
+        print("✓ Email monitoring stopped")
+
+    def _schedule_tracker(self, tracker, delay):
+        with self._condition:
+            heapq.heappush(self._schedule, (time.monotonic() + delay, next(self._sequence), tracker))
+            self._condition.notify()
+
+    def _next_due(self):
+        """Block until a tracker is due, returns None once stopped"""
+        with self._condition:
+            while self._running:
+                now = time.monotonic()
+                if self._schedule and self._schedule[0][0] <= now:
+                    return heapq.heappop(self._schedule)[2]
+                timeout = self._schedule[0][0] - now if self._schedule else 1
+                self._condition.wait(timeout=min(timeout, 1))
+        return None
+
+    def _worker(self):
+        while self._running:
+            tracker = self._next_due()
+            if tracker is None:
+                return
+
+            previous_status = tracker.get_status()['status']
+            if tracker.poll_once() and self.dedicated:
+                tracker.wait_for_changes()
+                delay = 0
+            else:
+                delay = tracker.scheduler.delay
+
+            if tracker.get_status()['status'] != previous_status:
+                self.emit_update('stats_update', self.get_current_stats())
+            if self._running:
+                self._schedule_tracker(tracker, delay)
+
+    def get_account_status(self):
+        """Status of every monitored mailbox"""
+        return [tracker.get_status() for tracker in self.trackers]
+
+    def get_current_stats(self):
+        """Get current email statistics with per-mailbox status"""
+        accounts = self.get_account_status()
+        connected = sum(1 for account in accounts if account['status'] == 'connected')
+        if connected == len(accounts):
+            monitoring_status = 'Active'
+        elif connected:
+            monitoring_status = f'Active ({connected}/{len(accounts)})'
+        else:
+            monitoring_status = 'Disconnected'
+
+        try:
+            stats = self.db_service.get_stats()
+        except Exception:
+            stats = {'total_emails': 0, 'emails_with_attachments': 0}
+            monitoring_status = 'Error'
+
+        return {
+            'total_emails': stats['total_emails'],
+            'emails_with_attachments': stats['emails_with_attachments'],
+            'monitoring_status': monitoring_status,
+            'last_updated': datetime.now().strftime('%H:%M:%S'),
+            'accounts': accounts
+        }
\ No newline at end of file
@@ -0,0 +1,188 @@
+import re
+from datetime import datetime
+from imap_tools import MailBox, MailBoxUnencrypted, AND, U
+from app.config import Config
+from app.services.accounts import primary_account, primary_target
+from app.services.mime_stream import FETCH_SIZE, fetch_streamed
+from app.services import metrics
+
+ATTACHMENT_DISPOSITION = re.compile(rb'\("attachment"', re.IGNORECASE)
+FETCH_UID = re.compile(rb'UID (\d+)')
+
+def open_mailbox(folder='INBOX', account=None):
+    """Open an authenticated IMAP connection to ``account`` with ``folder`` selected"""
+    account = account or primary_account()
+    mailbox_class = MailBox if account.use_ssl else MailBoxUnencrypted
+    mailbox = mailbox_class(account.server, account.port).login(
+        account.email_address,
+        account.password,
+        initial_folder=None
+    )
+    mailbox.folder.set(folder)
+    return metrics.count_received_bytes(mailbox, account.name)
+
+def uid_set(uids):
+    """Compact IMAP UID set ("1:4,7,9:12") for ascending ``uids``"""
+    ranges = []
+    for uid in (int(uid) for uid in uids):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ','.join(str(first) if first == last else f"{first}:{last}" for first, last in ranges)
+
+def fetch_sizes(mailbox, uids):
+    """RFC822.SIZE of each UID, without downloading the messages"""
+    sizes = {}
+    if not uids:
+        return sizes
+    status, data = mailbox.client.uid('FETCH', uid_set(uids), '(UID RFC822.SIZE)')
+    if status != 'OK':
+        return sizes
+    for item in data:
+        if isinstance(item, tuple):
+            item = b''.join(item)
+        uid, size = FETCH_UID.search(item or b''), FETCH_SIZE.search(item or b'')
+        if uid and size:
+            sizes[uid.group(1).decode()] = int(size.group(1))
+    return sizes
+
+def fetch_messages(mailbox, uids, blob_store, mark_seen=True, bulk=False):
+    """Fetch full messages by UID, ordered by UID.
+
+    Messages above ``STREAMING_THRESHOLD`` are not loaded whole: they are
+    parsed chunk by chunk (``fetch_streamed``) with their attachments
+    written to ``blob_store`` on the way, and come back as
+    ``StreamedMessage``. The rest is fetched with ``imap_tools`` as usual.
+    """
+    uids = sorted((str(uid) for uid in uids), key=int)
+    if not uids:
+        return []
+    large = set()
+    if Config.STREAMING_THRESHOLD:
+        sizes = fetch_sizes(mailbox, uids)
+        large = {uid for uid in uids if sizes.get(uid, 0) > Config.STREAMING_THRESHOLD}
+    small = [uid for uid in uids if uid not in large]
+
+    messages = list(mailbox.fetch(AND(uid=uid_set(small)), mark_seen=mark_seen, bulk=bulk)) if small else []
+    for uid in sorted(large, key=int):
+        print(f"Streaming large message {uid}")
+        messages.append(fetch_streamed(mailbox, uid, blob_store, mark_seen=mark_seen))
+    messages.sort(key=lambda msg: int(msg.uid))
+    return messages
+
+class SyncEngine:
+    """Incremental UID-based synchronisation for a single IMAP folder of one account.
+
+    The highest processed UID and the folder's UIDVALIDITY are checkpointed in
+    the database, so each poll only asks the server for ``UID last_uid+1:*``.
+    A full (date based) resync only happens when there is no checkpoint yet or
+    the server reports a different UIDVALIDITY.
+    """
+
+    def __init__(self, db_service, target=None):
+        self.db_service = db_service
+        self.target = target or primary_target()
+        self.folder = self.target.folder
+        self.last_uid = 0
+        self._uidvalidity = None
+        self._uidnext = None
+        self._complete = True
+
+    def get_folder_status(self, mailbox):
+        """Return (uidvalidity, uidnext) for the monitored folder"""
+        status = mailbox.folder.status(self.folder, ['UIDVALIDITY', 'UIDNEXT'])
+        return status['UIDVALIDITY'], status['UIDNEXT']
+
+    def _search_criteria(self, mailbox, since):
+        """Start a sync pass: return the criteria for new messages, or None when there are none"""
+        self._uidvalidity, self._uidnext = self.get_folder_status(mailbox)
+        self._complete = True
+        state = self.db_service.get_sync_state(self.target.state_key)
+
+        if state is None or state[0] != self._uidvalidity:
+            if state is not None:
+                print(f"UIDVALIDITY changed for {self.target.name} ({state[0]} -> {self._uidvalidity}), running full resync")
+            else:
+                print(f"No sync checkpoint for {self.target.name}, syncing since {since.date()}")
+            self.last_uid = 0
+            criteria = AND(date_gte=since.date())
+        else:
+            self.last_uid = state[1]
+            if self._uidnext is not None and self._uidnext <= self.last_uid + 1:
+                # Nothing new on the server, skip the FETCH round trip entirely
+                return None
+            criteria = AND(uid=U(self.last_uid + 1, '*'))
+        return criteria
+
+    def fetch_new(self, mailbox, since, headers_only=False):
+        """Fetch messages that arrived after the last checkpoint, ordered by UID.
+
+        ``since`` is only used when a full resync is required. With
+        ``headers_only`` only the header block is transferred (and the
+        messages are not marked as seen); bodies are fetched later. Full
+        messages go through ``fetch_messages``, which streams large ones.
+        """
+        criteria = self._search_criteria(mailbox, since)
+        if criteria is None:
+            return []
+
+        if not headers_only:
+            uids = [uid for uid in mailbox.uids(criteria) if int(uid) > self.last_uid]
+            return fetch_messages(mailbox, uids, self.db_service.blob_store)
+
+        # "n:*" always matches the newest message, even when its UID is below n
+        messages = [
+            msg for msg in mailbox.fetch(criteria, headers_only=True, mark_seen=False, bulk=True)
+            if msg.uid and int(msg.uid) > self.last_uid
+        ]
+        messages.sort(key=lambda msg: int(msg.uid))
+        return messages
+
+    def pending_uids(self, mailbox, since):
+        """Like ``fetch_new`` but only return the new UIDs (ascending) so they can be fetched in chunks"""
+        criteria = self._search_criteria(mailbox, since)
+        if criteria is None:
+            return []
+        return sorted((uid for uid in mailbox.uids(criteria) if int(uid) > self.last_uid), key=int)
+
+    def fetch_attachment_counts(self, mailbox, uids):
+        """Count attachments per UID from BODYSTRUCTURE without downloading any parts"""
+        counts = {}
+        if not uids:
+            return counts
+        status, data = mailbox.client.uid('FETCH', uid_set(uids), '(UID BODYSTRUCTURE)')
+        if status != 'OK':
+            return counts
+        for item in data:
+            if isinstance(item, tuple):
+                item = b''.join(item)
+            if not item or item == b')':
+                continue
+            match = FETCH_UID.search(item)
+            if match:
+                uid = match.group(1).decode()
+                counts[uid] = counts.get(uid, 0) + len(ATTACHMENT_DISPOSITION.findall(item))
+        return counts
+
+    def checkpoint(self, uid):
+        """Persist ``uid`` as the highest processed UID for the folder"""
+        self.last_uid = max(self.last_uid, int(uid))
+        self.db_service.save_sync_state(
+            self.target.state_key,
+            self._uidvalidity,
+            self.last_uid,
+            self._uidnext,
+            datetime.now(Config.TIMEZONE).strftime('%d-%m-%Y %H:%M:%S')
+        )
+
+    def mark_failed(self):
+        """Keep the checkpoint at the last processed UID so the rest is retried"""
+        self._complete = False
+
+    def complete(self):
+        """Finish a sync pass, skipping past UIDs the resync deliberately ignored"""
+        if self._complete and self._uidnext:
+            self.checkpoint(max(self.last_uid, self._uidnext - 1))
+        else:
+            self.checkpoint(self.last_uid)
\ No newline at end of file
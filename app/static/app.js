@@ -70,46 +70,72 @@ function updateConnectionStatus(status) {
     }
 }
 
-function handleNewEmail(data) {
+function handleNewEmails(data) {
+    // One frame carries every email saved since the previous frame, oldest first
+    const emails = data.emails || [];
+    if (!emails.length) {
+        return;
+    }
+    
     // Update email count in real-time
     const totalEmailsElement = document.getElementById('total-emails');
     if (totalEmailsElement) {
         const currentCount = parseInt(totalEmailsElement.textContent) || 0;
-        totalEmailsElement.textContent = currentCount + 1;
+        totalEmailsElement.textContent = currentCount + emails.length;
         totalEmailsElement.parentElement.style.transform = 'scale(1.05)';
         setTimeout(() => {
             totalEmailsElement.parentElement.style.transform = 'scale(1)';
         }, 300);
     }
     
-    // Add new email to the list if on emails page
+    // Add new emails to the list if on emails page (built off-DOM, inserted once)
     const emailsTable = document.querySelector('#emails-table tbody');
     if (emailsTable) {
-        const newRow = createEmailRow(data);
-        emailsTable.insertBefore(newRow, emailsTable.firstChild);
-        newRow.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+        const rows = document.createDocumentFragment();
+        emails.slice().reverse().forEach(email => rows.appendChild(createEmailRow(email)));
+        const firstRow = rows.firstChild;
+        emailsTable.insertBefore(rows, emailsTable.firstChild);
+        firstRow.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
     }
     
     // Update recent emails on dashboard
     const recentEmailsList = document.querySelector('.recent-emails-list');
     if (recentEmailsList) {
-        const newEmailElement = createRecentEmailElement(data);
-        recentEmailsList.insertBefore(newEmailElement, recentEmailsList.firstChild);
+        const items = document.createDocumentFragment();
+        emails.slice(-5).reverse().forEach(email => items.appendChild(createRecentEmailElement(email)));
+        recentEmailsList.insertBefore(items, recentEmailsList.firstChild);
         
-        // Remove oldest if more than 5
+        // Keep the newest 5
         const recentEmails = recentEmailsList.querySelectorAll('.recent-email-item');
-        if (recentEmails.length > 5) {
-            recentEmails[recentEmails.length - 1].remove();
+        for (let index = 5; index < recentEmails.length; index++) {
+            recentEmails[index].remove();
         }
     }
     
     // Show notification
-    showNotification(`New email from ${data.sender}: ${data.subject.substring(0, 50)}...`, 'info');
+    const latest = emails[emails.length - 1];
+    if (emails.length === 1) {
+        showNotification(`New email from ${latest.sender}: ${latest.subject.substring(0, 50)}...`, 'info');
+    } else {
+        showNotification(`${emails.length} new emails, latest from ${latest.sender}`, 'info');
+    }
     
     // Play notification sound (optional)
     playNotificationSound();
 }
 
+function handleNewEmail(data) {
+    handleNewEmails({ emails: [data] });
+}
+
+function handleEmailBodyReady(data) {
+    // Reload the detail page once the background download for this email finished
+    const pending = document.getElementById('body-pending');
+    if (pending && parseInt(pending.dataset.emailId) === data.id) {
+        window.location.reload();
+    }
+}
+
 function createEmailRow(emailData) {
     const row = document.createElement('tr');
     row.className = 'email-row hover:bg-gray-50 transition-colors animate-fade-in';
@@ -203,7 +229,8 @@ function handleStatusUpdate(data) {
     const statusBar = document.getElementById('status-bar');
     
     if (statusMessage) {
-        statusMessage.textContent = data.message;
+        // With several mailboxes each update names the one it is about
+        statusMessage.textContent = data.mailbox ? `${data.mailbox}: ${data.message}` : data.message;
     }
     
     if (lastCheckTime && data.last_check) {
@@ -230,6 +257,23 @@ function handleStatusUpdate(data) {
     }
 }
 
+function handleBackfillProgress(data) {
+    const eta = data.eta_seconds === null ? '-' : `${data.eta_seconds}s`;
+    const message = data.finished
+        ? `Backfill finished: ${data.saved} emails imported`
+        : `Backfill ${data.messages}/${data.total_messages} messages, ` +
+          `${data.messages_per_sec} msg/s, ${(data.bytes_per_sec / 1024).toFixed(1)} KB/s, ETA ${eta}`;
+    
+    handleStatusUpdate({
+        type: data.failed_chunks ? 'error' : 'checking',
+        message: message,
+        mailbox: data.mailbox
+    });
+    if (data.finished) {
+        refreshStats();
+    }
+}
+
 function playNotificationSound() {
     // Create a subtle notification sound
     const audioContext = new (window.AudioContext || window.webkitAudioContext)();
@@ -344,16 +388,57 @@ function updateStatsDisplay(data) {
             }, 100);
         }
     });
+    
+    if (data.accounts) {
+        renderAccountStatus(data.accounts);
+    }
+}
+
+function renderAccountStatus(accounts) {
+    const container = document.getElementById('account-status');
+    const list = document.getElementById('account-status-list');
+    if (!container || !list) return;
+    
+    // A single mailbox is already covered by the monitoring status card
+    container.classList.toggle('hidden', accounts.length < 2);
+    
+    const colors = {connected: 'bg-green-400', error: 'bg-red-400', disconnected: 'bg-gray-400'};
+    list.replaceChildren(...accounts.map(account => {
+        const row = document.createElement('li');
+        row.className = 'flex items-center justify-between py-2';
+        
+        const name = document.createElement('div');
+        name.className = 'flex items-center space-x-2';
+        const dot = document.createElement('span');
+        dot.className = `w-2 h-2 rounded-full ${colors[account.status] || 'bg-gray-400'}`;
+        const label = document.createElement('span');
+        label.className = 'text-sm text-gray-900';
+        label.textContent = `${account.account} / ${account.folder}`;
+        name.append(dot, label);
+        
+        const detail = document.createElement('span');
+        detail.className = 'text-xs text-gray-500';
+        detail.textContent = account.last_error && account.status !== 'connected'
+            ? account.last_error
+            : `${account.saved_count} new` + (account.last_check ? ` · checked ${account.last_check}` : '');
+        
+        row.append(name, detail);
+        return row;
+    }));
 }
 
 // Export functions for global use
 window.EmailTracker = {
     refreshStats,
     updateStatsDisplay,
+    renderAccountStatus,
     showNotification,
     updateConnectionStatus,
     handleNewEmail,
+    handleNewEmails,
+    handleEmailBodyReady,
     handleStatusUpdate,
+    handleBackfillProgress,
     copyToClipboard: function(text) {
         navigator.clipboard.writeText(text).then(function() {
             showNotification('Copied to clipboard!', 'success');
@@ -391,45 +476,88 @@ document.addEventListener('DOMContentLoaded', function() {
     if (filterSelect) {
         filterSelect.addEventListener('change', filterEmails);
     }
+    
+    initializeInfiniteScroll();
 });
 
-// Keep existing filter functions
-function filterEmails() {
+// Server-side paginated email list
+const emailList = {
+    cursor: null,
+    loading: false,
+    requestId: 0
+};
+
+function buildEmailQuery(cursor) {
     const searchInput = document.getElementById('search-input');
     const filterSelect = document.getElementById('filter-attachments');
+    const params = new URLSearchParams({ limit: 50 });
     
-    if (!searchInput || !filterSelect) return;
+    if (searchInput && searchInput.value.trim()) params.set('q', searchInput.value.trim());
+    if (filterSelect && filterSelect.value) params.set('has_attachment', filterSelect.value);
+    if (cursor) params.set('before', cursor);
     
-    const searchTerm = searchInput.value.toLowerCase();
-    const attachmentFilter = filterSelect.value;
-    const rows = document.querySelectorAll('.email-row');
+    return params;
+}
 
-    let visibleCount = 0;
+function setEmailCursor(cursor) {
+    const sentinel = document.getElementById('emails-sentinel');
+    emailList.cursor = cursor || null;
+    if (sentinel) {
+        sentinel.dataset.nextCursor = emailList.cursor || '';
+        sentinel.classList.toggle('hidden', !emailList.cursor);
+    }
+}
+
+function loadEmailPage(cursor, replace) {
+    const emailsTable = document.querySelector('#emails-table tbody');
+    if (!emailsTable) return Promise.resolve();
     
-    rows.forEach(row => {
-        const sender = row.dataset.sender || '';
-        const subject = row.dataset.subject || '';
-        const hasAttachment = row.dataset.hasAttachment === 'True';
-        
-        const matchesSearch = sender.includes(searchTerm) || subject.includes(searchTerm);
-        
-        let matchesFilter = true;
-        if (attachmentFilter === 'with') {
-            matchesFilter = hasAttachment;
-        } else if (attachmentFilter === 'without') {
-            matchesFilter = !hasAttachment;
-        }
-        
-        const shouldShow = matchesSearch && matchesFilter;
-        row.style.display = shouldShow ? '' : 'none';
-        
-        if (shouldShow) visibleCount++;
-    });
+    const requestId = ++emailList.requestId;
+    emailList.loading = true;
     
-    const resultsCount = document.getElementById('results-count');
-    if (resultsCount) {
-        resultsCount.textContent = `${visibleCount} email(s) found`;
-    }
+    return fetch(`/api/emails?${buildEmailQuery(cursor)}`)
+        .then(response => response.json())
+        .then(data => {
+            // Ignore responses overtaken by a newer search
+            if (requestId !== emailList.requestId) return;
+            if (data.error) throw new Error(data.error);
+            
+            if (replace) emailsTable.innerHTML = '';
+            data.emails.forEach(email => emailsTable.appendChild(createEmailRow(email)));
+            setEmailCursor(data.next_cursor);
+            
+            const resultsCount = document.getElementById('results-count');
+            if (resultsCount) {
+                const shown = emailsTable.querySelectorAll('.email-row').length;
+                resultsCount.textContent = `${shown}${data.next_cursor ? '+' : ''} email(s) found`;
+            }
+        })
+        .catch(error => {
+            console.error('Error loading emails:', error);
+            showNotification('Failed to load emails', 'error');
+        })
+        .finally(() => {
+            if (requestId === emailList.requestId) emailList.loading = false;
+        });
+}
+
+function initializeInfiniteScroll() {
+    const sentinel = document.getElementById('emails-sentinel');
+    if (!sentinel) return;
+    
+    setEmailCursor(sentinel.dataset.nextCursor);
+    
+    const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting) && emailList.cursor && !emailList.loading) {
+            loadEmailPage(emailList.cursor, false);
+        }
+    }, { rootMargin: '200px' });
+    observer.observe(sentinel);
+}
+
+function filterEmails() {
+    // Search and filters run on the server; reload the list from the first page
+    loadEmailPage(null, true);
 }
 
 function clearFilters() {
@@ -456,11 +584,15 @@ function viewAttachment(attachmentId, filename) {
     
     const fileExt = filename.split('.').pop().toLowerCase();
     const viewUrl = `/api/attachments/${attachmentId}/view`;
+    // Downscaled rendition; the original is one click away (and the fallback when there is no preview)
+    const previewUrl = `/api/attachments/${attachmentId}/thumbnail`;
     
     if (['jpg', 'jpeg', 'png', 'gif', 'bmp'].includes(fileExt)) {
         contentDiv.innerHTML = `
             <div class="text-center">
-                <img src="${viewUrl}" alt="${filename}" class="max-w-full max-h-96 mx-auto rounded-lg shadow-lg">
+                <img src="${previewUrl}?size=1024" alt="${filename}" class="max-w-full max-h-96 mx-auto rounded-lg shadow-lg"
+                     onerror="this.onerror = null; this.src = '${viewUrl}'">
+                <a href="${viewUrl}" target="_blank" class="inline-block mt-2 text-sm text-primary-600 hover:underline">Open original</a>
             </div>
         `;
     } else if (fileExt === 'pdf') {
@@ -472,14 +604,18 @@ function viewAttachment(attachmentId, filename) {
             </div>
         `;
     } else if (fileExt === 'txt') {
-        fetch(viewUrl)
+        // Only the start of the file; the full one is a download
+        fetch(previewUrl)
+            .then(response => response.ok ? response : fetch(viewUrl))
             .then(response => response.text())
             .then(text => {
                 contentDiv.innerHTML = `
                     <div class="bg-gray-50 rounded-lg p-4 max-h-96 overflow-y-auto">
-                        <pre class="whitespace-pre-wrap text-sm text-gray-700">${text}</pre>
+                        <pre class="whitespace-pre-wrap text-sm text-gray-700"></pre>
                     </div>
+                    <a href="/api/attachments/${attachmentId}/download" class="inline-block mt-2 text-sm text-primary-600 hover:underline">Download full file</a>
                 `;
+                contentDiv.querySelector('pre').textContent = text;
             })
             .catch(error => {
                 contentDiv.innerHTML = `
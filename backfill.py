@@ -0,0 +1,75 @@
+"""Import the existing history of the monitored mailboxes.
+
+Completed chunks are checkpointed in the database, so an interrupted run
+continues where it stopped when started again.
+
+    python backfill.py                                  # every configured mailbox
+    python backfill.py --mailbox me@example.com/INBOX --workers 8
+    python backfill.py --since 2024-01-01               # only messages from this date on
+    python backfill.py --restart                        # forget completed chunks first
+"""
+import argparse
+from datetime import datetime
+from app.config import Config
+from app.services.accounts import load_targets
+from app.services.backfill import Backfill
+from app.services.broadcaster import EventBroadcaster
+from app.services.db import DatabaseService
+from app.services.event_bus import socketio_options
+
+def socket_broadcaster():
+    """Emit through the message queue shared with the web server, if one is configured"""
+    if not Config.SOCKETIO_MESSAGE_QUEUE:
+        return None
+    from flask_socketio import SocketIO
+    return EventBroadcaster(SocketIO(**socketio_options(write_only=True))).start()
+
+def main():
+    parser = argparse.ArgumentParser(description='Import the existing history of the monitored mailboxes')
+    parser.add_argument('--mailbox', action='append', help='account/folder to backfill (repeatable, default: all)')
+    parser.add_argument('--since', type=lambda value: datetime.strptime(value, '%Y-%m-%d').date(),
+                        help='only messages from this date (YYYY-MM-DD)')
+    parser.add_argument('--workers', type=int, default=Config.BACKFILL_WORKERS, help='concurrent IMAP connections')
+    parser.add_argument('--chunk-size', type=int, default=Config.BACKFILL_CHUNK_SIZE, help='messages per chunk')
+    parser.add_argument('--restart', action='store_true', help='ignore the checkpoints of earlier runs')
+    args = parser.parse_args()
+    
+    Config.validate_config()
+    db_service = DatabaseService()
+    db_service.init_database()
+    
+    targets = load_targets()
+    if args.mailbox:
+        unknown = set(args.mailbox) - {target.name for target in targets}
+        if unknown:
+            parser.error(f"unknown mailbox: {', '.join(sorted(unknown))}")
+        targets = [target for target in targets if target.name in args.mailbox]
+    if args.restart:
+        for target in targets:
+            db_service.reset_backfill(target.name)
+    
+    broadcaster = socket_broadcaster()
+    backfill = Backfill(
+        db_service=db_service,
+        targets=targets,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        since=args.since,
+        emit=broadcaster.emit if broadcaster else None
+    )
+    try:
+        results = backfill.run()
+    except KeyboardInterrupt:
+        print("\nBackfill interrupted, run again to resume")
+        return
+    finally:
+        if broadcaster:
+            broadcaster.stop()
+    
+    for result in results:
+        status = '✓' if not result['failed_chunks'] else '✗'
+        print(f"{status} {result['mailbox']}: {result['saved']} new emails, {result['messages']} messages fetched "
+              f"in {result['elapsed_seconds']}s ({result['failed_chunks']} chunks failed)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""Database size with and without monthly archiving, and ingest latency while the archiver runs.
+
+size: simulates ``--months`` of mail, ``--per-day`` emails a day (2 KB
+bodies, a share with attachments), saved one day per batch. With
+archiving, ``EmailArchiver.run_once`` runs every simulated week with
+``--after-days`` retention. Prints the database file size at the end of
+every quarter for both, plus the archive total.
+
+ingest: a database holding ``--backlog`` old emails; batches of 50 new
+emails are saved while an archiver thread moves the backlog out, and
+again without it. Prints save_emails_batch latency percentiles. An
+EmailIndex refreshed every 0.1s follows along; it should drop the
+archived emails without reloading and end up equal to a fresh load.
+
+blobs: the archiver drops the attachments of ``--blob-emails`` old emails,
+each with its own payload, while ingest saves new emails carrying the same
+payloads in the same order; and once with the archiver forced to delete a
+payload right after ingest stored it, before its transaction. Exits with
+status 1 when an attachment row is left pointing at a deleted payload.
+
+    python benchmarks/bench_archive.py --months 24 --per-day 100 --after-days 90
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config  # noqa: E402
+from app.services.db import DatabaseService  # noqa: E402
+from app.services.archive import EmailArchiver  # noqa: E402
+from app.services.email_index import EmailIndex  # noqa: E402
+from corpus import words  # noqa: E402
+
+START = datetime(2024, 1, 1, 9, 0, tzinfo=Config.TIMEZONE)
+
+
+def day_of_mail(day, per_day, rng, prefix='m'):
+    date = START + timedelta(days=day)
+    return [
+        {
+            'message_id': f"{prefix}{day}-{index}",
+            'sender': f"sender{rng.randrange(500)}@example.com",
+            'subject': f"Synthetic message {day}-{index}",
+            'body': words(2048, rng),
+            'received_date': (date + timedelta(seconds=index * 60)).strftime('%d-%m-%Y %H:%M:%S'),
+            'has_attachment': index % 5 == 0,
+            'attachments': [(f"file-{day}-{index}.bin", rng.randbytes(20 * 1024))] if index % 5 == 0 else []
+        }
+        for index in range(per_day)
+    ]
+
+
+def database_size(db):
+    with db.get_connection() as conn:
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    return sum(os.path.getsize(db.db_path + suffix) for suffix in ('', '-wal') if os.path.exists(db.db_path + suffix))
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def simulate(tmp, archive, options):
+    """Database size (MB) at the end of every quarter, and the archive size at the end"""
+    Config.DATABASE_PATH = os.path.join(tmp, f"{'archive' if archive else 'keep'}.db")
+    Config.ARCHIVE_PATH = os.path.join(tmp, f"archive-{'archive' if archive else 'keep'}")
+    db = DatabaseService()
+    db.init_database()
+    archiver = EmailArchiver(db, after_days=options.after_days, batch_size=500)
+    archiver.BATCH_PAUSE = 0
+    rng = random.Random(21)
+    sizes = []
+    days = options.months * 30
+    for day in range(days):
+        db.save_emails_batch(day_of_mail(day, options.per_day, rng))
+        if archive and day % 7 == 6:
+            archiver.run_once(now=START + timedelta(days=day + 1))
+        if day % 90 == 89 or day == days - 1:
+            sizes.append(database_size(db) / 1024 / 1024)
+    archived = directory_size(Config.ARCHIVE_PATH) / 1024 / 1024 if archive else 0
+    db.pool.close_all()
+    return sizes, archived
+
+
+class CountingIndex(EmailIndex):
+    loads = 0
+
+    def load(self):
+        self.loads += 1
+        return super().load()
+
+
+def follow(index, stopped):
+    while not stopped.wait(0.1):
+        index.refresh()
+
+
+def save_latencies(db, rng, seconds, offset):
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    day = offset
+    while time.perf_counter() < deadline:
+        batch = day_of_mail(day, 50, rng, prefix='new')
+        started = time.perf_counter()
+        db.save_emails_batch(batch)
+        latencies.append((time.perf_counter() - started) * 1000)
+        day += 1
+    return latencies
+
+
+def ingest_while_archiving(tmp, options):
+    results = {}
+    for mode in ('idle', 'archiving'):
+        Config.DATABASE_PATH = os.path.join(tmp, f'ingest-{mode}.db')
+        Config.ARCHIVE_PATH = os.path.join(tmp, f'archive-ingest-{mode}')
+        db = DatabaseService()
+        db.init_database()
+        rng = random.Random(22)
+        per_day = 200
+        for day in range(options.backlog // per_day):
+            db.save_emails_batch(day_of_mail(day, per_day, rng))
+        archiver = EmailArchiver(db, after_days=1, batch_size=500)
+        index = CountingIndex(db)
+        index.load()
+        stopped = threading.Event()
+        follower = threading.Thread(target=follow, args=(index, stopped))
+        follower.start()
+        moved = [0]
+        if mode == 'archiving':
+            def run():
+                moved[0] = archiver.archive_before(START + timedelta(days=options.backlog // per_day))
+            thread = threading.Thread(target=run)
+            thread.start()
+        latencies = save_latencies(db, rng, options.seconds, offset=10000)
+        if mode == 'archiving':
+            archiver.stop()
+            thread.join()
+        stopped.set()
+        follower.join()
+        index.refresh()
+        fresh = EmailIndex(db)
+        fresh.load()
+        matches = list(index.ids) == list(fresh.ids) and index.get_stats() == fresh.get_stats()
+        latencies.sort()
+        results[mode] = (statistics.median(latencies), latencies[int(len(latencies) * 0.99)], latencies[-1],
+                         len(latencies), moved[0], index.loads - 1, 'yes' if matches else 'NO')
+        db.pool.close_all()
+    return results
+
+
+def blobs_while_archiving(tmp, options):
+    """Ingest of the payloads the archiver is deleting, returns (forced ok, rows checked, missing payloads)"""
+    Config.DATABASE_PATH = os.path.join(tmp, 'blobs.db')
+    Config.ARCHIVE_PATH = os.path.join(tmp, 'archive-blobs')
+    db = DatabaseService()
+    db.init_database()
+    store = db.blob_store
+    rng = random.Random(23)
+    payloads = [rng.randbytes(4096) for _ in range(options.blob_emails)]
+    per_day = 100
+    for day in range(0, options.blob_emails // per_day):
+        batch = day_of_mail(day, per_day, rng)
+        for index, email in enumerate(batch):
+            email['has_attachment'] = True
+            email['attachments'] = [('payload.bin', payloads[day * per_day + index])]
+        db.save_emails_batch(batch)
+    archiver = EmailArchiver(db, after_days=1, drop_attachments=True, batch_size=50)
+    archiver.BATCH_PAUSE = 0
+
+    def new_email(index, payload):
+        email = day_of_mail(20000 + index, 1, rng, prefix='blob')[0]
+        email['has_attachment'] = True
+        email['attachments'] = [('payload.bin', payload)]
+        return email
+
+    # Forced: the archiver runs between ingest's put and its transaction
+    put = store.put
+    forced = []
+
+    def put_then_delete(content):
+        digest = put(content)
+        if not forced:
+            forced.append(digest)
+            deleter = threading.Thread(target=archiver.delete_unreferenced_blobs, args=([digest],))
+            deleter.start()
+            deleter.join()
+        return digest
+    store.put = put_then_delete
+    try:
+        db.save_emails_batch([new_email(-1, rng.randbytes(4096))])
+    finally:
+        del store.put
+    forced_ok = store.exists(forced[0])
+
+    # Concurrent: ingest follows the archiver through the same payloads
+    thread = threading.Thread(
+        target=archiver.archive_before, args=(START + timedelta(days=options.blob_emails // per_day),)
+    )
+    thread.start()
+    index = 0
+    while thread.is_alive() and index < len(payloads):
+        db.save_emails_batch([new_email(index + n, payloads[index + n]) for n in range(min(10, len(payloads) - index))])
+        index += 10
+    thread.join()
+    with db.get_connection() as conn:
+        digests = [row[0] for row in conn.execute('SELECT sha256 FROM attachments WHERE sha256 IS NOT NULL')]
+    db.pool.close_all()
+    return forced_ok, len(digests), sum(1 for digest in digests if not store.exists(digest))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--per-day', type=int, default=100)
+    parser.add_argument('--after-days', type=int, default=90)
+    parser.add_argument('--backlog', type=int, default=50000, help='old emails for the ingest test')
+    parser.add_argument('--seconds', type=float, default=10, help='ingest test duration')
+    parser.add_argument('--blob-emails', type=int, default=2000, help='old emails for the blob test')
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        keep, _ = simulate(tmp, False, options)
+        archived_sizes, archive_total = simulate(tmp, True, options)
+        print(f"{'quarter':<8} {'no archiving MB':>16} {'archiving MB':>13}")
+        for quarter, (kept, archived) in enumerate(zip(keep, archived_sizes), 1):
+            print(f"{quarter:<8} {kept:16.1f} {archived:13.1f}")
+        print(f"archive files: {archive_total:.1f} MB (attachment payloads are in the blob store either way)")
+
+        print(f"\n{'ingest':<10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'batches':>8} {'archived':>9}"
+              f" {'index reloads':>14} {'index exact':>12}")
+        for mode, (p50, p99, worst, batches, moved, reloads, matches) in ingest_while_archiving(tmp, options).items():
+            print(f"{mode:<10} {p50:8.1f} {p99:8.1f} {worst:8.1f} {batches:8d} {moved:9d} {reloads:14d} {matches:>12}")
+
+        forced_ok, checked, missing = blobs_while_archiving(tmp, options)
+        print(f"\nblobs: payload deleted between put and commit {'put back' if forced_ok else 'LOST'}, "
+              f"{missing} of {checked} attachment rows pointing at a deleted payload after the concurrent run")
+        if not forced_ok or missing:
+            print("✗ Ingest and the archiver raced on an attachment payload")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""Database size and listing-scan time with bodies inline vs. compressed in email_bodies.
+
+Builds two databases from the same synthetic corpus (plain replies with
+quoted history and signatures, HTML newsletters, notifications with both
+parts). "inline" is the old layout: the text body in ``emails.body`` and
+the HTML dropped. "compressed" is the current one: text and HTML in
+``email_bodies``, raw deflate with a trained preset dictionary;
+"compressed-text" drops the HTML too, for a like-for-like comparison. All
+keep the full-text index, which holds its own plain copy of the searchable
+text.
+
+    python benchmarks/bench_body_storage.py --messages 50000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config  # noqa: E402
+
+WORDS = ('invoice', 'report', 'meeting', 'delivery', 'status', 'update', 'request', 'order', 'weekly', 'review',
+         'quarterly', 'draft', 'reminder', 'project', 'budget', 'contract', 'team', 'notes', 'please', 'thanks',
+         'attached', 'schedule', 'tomorrow', 'customer', 'account', 'payment', 'shipping', 'confirm', 'the', 'and',
+         'for', 'with', 'we', 'you', 'our', 'this', 'that', 'will', 'be', 'on', 'in', 'to', 'of', 'a')
+SIGNATURES = [
+    f"--\nName Surname {index}\nSenior Account Manager | Example Corp {index % 7}\n"
+    f"Phone: +90 212 555 {index:04d} | www.example{index % 7}.com\n\n"
+    "CONFIDENTIALITY NOTICE: This e-mail and any attachments are confidential and intended solely for the "
+    "addressee. If you have received it in error please notify the sender and delete it."
+    for index in range(40)
+]
+NEWSLETTER_HEAD = (
+    '<!DOCTYPE html><html><head><meta charset="utf-8"><meta name="viewport" content="width=device-width">'
+    '<style>body{margin:0;padding:0;background:#f4f4f4;font-family:Helvetica,Arial,sans-serif}'
+    '.container{max-width:600px;margin:0 auto;background:#ffffff}.button{background:#0d6efd;color:#ffffff;'
+    'padding:12px 24px;border-radius:4px;text-decoration:none}</style></head><body>'
+    '<table role="presentation" width="100%" cellpadding="0" cellspacing="0" border="0"><tr><td align="center">'
+    '<table class="container" role="presentation" width="600" cellpadding="0" cellspacing="0">'
+)
+NEWSLETTER_FOOT = (
+    '<tr><td style="padding:24px;font-size:12px;color:#888888">You are receiving this email because you '
+    'subscribed to updates from Example Store.<br><a href="https://example.com/unsubscribe">Unsubscribe</a> | '
+    '<a href="https://example.com/preferences">Manage preferences</a><br>Example Store Inc., 1 Market Street, '
+    'Istanbul</td></tr></table></td></tr></table></body></html>'
+)
+
+
+def sentence(rng, low=6, high=18):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high))).capitalize() + '.'
+
+
+def paragraph(rng):
+    return ' '.join(sentence(rng) for _ in range(rng.randint(2, 5)))
+
+
+def reply(rng):
+    text = '\n\n'.join(paragraph(rng) for _ in range(rng.randint(1, 3)))
+    text += '\n\n' + rng.choice(SIGNATURES)
+    for depth in range(rng.randint(0, 3)):
+        quoted = '\n'.join(f"On Mon, 3 Mar 2025 at 10:{depth:02d}, someone@example.com wrote:\n> " + paragraph(rng)
+                           for _ in range(1))
+        text += '\n\n' + quoted + '\n> ' + rng.choice(SIGNATURES).replace('\n', '\n> ')
+    return text, None
+
+
+def newsletter(rng):
+    rows = ''.join(
+        f'<tr><td style="padding:16px 24px"><h2 style="margin:0 0 8px;font-size:20px;color:#222222">'
+        f'{sentence(rng, 3, 6)}</h2><p style="margin:0;font-size:14px;line-height:20px;color:#444444">'
+        f'{paragraph(rng)}</p><p><a class="button" href="https://example.com/p/{rng.randint(1, 99999)}">'
+        f'Shop now</a></p></td></tr>'
+        for _ in range(rng.randint(2, 6))
+    )
+    return None, NEWSLETTER_HEAD + rows + NEWSLETTER_FOOT
+
+
+def notification(rng):
+    order = rng.randint(100000, 999999)
+    text = (f"Hello,\n\nYour order #{order} has been shipped.\n{paragraph(rng)}\n\n"
+            f"Track it at https://example.com/track/{order}\n\nThank you for shopping with Example Store.")
+    html = (NEWSLETTER_HEAD + f'<tr><td style="padding:24px"><p>Hello,</p><p>Your order <b>#{order}</b> has been '
+            f'shipped.</p><p>{paragraph(rng)}</p><p><a class="button" href="https://example.com/track/{order}">'
+            f'Track your order</a></p></td></tr>' + NEWSLETTER_FOOT)
+    return text, html
+
+
+def corpus(count, seed=17):
+    rng = random.Random(seed)
+    senders = [f"user{index}@example{index % 50}.com" for index in range(2000)]
+    start_ts = 1_700_000_000
+    for index in range(count):
+        kind = rng.random()
+        text, html = reply(rng) if kind < 0.5 else newsletter(rng) if kind < 0.8 else notification(rng)
+        ts = start_ts + index * 60
+        yield {
+            'message_id': f"bench:{index}",
+            'sender': rng.choice(senders),
+            'subject': sentence(rng, 3, 8),
+            'body': text,
+            'html': html,
+            'received_date': time.strftime('%d-%m-%Y %H:%M:%S', time.gmtime(ts)),
+            'received_ts': ts,
+            'has_attachment': False,
+            'account': 'bench',
+            'folder': 'INBOX'
+        }
+
+
+def file_size(path):
+    return sum(os.path.getsize(path + suffix) for suffix in ('', '-wal') if os.path.exists(path + suffix))
+
+
+def scan_ms(db, repeat=5):
+    """Median time of a full listing scan (every summary row, no index)"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in db.iter_email_summaries():
+            pass
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    options = parser.parse_args()
+
+    from app.services.db import DatabaseService
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for layout in ('inline', 'compressed-text', 'compressed'):
+            Config.DATABASE_PATH = os.path.join(tmp, f'{layout}.db')
+            db = DatabaseService()
+            db.init_database()
+            started = time.perf_counter()
+            batch = []
+            for email in corpus(options.messages):
+                if layout != 'compressed':
+                    email['html'] = None  # dropped by the old ingest path
+                batch.append(email)
+                if len(batch) == options.batch_size:
+                    db.save_emails_batch(batch)
+                    batch = []
+            db.save_emails_batch(batch)
+            ingest = time.perf_counter() - started
+            if layout == 'inline':
+                # Old layout: move the text back into emails.body, uncompressed
+                with db.get_connection() as conn:
+                    rows = conn.execute('SELECT email_id, dictionary_id, text, html FROM email_bodies').fetchall()
+                    conn.executemany('UPDATE emails SET body = ? WHERE id = ?', [
+                        (db._decompress_body(dictionary_id, text, html)[0], email_id)
+                        for email_id, dictionary_id, text, html in rows
+                    ])
+                    conn.execute('DELETE FROM email_bodies')
+                    conn.execute('DELETE FROM body_dictionaries')
+                    conn.commit()
+            db.vacuum()
+            with db.get_connection() as conn:
+                conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                body_bytes = conn.execute('''
+                    SELECT COALESCE(SUM(LENGTH(body)), 0) FROM emails
+                ''').fetchone()[0] + conn.execute('''
+                    SELECT COALESCE(SUM(LENGTH(text)), 0) + COALESCE(SUM(LENGTH(html)), 0) FROM email_bodies
+                ''').fetchone()[0]
+            db.pool.close_all()
+            db = DatabaseService()
+            results[layout] = (file_size(Config.DATABASE_PATH), body_bytes, scan_ms(db), ingest)
+            detail_email = options.messages // 2
+            started = time.perf_counter()
+            for _ in range(200):
+                db.get_email_body(detail_email)
+            results[layout] += ((time.perf_counter() - started) / 200 * 1000,)
+            db.pool.close_all()
+
+        raw_text = raw_html = 0
+        for email in corpus(options.messages):
+            raw_text += len((email['body'] or '').encode())
+            raw_html += len((email['html'] or '').encode())
+        print(f"corpus: {options.messages} emails, {raw_text / 1024 / 1024:.1f} MB text, "
+              f"{raw_html / 1024 / 1024:.1f} MB HTML")
+        print(f"{'layout':<16} {'db MB':>8} {'bodies MB':>10} {'scan ms':>9} {'ingest s':>9} {'detail ms':>10}")
+        for layout, (size, body_bytes, scan, ingest, detail) in results.items():
+            print(f"{layout:<16} {size / 1024 / 1024:8.1f} {body_bytes / 1024 / 1024:10.1f} {scan:9.1f} "
+                  f"{ingest:9.1f} {detail:10.3f}")
+
+
+if __name__ == '__main__':
+    main()
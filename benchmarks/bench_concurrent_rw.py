@@ -0,0 +1,110 @@
+"""Dashboard read latency while the ingest path is writing.
+
+One writer thread keeps inserting batches of emails with attachments while
+reader threads run the listing/detail queries used by the web routes. Reports
+read latency percentiles for the pooled WAL connections and, for comparison,
+the old connect-per-call rollback-journal behaviour.
+
+    python benchmarks/bench_concurrent_rw.py --readers 4 --seconds 10
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.db import DatabaseService  # noqa: E402
+from bench_db_batch import make_records  # noqa: E402
+
+
+class LegacyDatabaseService(DatabaseService):
+    """Connect-per-call, rollback journal: the behaviour before the pool"""
+
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(db, readers, seconds, batch_size, attachment_size):
+    db.init_database()
+    if isinstance(db, LegacyDatabaseService):
+        with db.get_connection() as conn:
+            conn.execute('PRAGMA journal_mode=DELETE')
+    db.save_emails_batch(make_records(2000, 0.3, 1024))
+
+    stop = threading.Event()
+    latencies = []
+    written = [0]
+    lock = threading.Lock()
+
+    def writer():
+        next_id = 100000
+        while not stop.is_set():
+            records = make_records(batch_size, 0.5, attachment_size, seed=next_id)
+            for record in records:
+                record['message_id'] = str(next_id)
+                next_id += 1
+            db.save_emails_batch(records)
+            written[0] += len(records)
+
+    def reader():
+        rng = random.Random()
+        local = []
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                db.get_all_emails()[:50]
+                db.get_email_attachments(rng.randint(1, 2000))
+            except sqlite3.OperationalError:
+                pass  # "database is locked": counted as a slow read below
+            local.append((time.perf_counter() - started) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, written[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--attachment-size', type=int, default=256 * 1024)
+    options = parser.parse_args()
+
+    for label, service_class in (('connect-per-call', LegacyDatabaseService), ('pooled WAL', DatabaseService)):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = service_class(os.path.join(tmp, 'emails.db'))
+            latencies, written = run(db, options.readers, options.seconds, options.batch_size, options.attachment_size)
+            db.pool.close_all()
+        print(f"{label:<18} reads={len(latencies):6d} written={written:6d} "
+              f"p50={percentile(latencies, 50):7.2f}ms p99={percentile(latencies, 99):8.2f}ms "
+              f"max={max(latencies):8.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Memory per message and listing latency of the in-memory email index.
+
+Fills a database with synthetic metadata, then measures (with tracemalloc)
+what the listing metadata of every message costs as ``Email`` dataclasses,
+as ``__slots__`` records and in ``EmailIndex``, and compares first/deep page
+latency of the index against SQLite.
+
+    python benchmarks/bench_email_index.py --messages 1000000
+"""
+import argparse
+import gc
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config  # noqa: E402
+
+WORDS = ('invoice', 'report', 'meeting', 'delivery', 'status', 'update', 'request', 'order', 'weekly', 'review',
+         'quarterly', 'draft', 'reminder', 'project', 'budget', 'contract', 'team', 'notes')
+
+
+class SlotsRecord:
+    """The same fields as the listing's Email dataclass, without a per-instance __dict__"""
+    __slots__ = ('id', 'sender', 'subject', 'received_date', 'has_attachment', 'attachment_count',
+                 'received_ts', 'account', 'folder')
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+
+def populate(db, count, rng, batch_size=20000):
+    start_ts = 1_600_000_000
+    senders = [f"user{index}@example{index % 50}.com" for index in range(5000)]
+    with db.get_connection() as conn:
+        for start in range(0, count, batch_size):
+            rows = []
+            for index in range(start, min(start + batch_size, count)):
+                ts = start_ts + index * 60
+                rows.append((
+                    str(index + 1),
+                    rng.choice(senders),
+                    ' '.join(rng.choices(WORDS, k=rng.randint(3, 8))),
+                    time.strftime('%d-%m-%Y %H:%M:%S', time.gmtime(ts)),
+                    ts,
+                    rng.random() < 0.2,
+                    'bench',
+                    'INBOX'
+                ))
+            conn.executemany('''
+                INSERT INTO emails (message_id, sender, subject, received_date, received_ts, has_attachment,
+                                    account, folder)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            conn.commit()
+
+
+def measure(build):
+    """Bytes allocated by what ``build`` returns (kept alive while measuring)"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    gc.collect()
+    return size, elapsed
+
+
+def latency(func, repeat=200):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1_000_000)
+    options = parser.parse_args()
+
+    from app.models.email_model import Email
+    from app.services.db import DatabaseService
+    from app.services.email_index import EmailIndex
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.DATABASE_PATH = os.path.join(tmp, 'emails.db')
+        db = DatabaseService()
+        db.init_database()
+        started = time.perf_counter()
+        populate(db, options.messages, random.Random(16))
+        print(f"populated {options.messages} emails in {time.perf_counter() - started:.1f}s")
+
+        def rows():
+            return db.get_emails_page(limit=options.messages)
+
+        def dataclasses():
+            return [
+                Email(id=row[0], sender=row[1], subject=row[2], received_date=row[3], has_attachment=row[4],
+                      attachment_count=row[5], received_ts=row[6], account=row[7], folder=row[8])
+                for row in rows()
+            ]
+
+        def slots():
+            return [SlotsRecord(*row) for row in rows()]
+
+        def index():
+            email_index = EmailIndex(db)
+            email_index.load()
+            return email_index
+
+        print(f"{'representation':<20} {'total MB':>9} {'bytes/msg':>10} {'build s':>8}")
+        for name, build in (('Email dataclass', dataclasses), ('__slots__ record', slots), ('EmailIndex', index)):
+            size, elapsed = measure(build)
+            print(f"{name:<20} {size / 1024 / 1024:9.1f} {size / options.messages:10.1f} {elapsed:8.2f}")
+
+        email_index = index()
+        middle = email_index.row(len(email_index) // 2)
+        cursor = (middle[6], middle[0])
+        cases = (
+            ('first page', {'limit': 50}),
+            ('deep page', {'limit': 50, 'before': cursor}),
+            ('with attachments', {'limit': 50, 'has_attachment': True})
+        )
+        print(f"{'listing (p50 ms)':<20} {'sqlite':>9} {'index':>9}")
+        for name, args in cases:
+            sqlite_ms = latency(lambda: db.get_emails_page(**args))
+            index_ms = latency(lambda: email_index.get_emails_page(**args))
+            print(f"{name:<20} {sqlite_ms:9.3f} {index_ms:9.3f}")
+        print(f"{'totals':<20} {latency(db.get_stats):9.3f} {latency(email_index.get_stats):9.3f}")
+        db.pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
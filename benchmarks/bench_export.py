@@ -0,0 +1,137 @@
+"""Peak RSS and throughput of /api/emails/export against building the whole list in memory.
+
+Fills a database with ``--messages`` emails (1 KB bodies), then measures,
+each in a fresh process so peaks do not carry over:
+
+- buffered: every row as a dict in one list, serialized with json.dumps
+  (what pulling everything through a jsonify response costs)
+- ndjson, ndjson+gzip, csv (and ndjson+br when brotli is installed):
+  the export endpoint read chunk by chunk through the Flask test client
+
+Prints the growth of the process's peak RSS over its baseline, rows/sec and
+bytes sent. The streamed runs fail (exit status 1) when they grow by more
+than ``--rss-ceiling-mb``. Memory-mapped database pages count toward RSS
+although they are page cache the kernel can drop, so the children run with
+SQLITE_MMAP_SIZE=0 unless ``--mmap`` is given; what remains is the SQLite
+page cache (SQLITE_CACHE_SIZE_KB) and the rows in flight.
+
+    python benchmarks/bench_export.py --messages 1000000 --rss-ceiling-mb 50 --skip-buffered
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config  # noqa: E402
+from bench_streaming_mime import peak_rss_mb  # noqa: E402
+from corpus import words  # noqa: E402
+
+START = datetime(2024, 1, 1, tzinfo=Config.TIMEZONE)
+
+
+def fill(db_path, messages):
+    from app.services.db import DatabaseService
+
+    db = DatabaseService(db_path)
+    db.init_database()
+    rng = random.Random(23)
+    batch_size = 5000
+    for first in range(0, messages, batch_size):
+        db.save_emails_batch([
+            {
+                'message_id': f'export-{index}',
+                'sender': f'sender{rng.randrange(2000)}@example.com',
+                'subject': f'Synthetic message {index}',
+                'body': words(1024, rng),
+                'received_date': (START + timedelta(seconds=index * 30)).strftime('%d-%m-%Y %H:%M:%S'),
+                'has_attachment': False
+            }
+            for index in range(first, min(first + batch_size, messages))
+        ])
+    db.pool.close_all()
+
+
+def measure(db_path, mode):
+    """Child process: one export, returns (peak RSS growth MB, rows, bytes, seconds)"""
+    Config.DATABASE_PATH = db_path
+    from flask import Flask
+    from app.routes.email_routes import email_bp, db_service
+
+    app = Flask(__name__)
+    app.register_blueprint(email_bp)
+    client = app.test_client()
+    baseline = peak_rss_mb(reset=True)
+    started = time.perf_counter()
+
+    if mode == 'buffered':
+        columns = db_service.EXPORT_COLUMNS + ('text', 'html')
+        emails = [dict(zip(columns, row)) for row in db_service.iter_emails(bodies=True)]
+        data = json.dumps({'emails': emails}).encode()
+        rows, sent = len(emails), len(data)
+    else:
+        export_format, _, encoding = mode.partition('+')
+        response = client.get(f'/api/emails/export?format={export_format}&bodies=true',
+                              headers={'Accept-Encoding': encoding or 'identity'}, buffered=False)
+        sent = 0
+        for chunk in response.response:
+            sent += len(chunk)
+        response.close()
+        rows = db_service.get_stats()['total_emails']
+
+    return peak_rss_mb() - baseline, rows, sent, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1000000)
+    parser.add_argument('--rss-ceiling-mb', type=float, default=50)
+    parser.add_argument('--mmap', action='store_true', help='keep SQLITE_MMAP_SIZE as configured')
+    parser.add_argument('--skip-buffered', action='store_true',
+                        help='leave out the in-memory run (it needs about 5 GB for a million emails)')
+    parser.add_argument('--child', nargs=2, metavar=('DB', 'MODE'), help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.child:
+        print(json.dumps(measure(*options.child)))
+        return
+
+    from app.services import compression
+
+    modes = ([] if options.skip_buffered else ['buffered']) + ['ndjson', 'ndjson+gzip', 'csv']
+    if compression.brotli is not None:
+        modes.append('ndjson+br')
+
+    env = dict(os.environ)
+    if not options.mmap:
+        env['SQLITE_MMAP_SIZE'] = '0'
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'emails.db')
+        started = time.perf_counter()
+        fill(db_path, options.messages)
+        print(f"{options.messages} emails stored in {time.perf_counter() - started:.0f}s\n")
+
+        print(f"{'mode':<12} {'peak RSS +MB':>13} {'rows/sec':>10} {'sent MB':>9}")
+        for mode in modes:
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', db_path, mode],
+                capture_output=True, text=True, cwd=tmp, env=env, check=True
+            )
+            growth, rows, sent, elapsed = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f"{mode:<12} {growth:13.1f} {rows / elapsed:10.0f} {sent / 1024 / 1024:9.1f}")
+            if mode != 'buffered' and growth > options.rss_ceiling_mb:
+                failed = True
+    if failed:
+        print(f"\n✗ A streamed export grew RSS by more than {options.rss_ceiling_mb} MB")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
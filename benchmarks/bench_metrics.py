@@ -0,0 +1,166 @@
+"""Overhead of the metrics instrumentation: the same workloads with METRICS_ENABLED on and off.
+
+Each run is a fresh process (instrumentation is installed at import time)
+working in its own temporary directory:
+
+* ingest: one ``EmailTracker.poll_once`` storing ``--messages`` messages
+  from the fake IMAP server (stage timers, IMAP byte counting, database
+  call timers); dominated by IMAP round trips, like the real thing
+* db: ``--calls`` mixed ``DatabaseService`` reads (stats, a listing page,
+  one body) on a database of ``--messages`` emails
+* http: ``--calls`` Flask requests to /api/emails, an attachment list,
+  /api/health and /api/search through the test client
+
+Runs alternate between on and off. The overhead is pure CPU, so each run
+reports the CPU time of its process and the best of ``--repeat`` runs is
+compared (scheduling noise on a shared machine only ever adds time).
+
+    python benchmarks/bench_metrics.py --messages 500 --repeat 7
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_imap import FakeImapServer  # noqa: E402
+from corpus import build_message  # noqa: E402
+
+WORKLOADS = ('ingest', 'db', 'http')
+WARMUP_MESSAGES = 5
+
+
+def poll(db, server_port, folder):
+    """One EmailTracker pass over ``folder``, returns CPU seconds"""
+    from app.config import Config
+    from app.services.accounts import Account, MailboxTarget
+    from app.services.email_tracker import EmailTracker
+
+    account = Account(name='bench', email_address='bench@example.com', password='secret',
+                      server='127.0.0.1', port=server_port, use_ssl=False)
+    tracker = EmailTracker(target=MailboxTarget(account, folder), db_service=db)
+    tracker.last_check_time = datetime(2000, 1, 1, tzinfo=Config.TIMEZONE)
+    started = time.process_time()
+    tracker.poll_once()
+    elapsed = time.process_time() - started
+    tracker.disconnect()
+    return elapsed
+
+
+def ingest(server_port, messages):
+    """CPU seconds of one poll storing ``messages`` emails, after a warm-up poll (lazy imports, regexes)"""
+    from app.config import Config
+    from app.services.db import DatabaseService
+
+    Config.TWO_PHASE_FETCH = False
+    db = DatabaseService()
+    db.init_database()
+    poll(db, server_port, 'warmup')
+    elapsed = poll(db, server_port, 'INBOX')
+    if db.get_stats()['total_emails'] != messages + WARMUP_MESSAGES:
+        raise RuntimeError(f"stored {db.get_stats()['total_emails']} of {messages + WARMUP_MESSAGES} emails")
+    return elapsed
+
+
+def fill_direct(messages):
+    """Store ``messages`` synthetic emails straight through save_emails_batch"""
+    from app.services.db import DatabaseService
+
+    db = DatabaseService()
+    db.init_database()
+    rng = random.Random(19)
+    db.save_emails_batch([
+        {
+            'message_id': f"bench:{index}",
+            'sender': f"sender{index % 97}@example.com",
+            'subject': f"Synthetic message {index}",
+            'body': ' '.join(rng.choices(('invoice', 'report', 'meeting', 'status', 'update'), k=300)),
+            'received_date': time.strftime('%d-%m-%Y %H:%M:%S', time.gmtime(1_700_000_000 + index * 60)),
+            'has_attachment': False
+        }
+        for index in range(messages)
+    ])
+    return db
+
+
+def child(workload, server_port, messages, calls):
+    """Run one workload in this process (cwd is a fresh temporary directory), returns CPU seconds"""
+    if workload == 'ingest':
+        return ingest(server_port, messages)
+    db = fill_direct(messages)
+
+    if workload == 'db':
+        started = time.process_time()
+        for index in range(calls):
+            db.get_stats()
+            db.get_emails_page(limit=50)
+            db.get_email_body(index % messages + 1)
+        return time.process_time() - started
+
+    from app import create_app
+    from app.config import Config
+    Config.validate_config = classmethod(lambda cls: True)
+    client = create_app().test_client()
+    paths = ('/api/emails?limit=50', '/api/emails/1/attachments', '/api/health', '/api/search?q=invoice')
+    started = time.process_time()
+    for index in range(calls):
+        response = client.get(paths[index % len(paths)])
+        if response.status_code != 200:
+            raise RuntimeError(f"{paths[index % len(paths)]} returned {response.status_code}")
+    return time.process_time() - started
+
+
+def run_child(workload, enabled, port, options):
+    with tempfile.TemporaryDirectory() as tmp:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', workload, str(port),
+             str(options.messages), str(options.calls)],
+            check=True, capture_output=True, text=True, cwd=tmp,
+            env=dict(os.environ, METRICS_ENABLED='true' if enabled else 'false',
+                     PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        workload, port, messages, calls = sys.argv[2:6]
+        print(json.dumps(child(workload, int(port), int(messages), int(calls))))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--calls', type=int, default=3000, help='database call rounds / HTTP requests')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--workloads', default=','.join(WORKLOADS))
+    options = parser.parse_args()
+
+    server = FakeImapServer()
+    rng = random.Random(19)
+    for index in range(options.messages):
+        attachments = [(f"file-{index}.bin", 16 * 1024)] if rng.random() < 0.3 else ()
+        server.mailbox.append(build_message(index, body_size=2048, attachments=attachments, rng=rng))
+    for index in range(WARMUP_MESSAGES):
+        server.mailbox.append(build_message(index, rng=rng), folder='warmup')
+    server.start()
+
+    print(f"{'workload':<8} {'off CPU s':>10} {'on CPU s':>10} {'overhead':>9}")
+    for workload in options.workloads.split(','):
+        samples = {True: [], False: []}
+        for _ in range(options.repeat):
+            for enabled in (False, True):
+                samples[enabled].append(run_child(workload, enabled, server.port, options))
+        off, on = min(samples[False]), min(samples[True])
+        print(f"{workload:<8} {off:10.3f} {on:10.3f} {(on - off) / off * 100:8.1f}%")
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
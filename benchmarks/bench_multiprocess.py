@@ -0,0 +1,250 @@
+"""Load test of the split layout: ``--workers`` web processes and one ingest process.
+
+Starts the fake IMAP server, ``--workers`` ``app.py`` processes with
+INGEST_IN_WEB=false on consecutive ports and one ``ingest.py``, all sharing
+a database and a ``sqlite://`` SOCKETIO_MESSAGE_QUEUE. A second
+``ingest.py`` is started too and must exit at once (the ingest lock).
+
+Then, for ``--seconds``, ``--rate`` messages a second are appended to the
+mailbox while ``--http-clients`` threads request the email list and /stats
+round-robin over the workers, and ``--clients-per-worker`` Socket.IO clients
+(Engine.IO long-polling) per worker subscribe to the ``emails`` room.
+
+Prints HTTP latency percentiles and req/s per worker, and the APPEND ->
+``new_emails`` delivery latency per worker. Exits with status 1 when a client
+missed or duplicated an email, or the email count in the database is off.
+
+    python benchmarks/bench_multiprocess.py --workers 4 --seconds 20 --rate 10
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_imap import FakeImapServer  # noqa: E402
+from corpus import build_message  # noqa: E402
+
+
+class SocketIOClient(threading.Thread):
+    """Minimal Socket.IO client over Engine.IO v4 long-polling, records new_emails arrivals"""
+
+    def __init__(self, port, rooms):
+        super().__init__(daemon=True)
+        self.port = port
+        self.rooms = rooms
+        self.received = []  # (perf_counter, subject)
+        self.ready = threading.Event()
+        self.stopped = threading.Event()
+        self.error = None
+        self.sid = None
+
+    def _url(self):
+        return f"/socket.io/?EIO=4&transport=polling&t={time.time()}" + (f"&sid={self.sid}" if self.sid else '')
+
+    def _get(self, conn):
+        conn.request('GET', self._url())
+        return conn.getresponse().read().decode().split('\x1e')
+
+    def _post(self, conn, packet):
+        conn.request('POST', self._url(), body=packet.encode(), headers={'Content-Type': 'text/plain;charset=UTF-8'})
+        conn.getresponse().read()
+
+    def run(self):
+        poll = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        send = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        try:
+            handshake = self._get(poll)[0]
+            self.sid = json.loads(handshake[1:])['sid']
+            self._post(send, '40')
+            while not self.stopped.is_set():
+                for packet in self._get(poll):
+                    if packet == '2':
+                        self._post(send, '3')
+                    elif packet.startswith('40'):
+                        self._post(send, '42' + json.dumps(['subscribe', {'rooms': self.rooms}]))
+                        self.ready.set()
+                    elif packet.startswith('42'):
+                        event, data = json.loads(packet[2:])[:2]
+                        if event == 'new_emails':
+                            now = time.perf_counter()
+                            self.received.extend((now, email['subject']) for email in data['emails'])
+        except Exception as e:
+            if not self.stopped.is_set():
+                self.error = str(e)
+        finally:
+            self.ready.set()
+            poll.close()
+            send.close()
+
+
+def http_load(ports, stopped, results):
+    """Keep-alive client requesting the listing and /stats round-robin over the workers"""
+    connections = {port: http.client.HTTPConnection('127.0.0.1', port, timeout=30) for port in ports}
+    paths = ['/api/emails?limit=50', '/stats']
+    index = 0
+    while not stopped.is_set():
+        port = ports[index % len(ports)]
+        path = paths[index % len(paths)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            connections[port].request('GET', path)
+            response = connections[port].getresponse()
+            response.read()
+            results.append((port, (time.perf_counter() - started) * 1000, response.status))
+        except (OSError, http.client.HTTPException):
+            connections[port].close()
+            results.append((port, None, None))
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/health')
+            conn.getresponse().read()
+            conn.close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--rate', type=float, default=10, help='messages appended per second')
+    parser.add_argument('--http-clients', type=int, default=8)
+    parser.add_argument('--clients-per-worker', type=int, default=5)
+    parser.add_argument('--base-port', type=int, default=5101)
+    options = parser.parse_args()
+
+    imap = FakeImapServer().start()
+    processes = []
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_PATH=os.path.join(tmp, 'emails.db'),
+            SOCKETIO_MESSAGE_QUEUE=f"sqlite:///{os.path.join(tmp, 'events.db')}",
+            IMAP_SERVER=imap.host, IMAP_PORT=str(imap.port), IMAP_USE_SSL='false',
+            EMAIL_ADDRESS='monitor@example.com', EMAIL_PASSWORD='secret',
+            INGEST_IN_WEB='false', DEBUG='false', PYTHONUNBUFFERED='1'
+        )
+        ports = [options.base_port + index for index in range(options.workers)]
+        logs = open(os.path.join(tmp, 'processes.log'), 'w')
+        try:
+            for port in ports:
+                processes.append(subprocess.Popen([sys.executable, os.path.join(ROOT, 'app.py')], cwd=tmp,
+                                                  env=dict(env, PORT=str(port)), stdout=logs, stderr=logs))
+            if not all(wait_for_port(port) for port in ports):
+                raise RuntimeError('a web worker did not start')
+            ingester = subprocess.Popen([sys.executable, os.path.join(ROOT, 'ingest.py')], cwd=tmp, env=env,
+                                        stdout=logs, stderr=logs)
+            processes.append(ingester)
+            time.sleep(2)
+            second = subprocess.run([sys.executable, os.path.join(ROOT, 'ingest.py')], cwd=tmp, env=env,
+                                    capture_output=True, text=True, timeout=60)
+            lock_ok = second.returncode == 1 and ingester.poll() is None
+            print(f"second ingester refused: {'yes' if lock_ok else 'NO'} ({second.stdout.strip().splitlines()[-1]})")
+            failed |= not lock_ok
+
+            clients = [SocketIOClient(port, ['emails', 'stats'])
+                       for port in ports for _ in range(options.clients_per_worker)]
+            for client in clients:
+                client.start()
+            for client in clients:
+                client.ready.wait(10)
+            time.sleep(1)  # subscriptions are posted right after the connect packet
+
+            stopped = threading.Event()
+            http_results = []
+            load = [threading.Thread(target=http_load, args=(ports, stopped, http_results), daemon=True)
+                    for _ in range(options.http_clients)]
+            for thread in load:
+                thread.start()
+
+            appended = {}
+            messages = int(options.seconds * options.rate)
+            started = time.perf_counter()
+            for index in range(messages):
+                uid = imap.mailbox.append(build_message(index))
+                appended[f"Synthetic message {index}"] = imap.mailbox.append_times[('INBOX', uid)]
+                time.sleep(max(0.0, started + (index + 1) / options.rate - time.perf_counter()))
+            elapsed = time.perf_counter() - started
+
+            deadline = time.monotonic() + 30
+            while time.monotonic() < deadline and any(len(client.received) < messages for client in clients):
+                time.sleep(0.2)
+            stopped.set()
+            for thread in load:
+                thread.join(timeout=35)
+
+            print(f"\n{messages} messages appended in {elapsed:.1f}s, {len(clients)} Socket.IO clients, "
+                  f"{options.http_clients} HTTP clients")
+            print(f"\n{'worker':<8} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+                  f" {'event p50':>10} {'event p95':>10} {'event max':>10} {'delivered':>10}")
+            for port in ports:
+                latencies = sorted(ms for p, ms, status in http_results if p == port and status == 200)
+                errors = sum(1 for p, ms, status in http_results if p == port and status != 200)
+                delays = []
+                delivered = True
+                for client in clients:
+                    if client.port != port:
+                        continue
+                    subjects = [subject for _, subject in client.received if subject in appended]
+                    delivered &= len(subjects) == messages and len(set(subjects)) == messages and not client.error
+                    delays.extend((at - appended[subject]) * 1000 for at, subject in client.received
+                                  if subject in appended)
+                delays.sort()
+                failed |= not delivered or errors > 0
+                print(f"{port:<8} {len(latencies) / elapsed:7.0f} {percentile(latencies, 0.5):8.1f} "
+                      f"{percentile(latencies, 0.95):8.1f} {percentile(latencies, 0.99):8.1f} {errors:7d}"
+                      f" {percentile(delays, 0.5) if delays else 0:10.1f} {percentile(delays, 0.95) if delays else 0:10.1f}"
+                      f" {delays[-1] if delays else 0:10.1f} {'all' if delivered else 'MISSING':>10}")
+
+            from app.config import Config
+            Config.DATABASE_PATH = env['DATABASE_PATH']
+            from app.services.db import DatabaseService
+            stored = DatabaseService().get_stats()['total_emails']
+            print(f"\nemails stored: {stored}/{messages}")
+            failed |= stored != messages
+            for client in clients:
+                client.stopped.set()
+        finally:
+            for process in processes:
+                if process.poll() is None:
+                    process.send_signal(signal.SIGINT if process.args[-1].endswith('app.py') else signal.SIGTERM)
+            for process in processes:
+                try:
+                    process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            logs.close()
+            if failed:
+                with open(os.path.join(tmp, 'processes.log')) as f:
+                    print('\n' + f.read()[-4000:])
+    imap.stop()
+    if failed:
+        print("\n✗ Lock, delivery or storage check failed")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""Backfill throughput of the thread-based supervisor vs. the asyncio pipeline.
+
+Pre-loads the fake IMAP server with messages (with attachments for a share of
+them) and measures the time until both engines have stored everything.
+Bodies are fetched in full by both engines (TWO_PHASE_FETCH off).
+
+    python benchmarks/bench_pipeline.py --mailboxes 4 --messages 500 --latency 0.02
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_imap import FakeImapServer  # noqa: E402
+from corpus import build_message  # noqa: E402
+
+
+def load_server(mailboxes, messages, attachment_ratio, attachment_size, latency):
+    server = FakeImapServer(latency=latency)
+    rng = random.Random(13)
+    folders = [f"box{index}" for index in range(mailboxes)]
+    for folder in folders:
+        for index in range(messages):
+            attachments = [(f"file-{index}.bin", attachment_size)] if rng.random() < attachment_ratio else ()
+            server.mailbox.append(build_message(index, body_size=2048, attachments=attachments, rng=rng), folder=folder)
+    return server.start(), folders
+
+
+def run(engine, server, folders, pool_size):
+    from app.config import Config
+    from app.services.accounts import Account, MailboxTarget
+    from app.services.db import DatabaseService
+    from app.services.supervisor import MonitorSupervisor
+    from app.services.async_pipeline import AsyncIngestPipeline
+
+    account = Account(
+        name='bench', email_address='bench@example.com', password='secret',
+        server=server.host, port=server.port, use_ssl=False, folders=tuple(folders)
+    )
+    engine_class = AsyncIngestPipeline if engine == 'asyncio' else MonitorSupervisor
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.DATABASE_PATH = os.path.join(tmp, 'emails.db')
+        Config.CHECK_INTERVAL = 1
+        Config.POLL_ADAPTIVE = False
+        Config.USE_IDLE = False
+        Config.TWO_PHASE_FETCH = False
+        db = DatabaseService()
+        db.init_database()
+
+        monitor = engine_class(targets=[MailboxTarget(account, folder) for folder in folders], pool_size=pool_size)
+        expected = sum(len(server.mailbox.messages(folder)) for folder in folders)
+        started = time.perf_counter()
+        monitor.start_monitoring()
+        while db.get_stats()['total_emails'] < expected and time.perf_counter() - started < 600:
+            time.sleep(0.02)
+        elapsed = time.perf_counter() - started
+        stored = db.get_stats()['total_emails']
+        monitor.stop_monitoring()
+        db.pool.close_all()
+    return stored, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mailboxes', type=int, default=4)
+    parser.add_argument('--messages', type=int, default=500, help='messages per mailbox')
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--attachment-ratio', type=float, default=0.3)
+    parser.add_argument('--attachment-size', type=int, default=64 * 1024)
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds per IMAP command')
+    options = parser.parse_args()
+
+    server, folders = load_server(options.mailboxes, options.messages, options.attachment_ratio,
+                                  options.attachment_size, options.latency)
+    results = {}
+    for engine in ('threads', 'asyncio'):
+        stored, elapsed = run(engine, server, folders, options.pool_size)
+        results[engine] = elapsed
+        print(f"{engine:<8} stored={stored:6d} in {elapsed:7.2f}s  {stored / elapsed:8.1f} emails/sec")
+    server.stop()
+    print(f"speedup: {results['threads'] / results['asyncio']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""Adaptive poll scheduling against the fixed 30s interval, on a simulated clock.
+
+Replays ``--days`` of generated mail arrivals for one polled mailbox: a quiet
+night (2/hour), office hours (30/hour) with a 10-minute burst of 20 emails a
+minute at 10:00, a quiet evening (6/hour), and a server outage from 14:00 to
+14:30 during which every pass fails. Both schedulers run on the same trace
+with no real sleeping:
+
+- fixed: the previous behaviour, CHECK_INTERVAL (30s) after every pass, 5s
+  after a failure and RETRY_DELAY (60s) after every MAX_RETRIES (3) failures
+- adaptive: PollScheduler with the configured POLL_* settings
+
+Prints the number of passes (IMAP round trips) per period, the delay from an
+email's arrival to the pass that picks it up, the failed passes during the
+outage and how long after it the mailbox was synced again. Then checks the
+backoff spread of ``--mailboxes`` mailboxes failing at the same instant.
+Exits with status 1 when an interval leaves its bounds, a backoff exceeds
+POLL_BACKOFF_MAX, the adaptive scheduler polls more often than the fixed one
+or picks up half of the burst's emails later than it. (The first emails of a
+burst wait for the interval it starts in, whatever the scheduler.)
+
+    python benchmarks/bench_poll_scheduler.py --days 7
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import Config  # noqa: E402
+from app.services.poll_scheduler import PollScheduler  # noqa: E402
+
+HOUR = 3600
+DAY = 24 * HOUR
+# (start hour, end hour, emails per hour)
+RATES = [(0, 8, 2), (8, 10, 30), (10, 10 + 1 / 6, 20 * 60), (10 + 1 / 6, 18, 30), (18, 24, 6)]
+BURST = (10 * HOUR, (10 + 1 / 6) * HOUR)
+OUTAGE = (14 * HOUR, 14.5 * HOUR)
+PERIODS = [('night', 0, 8), ('office', 8, 18), ('evening', 18, 24)]
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FixedScheduler:
+    """The scheduling EmailTracker had before PollScheduler"""
+
+    def __init__(self):
+        self.errors = 0
+        self.delay = Config.CHECK_INTERVAL
+
+    def record_success(self, arrivals):
+        self.errors = 0
+        self.delay = Config.CHECK_INTERVAL
+        return self.delay
+
+    def record_failure(self):
+        self.errors += 1
+        if self.errors >= 3:
+            self.errors = 0
+            self.delay = 60
+        else:
+            self.delay = 5
+        return self.delay
+
+
+def arrivals(days, rng):
+    """Poisson arrival times following RATES every day"""
+    times = []
+    for day in range(days):
+        for start, end, per_hour in RATES:
+            t = day * DAY + start * HOUR
+            while True:
+                t += rng.expovariate(per_hour / HOUR)
+                if t >= day * DAY + end * HOUR:
+                    break
+                times.append(t)
+    return times
+
+
+def in_window(t, window, days):
+    return any(day * DAY + window[0] <= t < day * DAY + window[1] for day in range(days))
+
+
+def simulate(scheduler, clock, times, days):
+    """Run the poll loop over the trace, returns what happened"""
+    passes = {name: 0 for name, _, _ in PERIODS}
+    delays, burst_delays, intervals, backoffs = [], [], [], []
+    failed, recovery = 0, []
+    next_arrival = 0
+    outage_ended = None
+    clock.now = 0.0
+    while clock.now < days * DAY:
+        t = clock.now
+        hour = (t % DAY) / HOUR
+        passes[next(name for name, start, end in PERIODS if start <= hour < end)] += 1
+        if in_window(t, OUTAGE, days):
+            failed += 1
+            backoffs.append(scheduler.record_failure())
+            outage_ended = (t // DAY) * DAY + OUTAGE[1]
+        else:
+            found = 0
+            while next_arrival < len(times) and times[next_arrival] <= t:
+                delay = t - times[next_arrival]
+                delays.append(delay)
+                if in_window(times[next_arrival], BURST, days):
+                    burst_delays.append(delay)
+                next_arrival += 1
+                found += 1
+            if outage_ended is not None:
+                recovery.append(t - outage_ended)
+                outage_ended = None
+            intervals.append(scheduler.record_success(found))
+        clock.now += scheduler.delay
+    return {
+        'passes': passes, 'delays': sorted(delays), 'burst_delays': sorted(burst_delays),
+        'intervals': intervals, 'backoffs': backoffs, 'failed': failed, 'recovery': recovery
+    }
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--mailboxes', type=int, default=50, help='mailboxes failing together in the backoff check')
+    parser.add_argument('--seed', type=int, default=25)
+    options = parser.parse_args()
+
+    times = arrivals(options.days, random.Random(options.seed))
+    clock = SimulatedClock()
+    results = {
+        'fixed': simulate(FixedScheduler(), clock, times, options.days),
+        'adaptive': simulate(PollScheduler(clock=clock, rng=random.Random(options.seed)), clock, times, options.days)
+    }
+
+    print(f"{len(times)} emails over {options.days} days\n")
+    print(f"{'scheduler':<10} {'passes/day':>10} {'night':>7} {'office':>7} {'evening':>8} "
+          f"{'delay p50':>10} {'p95':>7} {'max':>7} {'burst p50':>10} {'p95':>7} {'outage fails':>13} {'recovery':>9}")
+    for name, result in results.items():
+        passes = result['passes']
+        print(f"{name:<10} {sum(passes.values()) / options.days:10.0f} "
+              f"{passes['night'] / options.days:7.0f} {passes['office'] / options.days:7.0f} "
+              f"{passes['evening'] / options.days:8.0f} "
+              f"{percentile(result['delays'], 0.5):9.1f}s {percentile(result['delays'], 0.95):6.1f}s "
+              f"{result['delays'][-1]:6.0f}s {percentile(result['burst_delays'], 0.5):9.1f}s "
+              f"{percentile(result['burst_delays'], 0.95):6.1f}s "
+              f"{result['failed'] / options.days:13.0f} {max(result['recovery'], default=0):8.0f}s")
+
+    adaptive, fixed = results['adaptive'], results['fixed']
+    problems = []
+    low = Config.POLL_MIN_INTERVAL * (1 - Config.POLL_JITTER)
+    high = Config.POLL_MAX_INTERVAL * (1 + Config.POLL_JITTER)
+    if not all(low <= interval <= high for interval in adaptive['intervals']):
+        problems.append(f"an interval left [{low:.1f}, {high:.1f}]s")
+    if max(adaptive['backoffs'], default=0) > Config.POLL_BACKOFF_MAX:
+        problems.append(f"a backoff exceeded POLL_BACKOFF_MAX ({Config.POLL_BACKOFF_MAX}s)")
+    if sum(adaptive['passes'].values()) >= sum(fixed['passes'].values()):
+        problems.append("the adaptive scheduler polled as often as the fixed one")
+    if percentile(adaptive['burst_delays'], 0.5) > percentile(fixed['burst_delays'], 0.5):
+        problems.append("the adaptive scheduler picked up burst emails later than the fixed one")
+
+    # Mailboxes of one server that goes down fail together; jitter should spread their retries
+    print(f"\nbackoff after consecutive failures (s), {options.mailboxes} mailboxes failing at once:")
+    print(f"{'failure':>8} {'min':>8} {'max':>8} {'stdev':>8}")
+    rng = random.Random(options.seed)
+    schedulers = [PollScheduler(clock=clock, rng=rng) for _ in range(options.mailboxes)]
+    failure = 0
+    while failure < 12:
+        failure += 1
+        retries = [scheduler.record_failure() for scheduler in schedulers]
+        print(f"{failure:>8} {min(retries):8.1f} {max(retries):8.1f} {statistics.pstdev(retries):8.1f}")
+        if max(retries) > Config.POLL_BACKOFF_MAX:
+            problems.append(f"failure {failure} backed off past POLL_BACKOFF_MAX")
+        if options.mailboxes > 1 and statistics.pstdev(retries) == 0:
+            problems.append(f"the retries after failure {failure} were not spread")
+
+    if problems:
+        print("\n✗ " + "\n✗ ".join(problems))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Bytes and time to show a grid of image attachments, originals vs. thumbnails.
+
+Stores ``--images`` JPEG attachments of ``--width`` x ``--height`` pixels
+(noise, so they do not compress away), then requests every one through
+/api/attachments/<id>/view and /api/attachments/<id>/thumbnail with the
+Flask test client: the thumbnails once cold (generated) and once warm
+(served from the disk cache), and once more with If-None-Match as a
+browser revalidating its cache would. Needs Pillow (``pip install Pillow``).
+
+    python benchmarks/bench_previews.py --images 24 --width 3000 --height 2000
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402
+from flask import Flask  # noqa: E402
+from app.config import Config  # noqa: E402
+
+
+def photo(width, height, rng):
+    # Smooth gradients plus noise: about the size of a camera JPEG
+    small = Image.frombytes('RGB', (width // 16, height // 16), rng.randbytes(width // 16 * (height // 16) * 3))
+    image = small.resize((width, height), Image.Resampling.BILINEAR)
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=90)
+    return output.getvalue()
+
+
+def fetch_all(client, urls, headers=None):
+    started = time.perf_counter()
+    total = 0
+    responses = []
+    for url in urls:
+        response = client.get(url, headers=headers or {})
+        total += len(response.data)
+        responses.append(response)
+    return total, (time.perf_counter() - started) * 1000, responses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--images', type=int, default=24)
+    parser.add_argument('--width', type=int, default=3000)
+    parser.add_argument('--height', type=int, default=2000)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.DATABASE_PATH = os.path.join(tmp, 'emails.db')
+        from app.routes.email_routes import email_bp, db_service
+
+        db_service.init_database()
+        rng = random.Random(22)
+        db_service.save_emails_batch([{
+            'message_id': 'grid',
+            'sender': 'camera@example.com',
+            'subject': 'Photos',
+            'body': 'See attached',
+            'received_date': '01-01-2025 09:00:00',
+            'has_attachment': True,
+            'attachments': [(f'IMG_{index:04d}.jpg', photo(options.width, options.height, rng))
+                            for index in range(options.images)]
+        }])
+        ids = [row[0] for row in db_service.get_email_attachments(1)]
+
+        app = Flask(__name__)
+        app.register_blueprint(email_bp)
+        client = app.test_client()
+
+        rows = [('originals', *fetch_all(client, [f'/api/attachments/{i}/view' for i in ids])[:2])]
+        thumbnails = [f'/api/attachments/{i}/thumbnail' for i in ids]
+        rows.append(('thumbnails cold', *fetch_all(client, thumbnails)[:2]))
+        total, elapsed, responses = fetch_all(client, thumbnails)
+        rows.append(('thumbnails warm', total, elapsed))
+        etag = {'If-None-Match': responses[0].headers['ETag']}
+        rows.append(('revalidated', *fetch_all(client, thumbnails[:1], etag)[:2]))
+
+        print(f"{options.images} images of {options.width}x{options.height}")
+        print(f"{'request':<17} {'KB':>10} {'ms':>9}")
+        for name, total, elapsed in rows:
+            print(f"{name:<17} {total / 1024:10.1f} {elapsed:9.1f}")
+        db_service.pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Full-text search latency at different mailbox sizes.
+
+    python benchmarks/bench_search.py --sizes 100000,1000000
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.db import DatabaseService  # noqa: E402
+
+SYLLABLES = ('ka', 'lo', 'mi', 'ter', 'on', 'ra', 'ves', 'du', 'pla', 'net', 'sor', 'gi', 'bex', 'tu', 'an')
+
+
+def vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def populate(db, count, rng, words, batch_size=5000):
+    # Zipf-like word distribution so common and rare terms both exist
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    for start in range(0, count, batch_size):
+        records = []
+        for index in range(start, min(start + batch_size, count)):
+            body = ' '.join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(40, 200)))
+            records.append({
+                'message_id': str(index + 1),
+                'sender': f"user{rng.randint(1, 5000)}@example{rng.randint(1, 50)}.com",
+                'subject': ' '.join(rng.choices(words, cum_weights=cum_weights, k=6)),
+                'body': body,
+                'received_date': '18-10-2026 10:00:00',
+                'has_attachment': False,
+                'attachments': []
+            })
+        db.save_emails_batch(records)
+
+
+def time_query(db, query, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        db.search_emails(query, limit=20)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100000', help='comma-separated message counts')
+    parser.add_argument('--repeat', type=int, default=20)
+    options = parser.parse_args()
+
+    rng = random.Random(7)
+    words = vocabulary(20000, rng)
+    queries = {
+        'common term': words[0],
+        'rare term': words[-1],
+        'two terms': f"{words[3]} {words[50]}",
+        'prefix': words[10][:3],
+        'sender': 'user42',
+    }
+
+    for size in (int(value) for value in options.sizes.split(',')):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseService(os.path.join(tmp, 'emails.db'))
+            db.init_database()
+            started = time.perf_counter()
+            populate(db, size, rng, words)
+            print(f"\n{size} messages indexed in {time.perf_counter() - started:.1f}s")
+            for label, query in queries.items():
+                print(f"  {label:<12} {query!r:<24} median {time_query(db, query, options.repeat):8.2f} ms")
+            db.pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
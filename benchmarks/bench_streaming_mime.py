@@ -0,0 +1,174 @@
+"""Peak RSS of the monitor while it ingests one 200 MB message, streamed vs. loaded whole.
+
+Appends a message of ``--size-mb`` to the fake IMAP server: a short text
+part, one attachment that stays under ATTACHMENT_MAX_SIZE and one that
+exceeds it. Each run is a fresh process that does one ``EmailTracker``
+poll (TWO_PHASE_FETCH off) and reports its peak RSS. The streamed run
+fails (exit status 1) when it goes over ``--rss-ceiling-mb``, or when the
+stored email does not match the message.
+
+    python benchmarks/bench_streaming_mime.py --size-mb 200 --rss-ceiling-mb 100
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_imap import FakeImapServer  # noqa: E402
+
+BOUNDARY = 'bench-boundary-0001'
+
+
+def attachment_part(filename, payload):
+    encoded = base64.encodebytes(payload).replace(b'\n', b'\r\n')
+    return (
+        f'--{BOUNDARY}\r\nContent-Type: application/octet-stream\r\n'
+        f'Content-Transfer-Encoding: base64\r\n'
+        f'Content-Disposition: attachment; filename="{filename}"\r\n\r\n'
+    ).encode() + encoded
+
+
+def build_large_message(size_mb, max_attachment_mb, seed=18):
+    """Raw message of about ``size_mb`` MB and the (filename, sha256, size) of its attachments"""
+    rng = random.Random(seed)
+    payload_bytes = int(size_mb * 1024 * 1024 * 0.74)  # base64 adds a third
+    oversized = min(int((max_attachment_mb + 10) * 1024 * 1024), payload_bytes * 3 // 4)
+    sizes = [('oversized.bin', oversized), ('stored.bin', payload_bytes - oversized)]
+    head = (
+        f'From: Sender <sender@example.com>\r\nTo: monitor@example.com\r\nSubject: Large message\r\n'
+        f'Date: {format_datetime(datetime.now(timezone.utc))}\r\nMessage-ID: <large@example.com>\r\n'
+        f'MIME-Version: 1.0\r\nContent-Type: multipart/mixed; boundary="{BOUNDARY}"\r\n\r\n'
+        f'--{BOUNDARY}\r\nContent-Type: text/plain; charset="utf-8"\r\n\r\nSee the attached files.\r\n'
+    ).encode()
+    parts = [head]
+    expected = []
+    for filename, size in sizes:
+        payload = rng.randbytes(size)
+        expected.append((filename, hashlib.sha256(payload).hexdigest(), size))
+        parts.append(attachment_part(filename, payload))
+        del payload
+    parts.append(f'--{BOUNDARY}--\r\n'.encode())
+    return b''.join(parts), expected
+
+
+def peak_rss_mb(reset=False):
+    """Peak RSS of this process (VmHWM); ``reset`` restarts it from the current RSS.
+
+    ru_maxrss is not usable here: a child process inherits the peak of the
+    parent that forked it, which holds the whole message for the server.
+    """
+    if reset:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def ingest(port, streaming_threshold, budget_mb, max_attachment_mb):
+    """Child process: one poll of the fake server, returns peak RSS and what was stored"""
+    from app.config import Config
+    from app.services.accounts import Account, MailboxTarget
+    from app.services.db import DatabaseService
+    from app.services.email_tracker import EmailTracker
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.DATABASE_PATH = os.path.join(tmp, 'emails.db')
+        Config.TWO_PHASE_FETCH = False
+        Config.STREAMING_THRESHOLD = streaming_threshold
+        Config.STREAMING_MEMORY_BUDGET = int(budget_mb * 1024 * 1024)
+        Config.ATTACHMENT_MAX_SIZE = int(max_attachment_mb * 1024 * 1024)
+        db = DatabaseService()
+        db.init_database()
+        account = Account(name='bench', email_address='bench@example.com', password='secret',
+                          server='127.0.0.1', port=port, use_ssl=False)
+        tracker = EmailTracker(target=MailboxTarget(account), db_service=db)
+        tracker.last_check_time = datetime(2000, 1, 1, tzinfo=Config.TIMEZONE)
+        baseline = peak_rss_mb(reset=True)
+        started = time.perf_counter()
+        ok = tracker.poll_once()
+        elapsed = time.perf_counter() - started
+        peak = peak_rss_mb()
+        tracker.disconnect()
+
+        with db.get_connection() as conn:
+            rows = conn.execute('SELECT filename, sha256, size FROM attachments ORDER BY id').fetchall()
+            text = db.get_email_body(1)[0] if conn.execute('SELECT COUNT(*) FROM emails').fetchone()[0] else None
+        db.pool.close_all()
+    return {
+        'ok': ok,
+        'elapsed': elapsed,
+        'baseline_rss_mb': baseline,
+        'peak_rss_mb': peak,
+        'attachments': rows,
+        'text': text
+    }
+
+
+def run_child(port, options, streaming):
+    threshold = 1 if streaming else 0
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', str(port), str(threshold),
+         str(options.budget_mb), str(options.max_attachment_mb)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        port, threshold, budget_mb, max_attachment_mb = sys.argv[2:6]
+        print(json.dumps(ingest(int(port), int(threshold), float(budget_mb), float(max_attachment_mb))))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=200)
+    parser.add_argument('--budget-mb', type=float, default=8, help='STREAMING_MEMORY_BUDGET')
+    parser.add_argument('--max-attachment-mb', type=float, default=100, help='ATTACHMENT_MAX_SIZE')
+    parser.add_argument('--rss-ceiling-mb', type=float, default=100)
+    parser.add_argument('--skip-whole', action='store_true', help='only run the streamed ingest')
+    options = parser.parse_args()
+
+    raw, expected = build_large_message(options.size_mb, options.max_attachment_mb)
+    limit = options.max_attachment_mb * 1024 * 1024
+    expected = [(filename, digest if size <= limit else None, size) for filename, digest, size in expected]
+    server = FakeImapServer().start()
+    server.mailbox.append(raw)
+    print(f"message: {len(raw) / 1024 / 1024:.1f} MB, attachments: "
+          + ', '.join(f"{filename} {size / 1024 / 1024:.1f} MB" for filename, _, size in expected))
+    del raw
+
+    failed = False
+    runs = [('streamed', True)] + ([] if options.skip_whole else [('whole', False)])
+    print(f"{'ingest':<10} {'peak RSS MB':>12} {'baseline MB':>12} {'seconds':>8}")
+    for name, streaming in runs:
+        for message in server.mailbox.messages('INBOX'):
+            message['flags'].clear()
+        result = run_child(server.port, options, streaming)
+        print(f"{name:<10} {result['peak_rss_mb']:12.1f} {result['baseline_rss_mb']:12.1f} {result['elapsed']:8.1f}")
+        stored = [tuple(row) for row in result['attachments']]
+        if not result['ok'] or stored != expected or not (result['text'] or '').startswith('See the attached'):
+            print(f"  ✗ stored email does not match the message: {stored}")
+            failed = True
+        if streaming and result['peak_rss_mb'] > options.rss_ceiling_mb:
+            print(f"  ✗ peak RSS over the {options.rss_ceiling_mb:.0f} MB ceiling")
+            failed = True
+    server.stop()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
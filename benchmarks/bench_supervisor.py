@@ -0,0 +1,76 @@
+"""Ingest throughput of MonitorSupervisor for many mailboxes at different pool sizes.
+
+Every mailbox is a folder on the fake IMAP server, which adds ``--latency``
+seconds to each command to stand in for a remote server. Reports how long it
+takes until every pre-loaded message is stored.
+
+    python benchmarks/bench_supervisor.py --mailboxes 40 --messages 25 --pool-sizes 1,4,8,16
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_imap import FakeImapServer  # noqa: E402
+from corpus import build_message  # noqa: E402
+
+
+def run(mailboxes, messages, pool_size, latency):
+    from app.config import Config
+    from app.services.accounts import Account, MailboxTarget
+    from app.services.db import DatabaseService
+    from app.services.supervisor import MonitorSupervisor
+
+    server = FakeImapServer(latency=latency).start()
+    folders = [f"box{index}" for index in range(mailboxes)]
+    for folder in folders:
+        for index in range(messages):
+            server.mailbox.append(build_message(index), folder=folder)
+    account = Account(
+        name='bench', email_address='bench@example.com', password='secret',
+        server=server.host, port=server.port, use_ssl=False, folders=tuple(folders)
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.DATABASE_PATH = os.path.join(tmp, 'emails.db')
+        Config.CHECK_INTERVAL = 1
+        Config.POLL_ADAPTIVE = False
+        Config.USE_IDLE = False
+        db = DatabaseService()
+        db.init_database()
+
+        supervisor = MonitorSupervisor(
+            targets=[MailboxTarget(account, folder) for folder in folders],
+            pool_size=pool_size
+        )
+        started = time.perf_counter()
+        supervisor.start_monitoring()
+        expected = mailboxes * messages
+        while db.get_stats()['total_emails'] < expected and time.perf_counter() - started < 300:
+            time.sleep(0.02)
+        elapsed = time.perf_counter() - started
+        stored = db.get_stats()['total_emails']
+        supervisor.stop_monitoring()
+        db.pool.close_all()
+    server.stop()
+    return stored, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mailboxes', type=int, default=40)
+    parser.add_argument('--messages', type=int, default=25, help='messages per mailbox')
+    parser.add_argument('--pool-sizes', default='1,4,8,16')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds per IMAP command')
+    options = parser.parse_args()
+
+    for pool_size in (int(value) for value in options.pool_sizes.split(',')):
+        stored, elapsed = run(options.mailboxes, options.messages, pool_size, options.latency)
+        print(f"pool={pool_size:<3} stored={stored:5d} in {elapsed:6.2f}s  {stored / elapsed:8.1f} emails/sec")
+
+
+if __name__ == '__main__':
+    main()
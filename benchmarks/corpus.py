@@ -0,0 +1,148 @@
+"""Synthetic message builder and mailbox generator shared by the benchmark harnesses"""
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from email.utils import format_datetime
+
+# kind -> (maintype, subtype, extension, (smallest, largest) size in bytes, sizes are log-uniform)
+ATTACHMENT_KINDS = {
+    'text': ('text', 'plain', 'txt', (200, 20 * 1024)),
+    'pdf': ('application', 'pdf', 'pdf', (20 * 1024, 800 * 1024)),
+    'image': ('image', 'jpeg', 'jpg', (30 * 1024, 1536 * 1024)),
+    'office': ('application', 'vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx',
+               (10 * 1024, 400 * 1024)),
+    'archive': ('application', 'zip', 'zip', (100 * 1024, 4 * 1024 * 1024))
+}
+DEFAULT_ATTACHMENT_MIX = 'none=0.7,pdf=0.12,image=0.1,office=0.05,archive=0.03'
+CORPUS_START = datetime(2025, 1, 6, 8, 0, tzinfo=timezone.utc)  # fixed, so a seed always gives the same mailbox
+
+
+WORDS = ('invoice', 'report', 'meeting', 'delivery', 'status', 'update', 'request', 'order')
+
+
+def words(size, rng=random):
+    """About ``size`` characters of space-separated words"""
+    text = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        text.append(word)
+        length += len(word) + 1
+    return ' '.join(text)
+
+
+def build_message(index, body_size=512, attachments=(), date=None, rng=random, html=False):
+    """Build a raw RFC822 message (CRLF line endings) with optional attachments.
+
+    ``attachments`` is a sequence of (filename, size) pairs, optionally
+    followed by the MIME maintype and subtype (application/octet-stream by
+    default). ``html`` adds an HTML alternative of the text body.
+    """
+    msg = EmailMessage()
+    msg['From'] = f"sender{index % 97}@example.com"
+    msg['To'] = 'monitor@example.com'
+    msg['Subject'] = f"Synthetic message {index}"
+    msg['Date'] = format_datetime(date or datetime.now(timezone.utc))
+    msg['Message-ID'] = f"<synthetic-{index}@example.com>"
+    text = words(body_size, rng)
+    msg.set_content(text + '\n')
+    if html:
+        msg.add_alternative(f"<html><body><p>{text}</p></body></html>\n", subtype='html')
+    for filename, size, *content_type in attachments:
+        maintype, subtype = content_type or ('application', 'octet-stream')
+        if maintype == 'text':
+            payload = words(size, rng).encode()
+        else:
+            payload = rng.randbytes(size) if hasattr(rng, 'randbytes') else bytes(size)
+        msg.add_attachment(payload, maintype=maintype, subtype=subtype, filename=filename)
+    for number, part in enumerate(part for part in msg.walk() if part.is_multipart()):
+        part.set_boundary(f"synthetic-{index}-{number}")  # the default one is random
+    return msg.as_bytes().replace(b'\r\n', b'\n').replace(b'\n', b'\r\n')
+
+
+def parse_attachment_mix(spec):
+    """``"none=0.7,pdf=0.2,image=0.1"`` -> {kind: weight}; ``none`` is a message without attachments"""
+    mix = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        kind, _, weight = item.partition('=')
+        kind = kind.strip()
+        if kind != 'none' and kind not in ATTACHMENT_KINDS:
+            raise ValueError(f"unknown attachment kind {kind!r} (none, {', '.join(ATTACHMENT_KINDS)})")
+        mix[kind] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError(f"empty attachment mix: {spec!r}")
+    return mix
+
+
+class CorpusGenerator:
+    """Deterministic synthetic mailbox: the same parameters and seed always give the same messages.
+
+    Body sizes follow a log-normal distribution around ``body_median``
+    bytes (``body_sigma`` is the spread: 0 makes every body the same size,
+    1 gives the long tail of real mail). Each message picks an attachment
+    kind from ``attachment_mix``; one with attachments carries 1 to
+    ``max_attachments`` of that kind, with log-uniform sizes from the
+    kind's range, capped at ``max_attachment_size``. ``html_ratio`` of the
+    messages also get an HTML alternative. Dates start at CORPUS_START,
+    ``interval`` seconds apart.
+    """
+
+    def __init__(self, count, body_median=2048, body_sigma=1.0, attachment_mix=DEFAULT_ATTACHMENT_MIX,
+                 max_attachments=2, max_attachment_size=None, html_ratio=0.3, interval=60, seed=20):
+        self.count = count
+        self.body_median = body_median
+        self.body_sigma = body_sigma
+        self.mix = parse_attachment_mix(attachment_mix) if isinstance(attachment_mix, str) else dict(attachment_mix)
+        self.max_attachments = max_attachments
+        self.max_attachment_size = max_attachment_size
+        self.html_ratio = html_ratio
+        self.interval = interval
+        self.seed = seed
+
+    def parameters(self):
+        return {
+            'messages': self.count,
+            'body_median': self.body_median,
+            'body_sigma': self.body_sigma,
+            'attachment_mix': ','.join(f"{kind}={weight:g}" for kind, weight in self.mix.items()),
+            'max_attachments': self.max_attachments,
+            'max_attachment_size': self.max_attachment_size,
+            'html_ratio': self.html_ratio,
+            'seed': self.seed
+        }
+
+    def _attachment_size(self, rng, low, high):
+        size = int(math.exp(rng.uniform(math.log(low), math.log(high))))
+        return min(size, self.max_attachment_size) if self.max_attachment_size else size
+
+    def __iter__(self):
+        rng = random.Random(self.seed)
+        kinds, weights = list(self.mix), list(self.mix.values())
+        for index in range(self.count):
+            body_size = max(16, int(rng.lognormvariate(math.log(self.body_median), self.body_sigma)))
+            kind = rng.choices(kinds, weights)[0]
+            attachments = []
+            if kind != 'none':
+                maintype, subtype, extension, (low, high) = ATTACHMENT_KINDS[kind]
+                attachments = [
+                    (f"{kind}-{index}-{number}.{extension}", self._attachment_size(rng, low, high), maintype, subtype)
+                    for number in range(rng.randint(1, self.max_attachments))
+                ]
+            yield build_message(
+                index, body_size=body_size, attachments=attachments, rng=rng,
+                date=CORPUS_START + timedelta(seconds=index * self.interval),
+                html=rng.random() < self.html_ratio
+            )
+
+    def seed_server(self, server, folder='INBOX'):
+        """Append the corpus to a FakeImapServer folder; returns totals of what was appended"""
+        totals = {'messages': 0, 'bytes': 0, 'with_attachments': 0}
+        for raw in self:
+            server.mailbox.append(raw, folder=folder)
+            totals['messages'] += 1
+            totals['bytes'] += len(raw)
+            totals['with_attachments'] += b'Content-Disposition: attachment' in raw
+        return totals
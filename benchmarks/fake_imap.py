@@ -0,0 +1,384 @@
+"""Minimal in-process IMAP4rev1 server used by the benchmark harnesses.
+
+It implements just enough of RFC 3501 / RFC 2177 for ``imap_tools`` and
+``imaplib``: LOGIN, CAPABILITY, SELECT/EXAMINE, STATUS, UID SEARCH, UID FETCH
+(including partial ``BODY.PEEK[]<offset.length>`` fetches), UID STORE, APPEND, NOOP,
+IDLE and LOGOUT. Messages live in memory and are shared by all connections,
+so appending a message wakes up every client that is currently IDLE.
+"""
+import email
+import re
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+class FakeMailbox:
+    """Thread-safe in-memory folder store shared by all server connections"""
+
+    def __init__(self, uidvalidity=1):
+        self.uidvalidity = uidvalidity
+        self.folders = {'INBOX': []}
+        self.uidnext = {'INBOX': 1}
+        self.append_times = {}
+        self.condition = threading.Condition()
+
+    def append(self, raw, folder='INBOX', date=None):
+        """Store a raw RFC822 message and return its UID"""
+        with self.condition:
+            folder_messages = self.folders.setdefault(folder, [])
+            uid = self.uidnext.setdefault(folder, 1)
+            self.uidnext[folder] = uid + 1
+            if date is None:
+                try:
+                    date = parsedate_to_datetime(self._header(raw, b'Date'))
+                except (TypeError, ValueError):
+                    date = datetime.now(timezone.utc)
+            folder_messages.append({'uid': uid, 'raw': raw, 'date': date, 'flags': set()})
+            self.append_times[(folder, uid)] = time.perf_counter()
+            self.condition.notify_all()
+            return uid
+
+    def reset_uidvalidity(self, uidvalidity):
+        with self.condition:
+            self.uidvalidity = uidvalidity
+            self.condition.notify_all()
+
+    def messages(self, folder):
+        with self.condition:
+            return list(self.folders.get(folder, []))
+
+    @staticmethod
+    def _header(raw, name):
+        match = re.search(rb'^' + name + rb':\s*(.*?)\r?\n(?![ \t])', raw, re.M | re.I | re.S)
+        return match.group(1).decode('latin-1') if match else None
+
+
+class FakeImapServer:
+    """Threaded TCP server speaking plain-text IMAP on localhost"""
+
+    def __init__(self, mailbox=None, host='127.0.0.1', port=0, capabilities=('IMAP4rev1', 'IDLE'), latency=0.0):
+        self.mailbox = mailbox or FakeMailbox()
+        self.capabilities = capabilities
+        self.latency = latency  # seconds added to every command, to simulate a remote server
+        self.bytes_sent = 0
+        self.commands = []
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.listen(64)
+        self.host, self.port = self._sock.getsockname()
+        self._running = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._serve, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _serve(self):
+        while self._running:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            # A FETCH answer goes out as several writes; without this every command stalls on delayed ACKs
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=_Session(self, conn).run, daemon=True).start()
+
+    def record(self, command, sent):
+        with self._lock:
+            self.commands.append(command)
+            self.bytes_sent += sent
+
+
+class _Session:
+    """One client connection"""
+
+    def __init__(self, server, conn):
+        self.server = server
+        self.mailbox = server.mailbox
+        self.conn = conn
+        self.reader = conn.makefile('rb')
+        self.folder = None
+
+    def send(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self.conn.sendall(data)
+        return len(data)
+
+    def run(self):
+        try:
+            self.send(f"* OK [CAPABILITY {' '.join(self.server.capabilities)}] fake imap ready\r\n")
+            while True:
+                line = self.reader.readline()
+                if not line:
+                    return
+                line = self._read_literals(line)
+                tag, _, rest = line.decode('utf-8', 'replace').rstrip('\r\n').partition(' ')
+                command, _, args = rest.partition(' ')
+                command = command.upper()
+                if command == 'UID':
+                    sub, _, args = args.partition(' ')
+                    command = 'UID ' + sub.upper()
+                handler = getattr(self, 'do_' + command.replace(' ', '_').lower(), None)
+                if self.server.latency and command != 'IDLE':
+                    time.sleep(self.server.latency)
+                if handler is None:
+                    self.send(f"{tag} BAD unknown command\r\n")
+                    continue
+                sent = handler(tag, args.strip(), line)
+                self.server.record(command, sent or 0)
+                if command == 'LOGOUT':
+                    return
+        except (OSError, ValueError):
+            pass
+        finally:
+            try:
+                self.conn.close()
+            except OSError:
+                pass
+
+    def _read_literals(self, line):
+        # APPEND sends "{n}" synchronising literals; answer with a continuation and inline the data
+        while True:
+            match = re.search(rb'\{(\d+)\}\r\n$', line)
+            if not match:
+                return line
+            self.send(b"+ go ahead\r\n")
+            literal = self.reader.read(int(match.group(1)))
+            line = line[:match.start()] + b'\x00LITERAL\x00' + literal + self.reader.readline()
+
+    # -- commands ---------------------------------------------------------
+
+    def do_capability(self, tag, args, line):
+        return self.send(f"* CAPABILITY {' '.join(self.server.capabilities)}\r\n{tag} OK CAPABILITY completed\r\n")
+
+    def do_login(self, tag, args, line):
+        return self.send(f"{tag} OK LOGIN completed\r\n")
+
+    def do_noop(self, tag, args, line):
+        with self.mailbox.condition:
+            exists = len(self.mailbox.folders.get(self.folder, []))
+        return self.send(f"* {exists} EXISTS\r\n{tag} OK NOOP completed\r\n")
+
+    def do_logout(self, tag, args, line):
+        return self.send(f"* BYE logging out\r\n{tag} OK LOGOUT completed\r\n")
+
+    def do_select(self, tag, args, line):
+        folder = args.strip('"')
+        with self.mailbox.condition:
+            if folder not in self.mailbox.folders:
+                return self.send(f"{tag} NO no such folder\r\n")
+            self.folder = folder
+            exists = len(self.mailbox.folders[folder])
+            uidnext = self.mailbox.uidnext[folder]
+            uidvalidity = self.mailbox.uidvalidity
+        return self.send(
+            f"* FLAGS (\\Seen \\Deleted)\r\n* {exists} EXISTS\r\n* 0 RECENT\r\n"
+            f"* OK [UIDVALIDITY {uidvalidity}] UIDs valid\r\n* OK [UIDNEXT {uidnext}] next uid\r\n"
+            f"{tag} OK [READ-WRITE] SELECT completed\r\n"
+        )
+
+    do_examine = do_select
+
+    def do_status(self, tag, args, line):
+        folder = args.split(' (')[0].strip('"')
+        with self.mailbox.condition:
+            if folder not in self.mailbox.folders:
+                return self.send(f"{tag} NO no such folder\r\n")
+            messages = len(self.mailbox.folders[folder])
+            uidnext = self.mailbox.uidnext[folder]
+            uidvalidity = self.mailbox.uidvalidity
+        return self.send(
+            f'* STATUS "{folder}" (MESSAGES {messages} UIDNEXT {uidnext} UIDVALIDITY {uidvalidity})\r\n'
+            f"{tag} OK STATUS completed\r\n"
+        )
+
+    def do_append(self, tag, args, line):
+        folder = args.split(' ')[0].strip('"')
+        raw = line.split(b'\x00LITERAL\x00', 1)[1]
+        if raw.endswith(b'\r\n'):
+            raw = raw[:-2]
+        uid = self.mailbox.append(raw, folder=folder)
+        return self.send(f"{tag} OK [APPENDUID {self.mailbox.uidvalidity} {uid}] APPEND completed\r\n")
+
+    def do_idle(self, tag, args, line):
+        sent = self.send(b"+ idling\r\n")
+        with self.mailbox.condition:
+            seen = len(self.mailbox.folders.get(self.folder, []))
+        done = threading.Event()
+
+        def notifier():
+            nonlocal seen
+            while not done.is_set():
+                with self.mailbox.condition:
+                    self.mailbox.condition.wait(timeout=0.5)
+                    exists = len(self.mailbox.folders.get(self.folder, []))
+                if exists != seen and not done.is_set():
+                    seen = exists
+                    try:
+                        self.send(f"* {exists} EXISTS\r\n")
+                    except OSError:
+                        return
+
+        threading.Thread(target=notifier, daemon=True).start()
+        try:
+            while True:
+                cont = self.reader.readline()
+                if not cont or cont.strip().upper() == b'DONE':
+                    break
+        finally:
+            done.set()
+        return sent + self.send(f"{tag} OK IDLE terminated\r\n")
+
+    def do_uid_search(self, tag, args, line):
+        uids = [str(msg['uid']) for msg in self._search(args)]
+        return self.send(f"* SEARCH {' '.join(uids)}\r\n{tag} OK SEARCH completed\r\n")
+
+    def do_uid_fetch(self, tag, args, line):
+        uid_set, _, items = args.partition(' ')
+        messages = self._select_uids(uid_set)
+        sent = 0
+        for seq, msg in messages:
+            sent += self.send(self._fetch_response(seq, msg, items.upper()))
+        return sent + self.send(f"{tag} OK FETCH completed\r\n")
+
+    def do_uid_store(self, tag, args, line):
+        uid_set, _, rest = args.partition(' ')
+        action, _, flags = rest.partition(' ')
+        flags = set(flags.strip('()').split())
+        for _, msg in self._select_uids(uid_set):
+            if action.upper().startswith('-'):
+                msg['flags'] -= flags
+            else:
+                msg['flags'] |= flags
+        return self.send(f"{tag} OK STORE completed\r\n")
+
+    # -- helpers ----------------------------------------------------------
+
+    def _search(self, criteria):
+        messages = self.mailbox.messages(self.folder)
+        tokens = criteria.replace('(', ' ').replace(')', ' ').split()
+        if tokens[:1] == ['CHARSET']:
+            tokens = tokens[2:]
+        i = 0
+        while i < len(tokens):
+            token = tokens[i].upper()
+            if token == 'UID':
+                allowed = {msg['uid'] for _, msg in self._select_uids(tokens[i + 1], messages)}
+                messages = [msg for msg in messages if msg['uid'] in allowed]
+                i += 2
+            elif token == 'SINCE':
+                since = datetime.strptime(tokens[i + 1].strip('"'), '%d-%b-%Y').date()
+                messages = [msg for msg in messages if msg['date'].date() >= since]
+                i += 2
+            else:
+                i += 1
+        return messages
+
+    def _select_uids(self, uid_set, messages=None):
+        messages = self.mailbox.messages(self.folder) if messages is None else messages
+        if not messages:
+            return []
+        highest = messages[-1]['uid']
+        wanted = set()
+        ranges = []
+        for part in uid_set.split(','):
+            if ':' in part:
+                start, end = part.split(':')
+                start = highest if start == '*' else int(start)
+                end = highest if end == '*' else int(end)
+                ranges.append((min(start, end), max(start, end)))
+            else:
+                wanted.add(highest if part == '*' else int(part))
+        return [
+            (seq, msg) for seq, msg in enumerate(self.mailbox.messages(self.folder), start=1)
+            if msg['uid'] in wanted or any(lo <= msg['uid'] <= hi for lo, hi in ranges)
+        ]
+
+    def _fetch_response(self, seq, msg, items):
+        raw = msg['raw']
+        parts = [f"UID {msg['uid']}"]
+        if 'FLAGS' in items:
+            parts.append(f"FLAGS ({' '.join(sorted(msg['flags']))})")
+        if 'RFC822.SIZE' in items:
+            parts.append(f"RFC822.SIZE {len(raw)}")
+        if 'BODYSTRUCTURE' in items:
+            parts.append(f"BODYSTRUCTURE {_bodystructure(email.message_from_bytes(raw))}")
+        if 'INTERNALDATE' in items:
+            parts.append(f'INTERNALDATE "{msg["date"].strftime("%d-%b-%Y %H:%M:%S %z")}"')
+        literal = None
+        section = re.search(r'BODY(?:\.PEEK)?\[([A-Z.0-9 ()-]*)\](?:<(\d+)\.(\d+)>)?', items)
+        if section:
+            name = section.group(1)
+            if name == 'HEADER':
+                literal = raw.split(b'\r\n\r\n', 1)[0] + b'\r\n\r\n'
+            else:
+                literal = raw
+            key = f"BODY[{name}]"
+            if section.group(2) is not None:
+                offset, length = int(section.group(2)), int(section.group(3))
+                literal = literal[offset:offset + length]
+                key += f"<{offset}>"
+            if 'PEEK' not in section.group(0):
+                msg['flags'].add('\\Seen')
+        head = f"* {seq} FETCH ({' '.join(parts)}"
+        if literal is None:
+            return (head + ")\r\n").encode()
+        return head.encode() + f" {key} {{{len(literal)}}}\r\n".encode() + literal + b")\r\n"
+
+
+def _quote(value):
+    return 'NIL' if value is None else '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _bodystructure(part):
+    """Simplified RFC 3501 BODYSTRUCTURE (type, subtype, params, disposition)"""
+    if part.is_multipart():
+        children = ''.join(_bodystructure(child) for child in part.get_payload())
+        return f"({children} {_quote(part.get_content_subtype())})"
+    params = ' '.join(f"{_quote(k)} {_quote(v)}" for k, v in part.get_params()[1:]) or None
+    payload = part.get_payload()
+    size = len(payload.encode() if isinstance(payload, str) else payload or b'')
+    disposition = part.get_content_disposition()
+    disposition = (
+        f"({_quote(disposition)} ({_quote('filename')} {_quote(part.get_filename())}))"
+        if disposition else 'NIL'
+    )
+    return (
+        f"({_quote(part.get_content_maintype())} {_quote(part.get_content_subtype())} "
+        f"{'(' + params + ')' if params else 'NIL'} NIL NIL "
+        f"{_quote(part.get('Content-Transfer-Encoding', '7bit'))} {size} NIL {disposition} NIL)"
+    )
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a fake IMAP server on localhost')
+    parser.add_argument('--port', type=int, default=1143)
+    options = parser.parse_args()
+    with FakeImapServer(port=options.port) as server:
+        print(f"Fake IMAP server listening on {server.host}:{server.port}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
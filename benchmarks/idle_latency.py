@@ -0,0 +1,110 @@
+"""Measure APPEND -> ``new_email`` latency for IDLE push mode vs. interval polling.
+
+Runs an ``EmailTracker`` against the local fake IMAP server, appends messages
+at a fixed rate and records when each ``new_email`` event is emitted.
+
+    python benchmarks/idle_latency.py --messages 20 --mode idle
+    python benchmarks/idle_latency.py --messages 20 --mode poll --check-interval 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_imap import FakeImapServer  # noqa: E402
+from corpus import build_message  # noqa: E402
+
+
+class RecordingSocketIO:
+    """Stand-in for flask_socketio.SocketIO that timestamps emitted events"""
+
+    def __init__(self):
+        self.events = []
+        self.received = threading.Event()
+
+    def emit(self, event, data=None, **kwargs):
+        self.events.append((time.perf_counter(), event, data))
+        if event == 'new_email':
+            self.received.set()
+
+
+def configure(server, mode, check_interval, db_path):
+    from app.config import Config
+
+    Config.IMAP_SERVER = server.host
+    Config.IMAP_PORT = server.port
+    Config.IMAP_USE_SSL = False
+    Config.EMAIL_ADDRESS = 'monitor@example.com'
+    Config.EMAIL_PASSWORD = 'secret'
+    Config.DATABASE_PATH = db_path
+    Config.USE_IDLE = mode == 'idle'
+    Config.CHECK_INTERVAL = check_interval
+    Config.POLL_ADAPTIVE = False  # compare IDLE with polling at a fixed interval
+
+
+def run(messages, mode, check_interval, gap):
+    server = FakeImapServer().start()
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(server, mode, check_interval, os.path.join(tmp, 'emails.db'))
+
+        from app.services.db import DatabaseService
+        from app.services.email_tracker import EmailTracker
+
+        DatabaseService().init_database()
+        socketio = RecordingSocketIO()
+        tracker = EmailTracker(socketio=socketio)
+        tracker.start_monitoring()
+
+        # Wait for the initial (empty) sync to finish before measuring
+        deadline = time.monotonic() + 10
+        while DatabaseService().get_sync_state('INBOX') is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        subjects = {}
+        for index in range(messages):
+            uid = server.mailbox.append(build_message(index))
+            subjects[f"Synthetic message {index}"] = server.mailbox.append_times[('INBOX', uid)]
+            time.sleep(gap)
+
+        deadline = time.monotonic() + check_interval + 10
+        while time.monotonic() < deadline:
+            emitted = {data['subject'] for _, event, data in socketio.events if event == 'new_email'}
+            if len(emitted) >= messages:
+                break
+            time.sleep(0.05)
+        tracker.stop_monitoring()
+    server.stop()
+
+    latencies = sorted(
+        (emitted_at - subjects[data['subject']]) * 1000
+        for emitted_at, event, data in socketio.events
+        if event == 'new_email' and data['subject'] in subjects
+    )
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20)
+    parser.add_argument('--mode', choices=('idle', 'poll'), default='idle')
+    parser.add_argument('--check-interval', type=float, default=30)
+    parser.add_argument('--gap', type=float, default=0.5, help='seconds between APPENDs')
+    options = parser.parse_args()
+
+    latencies = run(options.messages, options.mode, options.check_interval, options.gap)
+    if not latencies:
+        print("No new_email events were emitted")
+        return 1
+    print(f"\nmode={options.mode} delivered={len(latencies)}/{options.messages}")
+    print(f"latency ms: min={latencies[0]:.1f} median={statistics.median(latencies):.1f} "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1]:.1f} max={latencies[-1]:.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""Reproducible end-to-end benchmark suite with JSON results, for comparing runs.
+
+Generates a deterministic synthetic mailbox (``corpus.CorpusGenerator``:
+message count, body size distribution, attachment mix), serves it from the
+fake IMAP server and measures, in a fresh temporary directory:
+
+* ingest: one ``EmailTracker.poll_once`` storing the whole mailbox
+  (TWO_PHASE_FETCH off), after a small warm-up poll; emails/s and MB/s
+* db_write: ``DatabaseService.save_emails_batch`` of the parsed corpus into
+  a new database at each ``--batch-sizes``; rows/s, best of 3
+* http: ``--clients`` keep-alive clients against the Flask app (threaded
+  WSGI server) for ``--seconds`` per endpoint: /api/emails, /emails/<id> and
+  attachment downloads; p50/p95/p99/max latency and requests/s
+
+The results go to ``--output`` as JSON. ``--compare`` checks them against an
+earlier results file and exits with status 1 when a throughput or latency
+figure got worse by more than ``--tolerance``.
+
+    python benchmarks/run_suite.py --messages 1000 --output baseline.json
+    python benchmarks/run_suite.py --messages 1000 --output results.json --compare baseline.json
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_imap import FakeImapServer  # noqa: E402
+from corpus import CorpusGenerator, DEFAULT_ATTACHMENT_MIX, build_message  # noqa: E402
+
+SUITE_VERSION = 1
+WARMUP_MESSAGES = 5
+DB_WRITE_REPEAT = 3
+# Figures checked by --compare, by suffix -> True when higher is better (max_ms is too noisy to gate on)
+DIRECTIONS = {'_per_sec': True, 'p50_ms': False, 'p95_ms': False, 'p99_ms': False}
+
+
+def percentile(values, pct):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def account(port):
+    from app.services.accounts import Account
+    return Account(name='bench', email_address='bench@example.com', password='secret',
+                   server='127.0.0.1', port=port, use_ssl=False)
+
+
+def poll(db, port, folder):
+    from app.config import Config
+    from app.services.accounts import MailboxTarget
+    from app.services.email_tracker import EmailTracker
+
+    tracker = EmailTracker(target=MailboxTarget(account(port), folder), db_service=db)
+    tracker.last_check_time = datetime(2000, 1, 1, tzinfo=Config.TIMEZONE)
+    started = time.perf_counter()
+    ok = tracker.poll_once()
+    elapsed = time.perf_counter() - started
+    tracker.disconnect()
+    if not ok:
+        raise RuntimeError(f"poll of {folder} failed: {tracker.last_error}")
+    return elapsed
+
+
+def bench_ingest(db, server, totals):
+    poll(db, server.port, 'warmup')
+    elapsed = poll(db, server.port, 'INBOX')
+    stored = db.get_stats()['total_emails'] - WARMUP_MESSAGES
+    if stored != totals['messages']:
+        raise RuntimeError(f"stored {stored} of {totals['messages']} emails")
+    return {
+        'emails': stored,
+        'elapsed': elapsed,
+        'emails_per_sec': stored / elapsed,
+        'ingest_mb_per_sec': totals['bytes'] / 1024 / 1024 / elapsed
+    }
+
+
+def bench_db_write(generator, port, batch_sizes, tmp):
+    from imap_tools import MailMessage
+    from app.services.accounts import MailboxTarget
+    from app.services.db import DatabaseService
+    from app.services.email_tracker import EmailTracker
+
+    tracker = EmailTracker(target=MailboxTarget(account(port)), db_service=None)
+    records = [tracker.build_email_record(MailMessage.from_bytes(raw)) for raw in generator]
+    results = {}
+    for batch_size in batch_sizes:
+        samples = []
+        for run in range(DB_WRITE_REPEAT):
+            db = DatabaseService(os.path.join(tmp, f'write-{batch_size}-{run}.db'))
+            db.init_database()
+            started = time.perf_counter()
+            for start in range(0, len(records), batch_size):
+                db.save_emails_batch(records[start:start + batch_size])
+            samples.append(time.perf_counter() - started)
+            db.pool.close_all()
+        elapsed = min(samples)
+        results[f'batch_{batch_size}'] = {'rows': len(records), 'elapsed': elapsed,
+                                          'rows_per_sec': len(records) / elapsed}
+    return results
+
+
+def bench_http(db, clients, seconds):
+    import logging
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with db.get_connection() as conn:
+        email_ids = [row[0] for row in conn.execute('SELECT id FROM emails')]
+        attachment_ids = [row[0] for row in conn.execute('SELECT id FROM attachments')]
+
+    endpoints = {
+        '/api/emails': lambda rng: '/api/emails?limit=50',
+        '/emails/<id>': lambda rng: f'/emails/{rng.choice(email_ids)}',
+        '/api/attachments/<id>/download': lambda rng: f'/api/attachments/{rng.choice(attachment_ids)}/download'
+    }
+    if not attachment_ids:
+        del endpoints['/api/attachments/<id>/download']
+
+    results = {}
+    for name, path_for in endpoints.items():
+        latencies = []
+        errors = [0]
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def client(seed):
+            rng = random.Random(seed)
+            conn = http.client.HTTPConnection('127.0.0.1', server.server_port)
+            local = []
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                conn.request('GET', path_for(rng))
+                response = conn.getresponse()
+                response.read()
+                local.append((time.perf_counter() - started) * 1000)
+                if response.status != 200:
+                    with lock:
+                        errors[0] += 1
+            conn.close()
+            with lock:
+                latencies.extend(local)
+
+        threads = [threading.Thread(target=client, args=(seed,)) for seed in range(clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        results[name] = {
+            'requests': len(latencies),
+            'errors': errors[0],
+            'requests_per_sec': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'max_ms': max(latencies, default=float('nan'))
+        }
+    server.shutdown()
+    return results
+
+
+def flatten(results, prefix=''):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f'{prefix}{key}.')
+        else:
+            yield f'{prefix}{key}', value
+
+
+def compare(current, baseline, tolerance):
+    """Print every comparable figure against ``baseline``, returns the regressions"""
+    previous = dict(flatten(baseline['results']))
+    if baseline.get('parameters') != current['parameters']:
+        print("! baseline was run with different parameters, the comparison is only indicative")
+    regressions = []
+    print(f"{'metric':<52} {'baseline':>10} {'current':>10} {'change':>8}")
+    for key, value in flatten(current['results']):
+        higher_is_better = next((better for suffix, better in DIRECTIONS.items() if key.endswith(suffix)), None)
+        if higher_is_better is None or not previous.get(key):
+            continue
+        change = (value - previous[key]) / previous[key]
+        worse = -change if higher_is_better else change
+        flag = '  ✗' if worse > tolerance else ''
+        if flag:
+            regressions.append(key)
+        print(f"{key:<52} {previous[key]:10.2f} {value:10.2f} {change * 100:+7.1f}%{flag}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1000)
+    parser.add_argument('--body-median', type=int, default=2048, help='median text body size in bytes')
+    parser.add_argument('--body-sigma', type=float, default=1.0, help='spread of the log-normal body sizes')
+    parser.add_argument('--attachment-mix', default=DEFAULT_ATTACHMENT_MIX,
+                        help='kind=weight list; kinds: none, text, pdf, image, office, archive')
+    parser.add_argument('--max-attachments', type=int, default=2, help='per message with attachments')
+    parser.add_argument('--max-attachment-size', type=int, default=1024 * 1024, help='bytes')
+    parser.add_argument('--html-ratio', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=20)
+    parser.add_argument('--batch-sizes', default='1,50,500', help='save_emails_batch sizes for db_write')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent HTTP clients')
+    parser.add_argument('--seconds', type=float, default=10, help='per HTTP endpoint')
+    parser.add_argument('--output', default='results.json')
+    parser.add_argument('--compare', help='earlier results file')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='allowed relative regression')
+    options = parser.parse_args()
+    output = os.path.abspath(options.output)
+    baseline_path = options.compare and os.path.abspath(options.compare)
+
+    generator = CorpusGenerator(
+        options.messages, body_median=options.body_median, body_sigma=options.body_sigma,
+        attachment_mix=options.attachment_mix, max_attachments=options.max_attachments,
+        max_attachment_size=options.max_attachment_size, html_ratio=options.html_ratio, seed=options.seed
+    )
+    server = FakeImapServer()
+    totals = generator.seed_server(server)
+    rng = random.Random(options.seed)
+    for index in range(WARMUP_MESSAGES):
+        server.mailbox.append(build_message(index, rng=rng), folder='warmup')
+    server.start()
+    print(f"corpus: {totals['messages']} messages, {totals['bytes'] / 1024 / 1024:.1f} MB, "
+          f"{totals['with_attachments']} with attachments")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The routes open the default database relative to the working directory at import time
+        os.chdir(tmp)
+        os.environ.setdefault('EMAIL_ADDRESS', 'bench@example.com')
+        os.environ.setdefault('EMAIL_PASSWORD', 'secret')
+        from app.config import Config
+        from app.services.db import DatabaseService
+
+        Config.TWO_PHASE_FETCH = False
+        db = DatabaseService()
+        db.init_database()
+        results = {}
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            results['ingest'] = bench_ingest(db, server, totals)
+            results['db_write'] = bench_db_write(
+                generator, server.port, [int(size) for size in options.batch_sizes.split(',')], tmp
+            )
+            results['http'] = bench_http(db, options.clients, options.seconds)
+        db.pool.close_all()
+        os.chdir(ROOT)
+    server.stop()
+
+    report = {
+        'suite': {
+            'version': SUITE_VERSION,
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'finished': datetime.now(timezone.utc).isoformat(timespec='seconds')
+        },
+        'parameters': dict(generator.parameters(), batch_sizes=options.batch_sizes,
+                           clients=options.clients, seconds=options.seconds),
+        'corpus': totals,
+        'results': results
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    ingest = results['ingest']
+    print(f"ingest   {ingest['emails_per_sec']:8.1f} emails/s {ingest['ingest_mb_per_sec']:8.1f} MB/s")
+    for name, result in results['db_write'].items():
+        print(f"db_write {name:<10} {result['rows_per_sec']:8.1f} rows/s")
+    print(f"{'endpoint':<32} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>6}")
+    for name, result in results['http'].items():
+        print(f"{name:<32} {result['requests_per_sec']:8.1f} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} "
+              f"{result['p99_ms']:8.2f} {result['max_ms']:8.2f} {result['errors']:6d}")
+    print(f"results written to {output}")
+
+    failed = any(result['errors'] for result in results['http'].values())
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(report, json.load(f), options.tolerance)
+        if regressions:
+            print(f"✗ {len(regressions)} figures regressed by more than {options.tolerance * 100:.0f}%")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
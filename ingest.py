@@ -0,0 +1,61 @@
+"""Monitor the mailboxes in a process of its own, apart from the web server.
+
+Holds the ingest lock (app/services/leader.py) while it runs, so only one
+ingester works at a time; run the web server with INGEST_IN_WEB=false.
+WebSocket events reach the web processes through SOCKETIO_MESSAGE_QUEUE
+(e.g. sqlite:///events.db, see app/services/event_bus.py).
+
+    python ingest.py             # exits if another process holds the lock
+    python ingest.py --standby   # waits for the lock and takes over when the ingester stops
+"""
+import argparse
+import signal
+import threading
+from app import start_email_monitoring
+from app.config import Config
+from app.services.db import DatabaseService
+from app.services.event_bus import socketio_options
+from app.services.leader import LeaderLock
+
+def main():
+    parser = argparse.ArgumentParser(description='Monitor the mailboxes apart from the web server')
+    parser.add_argument('--standby', action='store_true', help='wait for the ingest lock instead of exiting')
+    args = parser.parse_args()
+
+    Config.validate_config()
+    DatabaseService().init_database()
+
+    stopped = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopped.set())
+
+    lock = LeaderLock()
+    if args.standby and not lock.acquire():
+        print(f"Standing by: pid {lock.holder()} is ingesting")
+    if not lock.acquire(wait=args.standby, stopped=stopped):
+        if not stopped.is_set():
+            print(f"✗ Another process is ingesting (pid {lock.holder()}), see {lock.path}")
+            return 1
+        return 0
+
+    socketio = None
+    if Config.SOCKETIO_MESSAGE_QUEUE:
+        from flask_socketio import SocketIO
+        socketio = SocketIO(**socketio_options(write_only=True))
+    else:
+        print("⚠️  SOCKETIO_MESSAGE_QUEUE is not set: the web server will not get live updates")
+
+    monitor = start_email_monitoring(socketio)
+    print(f"✓ Ingesting (lock {lock.path}): {', '.join(target.name for target in monitor.targets)}")
+    try:
+        while not stopped.wait(1):
+            pass
+    finally:
+        print("Stopping...")
+        monitor.stop_monitoring()
+        lock.release()
+    print("✓ Ingest stopped")
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+import argparse
+import time
+from app.services.db import DatabaseService
+from app.services.archive import EmailArchiver
+from app.services.previews import create_preview_service
+
+def rebuild_search(args):
+    """Rebuild the full-text search index from the emails table"""
+    db_service = DatabaseService()
+    db_service.init_database()
+    count = db_service.rebuild_search_index()
+    print(f"✓ Search index rebuilt ({count} emails indexed)")
+
+def rebuild_stats(args):
+    """Recount the dashboard statistics from the emails table"""
+    db_service = DatabaseService()
+    db_service.init_database()
+    stats = db_service.rebuild_stats()
+    print(f"✓ Statistics rebuilt ({stats['total_emails']} emails, "
+          f"{stats['emails_with_attachments']} with attachments)")
+
+def migrate_blobs(args):
+    """Move attachment BLOBs out of the database into the blob store"""
+    db_service = DatabaseService()
+    db_service.init_database()
+    
+    def progress(migrated, total_bytes):
+        print(f"  {migrated} attachments moved ({total_bytes / 1024 / 1024:.1f} MB)")
+    
+    migrated, total_bytes = db_service.migrate_attachment_blobs(batch_size=args.batch_size, progress=progress)
+    print(f"✓ {migrated} attachments moved to the blob store ({total_bytes / 1024 / 1024:.1f} MB)")
+    if args.vacuum and migrated:
+        print("Compacting database...")
+        db_service.vacuum()
+        print("✓ Database compacted")
+
+def compress_bodies(args):
+    """Move message bodies out of the emails table into compressed storage"""
+    db_service = DatabaseService()
+    db_service.init_database()
+    
+    if args.train or db_service.get_body_dictionary_id() is None:
+        trained = db_service.train_body_dictionary(sample_size=args.sample_size)
+        if trained:
+            print(f"✓ Body dictionary {trained[0]} trained ({trained[1] / 1024:.1f} KB)")
+    
+    def progress(converted, raw_bytes, stored_bytes):
+        print(f"  {converted} bodies compressed ({raw_bytes / 1024 / 1024:.1f} MB -> {stored_bytes / 1024 / 1024:.1f} MB)")
+    
+    converted, raw_bytes, stored_bytes = db_service.compress_bodies(
+        batch_size=args.batch_size, recompress=args.recompress, progress=progress
+    )
+    ratio = raw_bytes / stored_bytes if stored_bytes else 0
+    print(f"✓ {converted} bodies compressed ({raw_bytes / 1024 / 1024:.1f} MB -> "
+          f"{stored_bytes / 1024 / 1024:.1f} MB, {ratio:.1f}x)")
+    if args.vacuum and converted:
+        print("Compacting database...")
+        db_service.vacuum()
+        print("✓ Database compacted")
+
+def archive(args):
+    """Move emails past the retention window to monthly archive files"""
+    db_service = DatabaseService()
+    db_service.init_database()
+    archiver = EmailArchiver(
+        db_service,
+        after_days=args.days,
+        drop_attachments=True if args.drop_attachments else None,
+        retention_months=args.retention_months,
+        batch_size=args.batch_size
+    )
+    if not archiver.enabled:
+        print("Nothing to do: set ARCHIVE_AFTER_DAYS (or pass --days)")
+        return
+    
+    def progress(moved, month):
+        print(f"  {moved} emails archived (up to {month})")
+    
+    moved, expired = archiver.run_once(progress=progress)
+    print(f"✓ {moved} emails moved to {archiver.db_service.archive_root}")
+    if expired:
+        print(f"✓ Expired archive files deleted: {', '.join(expired)}")
+    if args.vacuum and moved:
+        print("Compacting database...")
+        db_service.vacuum()
+        print("✓ Database compacted")
+
+def previews(args):
+    """Make the attachment previews of recent emails ahead of their first view"""
+    db_service = DatabaseService()
+    db_service.init_database()
+    preview_service = create_preview_service(db_service)
+    since = time.time() - args.days * 86400
+    made = missing = 0
+    for attachment_id, filename, digest in db_service.get_recent_attachments(since):
+        if preview_service.kind(filename) is None:
+            continue
+        try:
+            for size in preview_service.sizes if preview_service.kind(filename) == 'image' else [None]:
+                if preview_service.get(digest, filename, size):
+                    made += 1
+        except FileNotFoundError:
+            missing += 1
+    print(f"✓ {made} previews ready in {preview_service.cache.root} "
+          f"({preview_service.cache.size / 1024 / 1024:.1f} MB cached)")
+    if missing:
+        print(f"⚠️  {missing} attachments missing from the blob store")
+
+def main():
+    parser = argparse.ArgumentParser(description='Email Tracker maintenance commands')
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    commands.add_parser('rebuild-search', help=rebuild_search.__doc__).set_defaults(func=rebuild_search)
+    commands.add_parser('rebuild-stats', help=rebuild_stats.__doc__).set_defaults(func=rebuild_stats)
+    
+    migrate = commands.add_parser('migrate-blobs', help=migrate_blobs.__doc__)
+    migrate.add_argument('--batch-size', type=int, default=100)
+    migrate.add_argument('--vacuum', action='store_true', help='shrink the database file afterwards')
+    migrate.set_defaults(func=migrate_blobs)
+    
+    compress = commands.add_parser('compress-bodies', help=compress_bodies.__doc__)
+    compress.add_argument('--batch-size', type=int, default=500)
+    compress.add_argument('--train', action='store_true', help='train a new dictionary from the stored bodies first')
+    compress.add_argument('--sample-size', type=int, help='bodies to train the dictionary from')
+    compress.add_argument('--recompress', action='store_true',
+                          help='also re-encode bodies compressed with an older dictionary')
+    compress.add_argument('--vacuum', action='store_true', help='shrink the database file afterwards')
+    compress.set_defaults(func=compress_bodies)
+    
+    archive_parser = commands.add_parser('archive', help=archive.__doc__)
+    archive_parser.add_argument('--days', type=int, help='archive emails older than this (ARCHIVE_AFTER_DAYS)')
+    archive_parser.add_argument('--drop-attachments', action='store_true',
+                                help='keep only attachment metadata in the archive (ARCHIVE_DROP_ATTACHMENTS)')
+    archive_parser.add_argument('--retention-months', type=int,
+                                help='delete archive files older than this (ARCHIVE_RETENTION_MONTHS)')
+    archive_parser.add_argument('--batch-size', type=int)
+    archive_parser.add_argument('--vacuum', action='store_true', help='shrink the database file afterwards')
+    archive_parser.set_defaults(func=archive)
+    
+    previews_parser = commands.add_parser('previews', help=previews.__doc__)
+    previews_parser.add_argument('--days', type=int, default=30, help='emails received in the last DAYS days')
+    previews_parser.set_defaults(func=previews)
+    
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()